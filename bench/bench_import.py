@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+#  vim:ts=4:sts=4:sw=4:et
+#
+#  Author: Hari Sekhon
+#  Date: 2026-10-18 10:12:41 +0100 (Sun, 18 Oct 2026)
+#
+#  https://github.com/harisekhon/pylib
+#
+#  License: see accompanying Hari Sekhon LICENSE file
+#
+#  If you're using my code you're welcome to connect with me on LinkedIn and optionally send me feedback
+#  to help improve or steer this or other code I publish
+#
+#  https://www.linkedin.com/in/harisekhon
+#
+
+"""
+
+Benchmark of the import time of harisekhon.utils and the cost of loading the TLDs
+which is deferred until the first domain / fqdn / host / email / url validation
+
+Each scenario is timed inside a fresh interpreter to exclude interpreter start up time,
+taking the best of N runs to reduce noise
+
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from optparse import OptionParser
+
+__author__ = 'Hari Sekhon'
+__version__ = '0.1'
+
+libdir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+TIMER = """
+import time
+start = time.time()
+{code}
+print(time.time() - start)
+"""
+
+SCENARIOS = (
+    ('import only (TLDs deferred)', 'import harisekhon.utils', False),
+    ('import + TLDs (warm cache)', 'import harisekhon.utils; harisekhon.utils._get_tld_regexes()', False),
+    ('import + TLDs (cold cache, previous eager cost)',
+     'import harisekhon.utils; harisekhon.utils._get_tld_regexes()', True),
+)
+
+
+def time_code(code, cold_cache=False):
+    env = dict(os.environ)
+    cache_dir = None
+    if cold_cache:
+        cache_dir = tempfile.mkdtemp()
+        env['HARISEKHON_CACHE_DIR'] = cache_dir
+    try:
+        output = subprocess.check_output([sys.executable, '-c', TIMER.format(code=code)], cwd=libdir, env=env)
+    finally:
+        if cache_dir:
+            shutil.rmtree(cache_dir)
+    return float(output.decode('utf-8').strip().split('\n')[-1])
+
+
+def main():
+    parser = OptionParser(description=__doc__)
+    parser.add_option('-n', '--runs', type='int', default=20, help='Number of runs per scenario (default: 20)')
+    (options, _) = parser.parse_args()
+    # prime the TLD cache so the warm cache scenario is representative
+    time_code(SCENARIOS[1][1])
+    results = []
+    for (name, code, cold_cache) in SCENARIOS:
+        timings = sorted([time_code(code, cold_cache) for _ in range(options.runs)])
+        results.append((name, timings[0], timings[len(timings) // 2]))
+    print('{0:<50} {1:>10} {2:>10}'.format('scenario', 'best ms', 'median ms'))
+    for (name, best, median) in results:
+        print('{0:<50} {1:>10.2f} {2:>10.2f}'.format(name, best * 1000, median * 1000))
+    print('\nTLD load saving at import: {0:.2f} ms'.format((results[2][1] - results[0][1]) * 1000))
+    print('TLD load saving on first use with warm cache: {0:.2f} ms'.format((results[2][1] - results[1][1]) * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+#  vim:ts=4:sts=4:sw=4:et
+#
+#  Author: Hari Sekhon
+#  Date: 2026-10-18 23:48:12 +0100 (Sun, 18 Oct 2026)
+#
+#  https://github.com/harisekhon/pylib
+#
+#  License: see accompanying Hari Sekhon LICENSE file
+#
+#  If you're using my code you're welcome to connect with me on LinkedIn and optionally send me feedback
+#  to help improve or steer this or other code I publish
+#
+#  https://www.linkedin.com/in/harisekhon
+#
+
+"""
+
+Benchmark of the JSON backends for harisekhon.utils.json_loads() over representative REST payloads
+
+Times the loads() of each installed backend directly and via json_loads(), which adds the fallback wrapper, and
+jsonpp() of a JSON string which decodes with the backend and encodes with the stdlib json module. Each backend's
+result is checked against the stdlib json module's
+
+Payloads are generated: a small service status document, an error response, a cluster node listing and a large
+/jmx document
+
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import importlib
+import json
+import os
+import sys
+import timeit
+from optparse import OptionParser
+
+libdir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(libdir)
+# pylint: disable=wrong-import-position
+import harisekhon.utils as utils
+
+__author__ = 'Hari Sekhon'
+__version__ = '0.1'
+
+
+def payloads():
+    status = {'status': 'OK', 'version': '2.7.3', 'uptime': 123456, 'leader': True, 'ratio': 0.95}
+    error = {'status': 500, 'error': 'Internal Server Error', 'message': 'java.lang.NullPointerException ' * 10}
+    nodes = {'nodes': [{'id': 'node{0}'.format(i), 'host': 'host{0}.domain.com'.format(i), 'port': 8080,
+                        'state': 'RUNNING' if i % 10 else 'DEAD', 'lastHeartbeat': 1476000000000 + i,
+                        'usedMemoryMB': i * 128, 'availMemoryMB': 65536 - i * 128, 'numContainers': i % 32,
+                        'healthReport': '', 'rack': '/default-rack'} for i in range(500)]}
+    jmx = {'beans': [{'name': 'Hadoop:service=NameNode,name=Bean{0}'.format(i),
+                      'modelerType': 'org.apache.hadoop.metrics2.Bean{0}'.format(i),
+                      'tag.Context': 'dfs',
+                      'attributes': dict([('Metric{0}'.format(j), j * 1.5 + i) for j in range(40)]),
+                      'list': list(range(20))} for i in range(2000)]}
+    for (name, doc) in (('status', status), ('error', error), ('nodes', nodes), ('jmx', jmx)):
+        yield (name, json.dumps(doc))
+
+
+def installed_backends():
+    # stdlib json first as the baseline for the speedups
+    # pylint: disable=protected-access
+    for name in ('json',) + tuple([_ for _ in utils._json_backends if _ != 'json']):
+        try:
+            module = importlib.import_module(name)
+        except ImportError:
+            continue
+        yield (name, module.loads)
+
+
+def bench(func, arg, min_time=0.2):
+    number = 1
+    while True:
+        elapsed = timeit.timeit(lambda: func(arg), number=number)
+        if elapsed >= min_time:
+            return elapsed / number
+        number *= 2
+
+
+def main():
+    parser = OptionParser(description=__doc__)
+    parser.add_option('-t', '--min-time', type='float', default=0.2,
+                      help='Min secs to time each function for (default: 0.2)')
+    (options, _) = parser.parse_args()
+    backends = list(installed_backends())
+    print('installed backends: {0}, auto selects: {1}\n'
+          .format(', '.join([_[0] for _ in backends]), utils.set_json_backend('auto')))
+    print('{0:<8} {1:>10} {2:<30} {3:>12} {4:>8}'.format('payload', 'bytes', 'function', 'us', 'speedup'))
+    for (name, content) in payloads():
+        expected = json.loads(content)
+        baseline = None
+        for (backend, loads) in backends:
+            if loads(content) != expected:
+                print('WARNING: {0} result differs from json for {1}'.format(backend, name))
+            for (label, func) in (('{0}.loads'.format(backend), loads),
+                                  ('json_loads ({0})'.format(backend), utils.json_loads),
+                                  ('jsonpp ({0})'.format(backend), utils.jsonpp)):
+                utils.set_json_backend(backend)
+                elapsed = bench(func, content, options.min_time)
+                if baseline is None:
+                    baseline = elapsed
+                print('{0:<8} {1:>10} {2:<30} {3:>12.2f} {4:>7.2f}x'
+                      .format(name, len(content), label, elapsed * 1000000, baseline / elapsed))
+        print()
+    utils.set_json_backend(os.getenv('HARISEKHON_JSON_BACKEND'))
+
+
+if __name__ == '__main__':
+    main()
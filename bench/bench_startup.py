@@ -0,0 +1,262 @@
+#!/usr/bin/env python
+#  vim:ts=4:sts=4:sw=4:et
+#
+#  Author: Hari Sekhon
+#  Date: 2026-10-18 21:05:17 +0100 (Sun, 18 Oct 2026)
+#
+#  https://github.com/harisekhon/pylib
+#
+#  License: see accompanying Hari Sekhon LICENSE file
+#
+#  If you're using my code you're welcome to connect with me on LinkedIn and optionally send me feedback
+#  to help improve or steer this or other code I publish
+#
+#  https://www.linkedin.com/in/harisekhon
+#
+
+"""
+
+Start up benchmark suite for the harisekhon package and the NagiosPlugin family
+
+Measures inside fresh interpreters:
+
+- import time of harisekhon, harisekhon.utils and harisekhon.nagiosplugin, and of NagiosPlugin through the lazy
+  package exports
+- constructor time of trivial CLI, NagiosPlugin, RestNagiosPlugin, KeyCheckNagiosPlugin and PubSubNagiosPlugin
+  subclasses, excluding their imports
+- end to end wall time of trivial CLI and NagiosPlugin programs through to qquit(), including interpreter start up,
+  which is also shown on its own for reference
+- time per check of the trivial NagiosPlugin run in process by CheckRunner, for comparison with the end to end time
+
+Compares the medians against a JSON baseline if one exists and exits non-zero if any scenario regressed by more
+than the tolerance. Save a baseline on the machine you'll compare on with --save
+
+--importtime adds a breakdown of the import of NagiosPlugin by top level package and the slowest
+modules from python -X importtime (Python 3.7+)
+
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from optparse import OptionParser
+
+__author__ = 'Hari Sekhon'
+__version__ = '0.1'
+
+libdir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+default_baseline = os.path.join(libdir, 'bench', 'startup_baseline.json')
+
+IMPORT_NAGIOSPLUGIN = 'from harisekhon.nagiosplugin import NagiosPlugin'
+
+IMPORT_TIMER = """
+import time
+start = time.time()
+{statement}
+print(time.time() - start)
+"""
+
+# NagiosPlugin sets sys.stderr = sys.stdout so print the timing to the real stdout
+CONSTRUCTOR_TIMER = """
+import sys
+import time
+from harisekhon import {cls}
+{classdef}
+start = time.time()
+Bench()
+sys.__stdout__.write('%s\\n' % (time.time() - start))
+"""
+
+END_TO_END = """
+from harisekhon import {cls}
+{classdef}
+Bench().main()
+"""
+
+# per check, after the first which imports everything
+RUNNER_TIMER = """
+import sys
+import time
+from harisekhon import {cls}, CheckRunner
+{classdef}
+runner = CheckRunner([(Bench, [])] * 101)
+runner.run_check(*runner.jobs.pop())
+start = time.time()
+runner.run()
+sys.__stdout__.write('%s\\n' % ((time.time() - start) / len(runner.jobs)))
+"""
+
+CLASSDEFS = {
+    'CLI': """
+class Bench(CLI):
+    def run(self):
+        pass
+""",
+    'NagiosPlugin': """
+class Bench(NagiosPlugin):
+    def run(self):
+        self.ok()
+        self.msg = 'bench'
+""",
+    'RestNagiosPlugin': """
+class Bench(RestNagiosPlugin):
+    pass
+""",
+    'KeyCheckNagiosPlugin': """
+class Bench(KeyCheckNagiosPlugin):
+    def read(self):
+        pass
+""",
+    'PubSubNagiosPlugin': """
+class Bench(PubSubNagiosPlugin):
+    def subscribe(self):
+        pass
+    def publish(self):
+        pass
+    def consume(self):
+        pass
+""",
+}
+
+
+class StartupBenchmark(object):
+
+    def __init__(self, runs=10):
+        self.runs = runs
+        self.tmpdir = None
+
+    def run_script(self, code, name='bench_script.py', timed_externally=False):
+        # scripts are written to files rather than passed with -c as CLI needs a real top level file
+        filename = os.path.join(self.tmpdir, name)
+        with open(filename, 'w') as _:
+            _.write(code)
+        env = dict(os.environ)
+        env['PYTHONPATH'] = libdir
+        cmd = [sys.executable, filename]
+        if timed_externally:
+            with open(os.devnull, 'w') as devnull:
+                start = time.time()
+                subprocess.call(cmd, cwd=libdir, env=env, stdout=devnull)
+                return time.time() - start
+        output = subprocess.check_output(cmd, cwd=libdir, env=env)
+        return float(output.decode('utf-8').strip().split('\n')[-1])
+
+    def scenarios(self):
+        # the package exports are lazy so also time importing the base plugin class through them
+        for statement in ('import harisekhon', 'import harisekhon.utils', 'import harisekhon.nagiosplugin',
+                          IMPORT_NAGIOSPLUGIN):
+            yield (statement, IMPORT_TIMER.format(statement=statement), False)
+        for cls in ('CLI', 'NagiosPlugin', 'RestNagiosPlugin', 'KeyCheckNagiosPlugin', 'PubSubNagiosPlugin'):
+            yield ('construct {0}'.format(cls),
+                   CONSTRUCTOR_TIMER.format(cls=cls, classdef=CLASSDEFS[cls]), False)
+        yield ('end to end python start up (reference)', 'pass\n', True)
+        for cls in ('CLI', 'NagiosPlugin'):
+            yield ('end to end {0} to qquit'.format(cls),
+                   END_TO_END.format(cls=cls, classdef=CLASSDEFS[cls]), True)
+        yield ('in process NagiosPlugin per check (CheckRunner)',
+               RUNNER_TIMER.format(cls='NagiosPlugin', classdef=CLASSDEFS['NagiosPlugin']), False)
+
+    def run(self):
+        self.tmpdir = tempfile.mkdtemp()
+        results = {}
+        try:
+            for (name, code, timed_externally) in self.scenarios():
+                # warm up run to populate the TLD / file metadata caches and the OS page cache
+                self.run_script(code, timed_externally=timed_externally)
+                timings = sorted([self.run_script(code, timed_externally=timed_externally)
+                                  for _ in range(self.runs)])
+                results[name] = {'best_ms': timings[0] * 1000, 'median_ms': timings[len(timings) // 2] * 1000}
+                print('{0:<50} {1:>10.2f} {2:>10.2f}'.format(name, results[name]['best_ms'],
+                                                             results[name]['median_ms']))
+        finally:
+            shutil.rmtree(self.tmpdir)
+        return results
+
+
+def importtime_breakdown(statement=IMPORT_NAGIOSPLUGIN, top=15):
+    if sys.version_info < (3, 7):
+        print('-X importtime requires Python 3.7+, skipping breakdown')
+        return
+    # pylint: disable=unexpected-keyword-arg
+    output = subprocess.check_output([sys.executable, '-X', 'importtime', '-c', statement],
+                                     cwd=libdir, stderr=subprocess.STDOUT).decode('utf-8')
+    modules = []
+    for line in output.split('\n'):
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        (self_us, _, name) = line[len('import time:'):].split('|')
+        modules.append((name.strip(), int(self_us)))
+    packages = {}
+    for (name, self_us) in modules:
+        package = name.split('.')[0]
+        packages[package] = packages.get(package, 0) + self_us
+    total = sum(packages.values())
+    print('\n{0} by top level package ({1:.2f} ms total):\n'.format(statement, total / 1000.0))
+    for (package, self_us) in sorted(packages.items(), key=lambda _: _[1], reverse=True)[:top]:
+        print('{0:<45} {1:>10.2f} ms {2:>5.1f}%'.format(package, self_us / 1000.0, self_us * 100.0 / total))
+    print('\nslowest modules by self time:\n')
+    for (name, self_us) in sorted(modules, key=lambda _: _[1], reverse=True)[:top]:
+        print('{0:<45} {1:>10.2f} ms'.format(name, self_us / 1000.0))
+
+
+def compare(results, baseline, tolerance, min_diff_ms):
+    regressions = []
+    for (name, result) in sorted(results.items()):
+        if name not in baseline:
+            continue
+        before = baseline[name]['median_ms']
+        after = result['median_ms']
+        # ignore small absolute differences which are noise
+        if after > before * (1 + tolerance / 100.0) and after - before > min_diff_ms:
+            regressions.append((name, before, after))
+    return regressions
+
+
+def main():
+    parser = OptionParser(description=__doc__)
+    parser.add_option('-n', '--runs', type='int', default=10, help='Number of runs per scenario (default: 10)')
+    parser.add_option('-b', '--baseline', default=default_baseline,
+                      help='JSON baseline file (default: bench/startup_baseline.json)')
+    parser.add_option('-s', '--save', action='store_true', help='Save the results as the new baseline')
+    parser.add_option('-t', '--tolerance', type='float', default=20,
+                      help='Percentage a median may regress over the baseline before failing (default: 20)')
+    parser.add_option('-m', '--min-diff', type='float', default=2,
+                      help='Regressions smaller than this many ms are ignored as noise (default: 2)')
+    parser.add_option('-i', '--importtime', action='store_true',
+                      help='Show a breakdown of import time by package / module')
+    (options, _) = parser.parse_args()
+    print('{0:<50} {1:>10} {2:>10}'.format('scenario', 'best ms', 'median ms'))
+    results = StartupBenchmark(runs=options.runs).run()
+    if options.importtime:
+        importtime_breakdown()
+    if options.save:
+        with open(options.baseline, 'w') as _:
+            json.dump(results, _, indent=4, sort_keys=True)
+        print('\nsaved baseline to {0}'.format(options.baseline))
+        return 0
+    if not os.path.isfile(options.baseline):
+        print('\nno baseline found at {0}, run with --save to create one'.format(options.baseline))
+        return 0
+    with open(options.baseline) as _:
+        baseline = json.load(_)
+    regressions = compare(results, baseline, options.tolerance, options.min_diff)
+    if regressions:
+        print('\nREGRESSIONS beyond {0}% tolerance:\n'.format(options.tolerance))
+        for (name, before, after) in regressions:
+            print('{0:<45} {1:>10.2f} => {2:>10.2f} ms'.format(name, before, after))
+        return 1
+    print('\nno regressions beyond {0}% tolerance vs baseline {1}'.format(options.tolerance, options.baseline))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
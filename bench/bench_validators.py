@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+#  vim:ts=4:sts=4:sw=4:et
+#
+#  Author: Hari Sekhon
+#  Date: 2026-10-18 14:37:05 +0100 (Sun, 18 Oct 2026)
+#
+#  https://github.com/harisekhon/pylib
+#
+#  License: see accompanying Hari Sekhon LICENSE file
+#
+#  If you're using my code you're welcome to connect with me on LinkedIn and optionally send me feedback
+#  to help improve or steer this or other code I publish
+#
+#  https://www.linkedin.com/in/harisekhon
+#
+
+"""
+
+Micro-benchmark of the harisekhon.utils is*() predicates before and after the precompiled regex registry,
+and of the type predicates before and after resolving the interpreter capabilities once at import
+
+'before' re-creates the previous implementation of each predicate, re.match('^' + regex + '$', str(arg)) per call,
+'after' calls the current predicate. The TLD regexes have their inline (?i) moved to the flags for 'before' since
+it is an error mid regex on Python 3.11+, as it was effectively applied to the whole regex on earlier versions
+
+The interleaved row calls every predicate in turn on each arg as bulk validation of mixed fields would
+
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import re
+import sys
+import timeit
+try:
+    from collections.abc import Iterable
+except ImportError:
+    from collections import Iterable
+from optparse import OptionParser
+
+libdir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(libdir)
+# pylint: disable=wrong-import-position
+import harisekhon.utils as utils
+
+__author__ = 'Hari Sekhon'
+__version__ = '0.1'
+
+
+def old_match(regex, flags=0):
+    if '(?i)' in regex:
+        regex = regex.replace('(?i)', '')
+        flags |= re.I
+    def match(arg):
+        if arg is None:
+            return False
+        if re.match('^' + regex + '$', str(arg), flags):
+            return True
+        return False
+    return match
+
+
+def old_is_str(arg):
+    if utils.isPythonMinVersion(3):
+        return isinstance(arg, str)
+    return isinstance(arg, str) or isinstance(arg, unicode)  # pylint: disable=undefined-variable
+
+
+def old_is_unicode(arg):
+    if utils.isPythonMinVersion(3):
+        return isinstance(arg, str)
+    return isinstance(arg, unicode)  # pylint: disable=undefined-variable
+
+
+def old_is_iterable_not_str(arg):
+    # collections.Iterable no longer exists in Python 3.10+ so this has the abc one
+    return isinstance(arg, Iterable) and not old_is_str(arg)
+
+
+def old_is_host(arg):
+    if re.search(r'\b(?:no[\s_]+(?:server|host)[\s_]+available|no[\s_]+available[\s_]+(?:server|host)|' +
+                 r'(?:server|host)[\s_]+not[\s_]+available)\b', str(arg), re.I):
+        return False
+    return old_match(utils.host_regex)(arg)
+
+
+HOSTS = ['localhost', 'www.harisekhon.com', 'host-1.domain.co.uk', '10.10.10.10', '256.1.1.1', 'no_such-host.',
+         'a' * 64 + '.com', 'server.nonexistenttld']
+
+# (predicate name, before, args)
+PREDICATES = (
+    ('isHost', old_is_host, HOSTS),
+    ('isHostname', old_match(utils.hostname_regex), HOSTS),
+    ('isFqdn', old_match(utils.fqdn_regex), HOSTS),
+    ('isDomain', old_match(utils.domain_regex), HOSTS),
+    ('isIP', old_match(utils.ip_regex), ['10.10.10.10', '192.168.1.255', '1.2.3', '256.1.1.1', 'localhost']),
+    ('isEmail', old_match(utils.email_regex),
+     ['hari@harisekhon.com', "o'neil@x.co.uk", 'user@localhost', 'not an email', 'a@b@c.com']),
+    ('isUrl', lambda _: old_match(utils.url_regex)(_ if '://' in _ else 'http://' + _),
+     ['http://www.harisekhon.com/path?x=1', 'https://10.1.2.3:8443/', 'harisekhon.com', 'ftp://x.com', 'a b']),
+    ('isKrb5Princ', old_match(utils.krb5_principal_regex),
+     ['hari', 'hari/host.domain.com@REALM.COM', 'hdfs/host@LOCAL', '@x', 'hari/host/x']),
+    ('isVersion', old_match(utils.version_regex), ['1', '2.1.2', '3.0.0.1', 'v1.0', 'latest', '1.0-rc1']),
+    ('isVersionLax', old_match(utils.version_regex_lax), ['1', '2.1.2', '3.0-rc1', 'v1.0', 'latest']),
+    ('isLabel', old_match(utils.label_regex), ['used', 'Heap Used (%)', 'a/b*c', '$bad', '']),
+    ('isLdapDn', old_match(utils.ldap_dn_regex), ['uid=hari,dc=example,dc=com', 'cn=admin', 'not a dn', '=x']),
+    ('isUser', old_match(utils.user_regex), ['hari', 'cloudera-scm', '9hari', '-hari', 'h']),
+    ('isAwsAccessKey', old_match(utils.aws_access_key_regex), ['A' * 20, 'A' * 21, 'a' * 20, 'short']),
+    ('isProcessName', old_match(utils.process_name_regex), ['java', 'in.tftpd', '<defunct>', '!bad']),
+    ('isDirname', old_match(utils.dirname_regex), ['/tmp', 'C:\\dir', 'dir/sub dir', '@bad']),
+    ('isStr', old_is_str, ['string', 1, None, ['list']]),
+    ('isUnicode', old_is_unicode, ['string', 1, None, ['list']]),
+    ('isIterableNotStr', old_is_iterable_not_str, ['string', 1, None, ['list'], ('tuple',)]),
+)
+
+
+def bench(func, args, number):
+    def run():
+        for arg in args:
+            func(arg)
+    return timeit.timeit(run, number=number) / (number * len(args))
+
+
+def main():
+    parser = OptionParser(description=__doc__)
+    parser.add_option('-n', '--number', type='int', default=2000,
+                      help='Number of iterations over the sample args per predicate (default: 2000)')
+    (options, _) = parser.parse_args()
+    # load the TLDs up front so that's not counted against the first predicate
+    utils.isDomain('harisekhon.com')
+    print('{0:<16} {1:>12} {2:>12} {3:>8}'.format('predicate', 'before us', 'after us', 'speedup'))
+    for (name, before, args) in PREDICATES:
+        after = getattr(utils, name)
+        for arg in args:
+            if bool(before(arg)) != bool(after(arg)):
+                print('WARNING: {0}({1!r}) differs: before {2} after {3}'.format(name, arg, before(arg), after(arg)))
+        before_time = bench(before, args, options.number)
+        after_time = bench(after, args, options.number)
+        print('{0:<16} {1:>12.3f} {2:>12.3f} {3:>7.1f}x'
+              .format(name, before_time * 1000000, after_time * 1000000, before_time / after_time))
+    # string args only as the regex predicates' previous implementations assume strings
+    all_args = [arg for (_, _, args) in PREDICATES for arg in args if utils.isStr(arg)]
+    befores = [before for (_, before, _) in PREDICATES]
+    afters = [getattr(utils, name) for (name, _, _) in PREDICATES]
+    def interleaved(funcs):
+        def run(arg):
+            for func in funcs:
+                func(arg)
+        return run
+    number = max(options.number // 10, 1)
+    before_time = bench(interleaved(befores), all_args, number)
+    after_time = bench(interleaved(afters), all_args, number)
+    print('{0:<16} {1:>12.3f} {2:>12.3f} {3:>7.1f}x'
+          .format('interleaved', before_time * 1000000, after_time * 1000000, before_time / after_time))
+
+
+if __name__ == '__main__':
+    main()
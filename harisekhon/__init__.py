@@ -21,23 +21,65 @@ from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
 
+import importlib
+import sys
+
 # from harisekhon.utils import *
-# enables 'from harisekhon import CLI'
-from harisekhon.cli import CLI
-from harisekhon.request_handler import RequestHandler
-from harisekhon.request_bs4_handler import RequestBS4Handler
-# enables 'from harisekhon import NagiosPlugin'
-from harisekhon.nagiosplugin import NagiosPlugin
-from harisekhon.nagiosplugin import KeyCheckNagiosPlugin
-from harisekhon.nagiosplugin import KeyWriteNagiosPlugin
-from harisekhon.nagiosplugin import LiveNodesNagiosPlugin
-from harisekhon.nagiosplugin import DeadNodesNagiosPlugin
-from harisekhon.nagiosplugin import StatusNagiosPlugin
-from harisekhon.nagiosplugin import VersionNagiosPlugin
-from harisekhon.nagiosplugin import PubSubNagiosPlugin
-from harisekhon.nagiosplugin import RestNagiosPlugin
-from harisekhon.nagiosplugin import RestVersionNagiosPlugin
-from harisekhon.nagiosplugin import Threshold
-
-# pulls submodules in to 'from harisekhon import *'
-# __all__ = [ 'submodule1', 'submodule2' ]
+# enables 'from harisekhon import CLI' / 'from harisekhon import NagiosPlugin' etc.
+#
+# These are loaded lazily on first access via module __getattr__ below (PEP 562) rather than at import, so that
+# 'import harisekhon.utils' or a simple NagiosPlugin check doesn't also pull in requests, bs4 and every plugin class
+_lazy_imports = {
+    'CLI': 'harisekhon.cli',
+    'CLIResult': 'harisekhon.cli',
+    'HTTPCache': 'harisekhon.http_cache',
+    'HTTPTimings': 'harisekhon.http_timing',
+    'HTMLLabelScanner': 'harisekhon.html_scan',
+    'JSONPathExtractor': 'harisekhon.json_stream',
+    'RequestHandler': 'harisekhon.request_handler',
+    'RequestResult': 'harisekhon.request_handler',
+    'RequestBS4Handler': 'harisekhon.request_bs4_handler',
+    'RequestHTMLScanHandler': 'harisekhon.request_html_scan_handler',
+    'NagiosPlugin': 'harisekhon.nagiosplugin',
+    'CheckRunner': 'harisekhon.nagiosplugin',
+    'KeyCheckNagiosPlugin': 'harisekhon.nagiosplugin',
+    'KeyWriteNagiosPlugin': 'harisekhon.nagiosplugin',
+    'LiveNodesNagiosPlugin': 'harisekhon.nagiosplugin',
+    'DeadNodesNagiosPlugin': 'harisekhon.nagiosplugin',
+    'StatusNagiosPlugin': 'harisekhon.nagiosplugin',
+    'VersionNagiosPlugin': 'harisekhon.nagiosplugin',
+    'PubSubNagiosPlugin': 'harisekhon.nagiosplugin',
+    'RestNagiosPlugin': 'harisekhon.nagiosplugin',
+    'RestVersionNagiosPlugin': 'harisekhon.nagiosplugin',
+    'Threshold': 'harisekhon.nagiosplugin',
+}
+
+# submodules which used to be loaded as a side effect of the imports above, eg. harisekhon.cli
+_submodules = ('cli', 'html_scan', 'http_cache', 'http_timing', 'json_stream', 'request_handler',
+               'request_bs4_handler', 'request_html_scan_handler', 'nagiosplugin', 'utils')
+
+# pulls these in to 'from harisekhon import *'
+# str() as unicode_literals would break 'import *' on Python 2
+__all__ = [str(_) for _ in sorted(_lazy_imports)]
+
+
+def __getattr__(name):
+    if name in _lazy_imports:
+        value = getattr(importlib.import_module(_lazy_imports[name]), name)
+    elif name in _submodules:
+        value = importlib.import_module(__name__ + '.' + name)
+    else:
+        raise AttributeError("module '{0}' has no attribute '{1}'".format(__name__, name))
+    # cache so __getattr__ is only called on first access
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazy_imports))
+
+
+# no module level __getattr__ before Python 3.7 (PEP 562) so have to import eagerly there
+if sys.version_info < (3, 7):
+    for _ in __all__:
+        __getattr__(_)
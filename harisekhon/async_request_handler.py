@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+#  vim:ts=4:sts=4:sw=4:et
+#
+#  Author: Hari Sekhon
+#  Date: 2026-10-18 20:41:08 +0100 (Sun, 18 Oct 2026)
+#
+#  https://github.com/harisekhon/pylib
+#
+#  License: see accompanying Hari Sekhon LICENSE file
+#
+#  If you're using my code you're welcome to connect with me on LinkedIn and optionally send me feedback
+#  to help improve or steer this or other code I publish
+#
+#  https://www.linkedin.com/in/harisekhon
+#
+
+"""
+
+Async Request Handler Class - asyncio counterpart to RequestHandler for probing thousands of endpoints from one
+                              event loop without a thread per request in flight
+
+Has the same override-able hooks as RequestHandler - process_req(), check_response(), check_response_code(),
+parse(), check_content() and exception_handler() - which are called with an AsyncResponse having the
+status_code, reason, headers, content and url attributes of a requests.Response
+
+Requests go through a pluggable transport, by default StreamTransport, a minimal pure stdlib HTTP/1.1 client over
+asyncio streams with keep-alive connection reuse. Replace it by passing any object with the same
+request() / close() coroutines to the constructor
+
+Python 3.5+ only, so import it from this module, it isn't exported from the harisekhon package
+
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+#from __future__ import unicode_literals
+
+import asyncio
+import logging
+import os
+import ssl
+import sys
+import time
+import traceback
+from collections import OrderedDict
+from urllib.parse import urlsplit
+libdir = os.path.abspath(os.path.join(os.path.dirname(__file__), 'pylib'))
+sys.path.append(libdir)
+try:
+    # pylint: disable=wrong-import-position
+    from harisekhon.utils import log, CriticalError, get_topfile, json_loads
+    from harisekhon.request_handler import RequestResult
+except ImportError as _:
+    print(traceback.format_exc(), end='')
+    sys.exit(4)
+
+__author__ = 'Hari Sekhon'
+__version__ = '0.1'
+
+
+class TransportError(IOError):
+    pass
+
+
+class AsyncResponse(object):
+
+    def __init__(self, url, status_code, reason, headers, content, keep_alive=False):
+        self.url = url
+        self.status_code = status_code
+        self.reason = reason
+        # header names lowercased
+        self.headers = headers
+        self.content = content
+        # whether the connection can be reused for another request
+        self.keep_alive = keep_alive
+        self.elapsed = None
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', 'replace')
+
+    def json(self):
+        return json_loads(self.text)
+
+    def __repr__(self):
+        return '<{0} [{1}]>'.format(self.__class__.__name__, self.status_code)
+
+
+class StreamTransport(object):
+    """
+    Minimal HTTP/1.1 client on asyncio streams
+
+    Idle connections are kept per (scheme, host, port) for reuse, up to max_idle_per_host each. Supports
+    Content-Length, chunked and read until close response bodies, not proxies or redirects
+    """
+
+    def __init__(self, max_idle_per_host=10, ssl_context=None):
+        self.max_idle_per_host = max_idle_per_host
+        self.ssl_context = ssl_context
+        self.idle = {}
+        self.connections_opened = 0
+        self.requests = 0
+
+    async def request(self, method, url, headers=None, body=None):
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        if scheme not in ('http', 'https'):
+            raise TransportError('unsupported url scheme {0}'.format(scheme))
+        host = parts.hostname
+        port = parts.port or (443 if scheme == 'https' else 80)
+        key = (scheme, host, port)
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+        if body is not None and not isinstance(body, bytes):
+            body = body.encode('utf-8')
+        lines = ['{0} {1} HTTP/1.1'.format(method.upper(), path),
+                 'Host: {0}'.format(parts.netloc.rsplit('@', 1)[-1])]
+        for (name, value) in (headers or {}).items():
+            lines.append('{0}: {1}'.format(name, value))
+        if body is not None:
+            lines.append('Content-Length: {0}'.format(len(body)))
+        data = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + (body or b'')
+        # a kept alive connection may have been closed by the server meanwhile, retry those once on a new one
+        while True:
+            (reader, writer, reused) = await self._connect(key)
+            response = None
+            try:
+                writer.write(data)
+                await writer.drain()
+                response = await self._read_response(reader, method, url)
+            except (OSError, asyncio.IncompleteReadError, TransportError):
+                if reused:
+                    continue
+                raise
+            finally:
+                # including when cancelled by a timeout, the connection is left part way through the response
+                if response is None:
+                    writer.close()
+            break
+        self.requests += 1
+        if response.keep_alive:
+            self._release(key, reader, writer)
+        else:
+            writer.close()
+        return response
+
+    async def _connect(self, key):
+        idle = self.idle.get(key)
+        while idle:
+            (reader, writer) = idle.pop()
+            if not writer.is_closing() and not reader.at_eof():
+                return (reader, writer, True)
+            writer.close()
+        (scheme, host, port) = key
+        ssl_context = None
+        if scheme == 'https':
+            ssl_context = self.ssl_context or ssl.create_default_context()
+        (reader, writer) = await asyncio.open_connection(host, port, ssl=ssl_context)
+        self.connections_opened += 1
+        return (reader, writer, False)
+
+    def _release(self, key, reader, writer):
+        idle = self.idle.setdefault(key, [])
+        if len(idle) < self.max_idle_per_host:
+            idle.append((reader, writer))
+        else:
+            writer.close()
+
+    @staticmethod
+    async def _read_response(reader, method, url):
+        status_line = await reader.readline()
+        if not status_line:
+            raise TransportError('connection closed without response')
+        try:
+            (version, status, reason) = (status_line.decode('latin-1').rstrip('\r\n').split(' ', 2) + [''])[:3]
+            status = int(status)
+        except ValueError:
+            raise TransportError('BadStatusLine: {0!r}'.format(status_line))
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            (name, _, value) = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+        if method.upper() == 'HEAD' or status in (204, 304) or 100 <= status < 200:
+            content = b''
+        elif 'chunked' in headers.get('transfer-encoding', '').lower():
+            chunks = []
+            while True:
+                line = await reader.readline()
+                try:
+                    size = int(line.split(b';')[0].strip(), 16)
+                except ValueError:
+                    raise TransportError('invalid chunk size line: {0!r}'.format(line))
+                if size == 0:
+                    # trailers
+                    while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                        pass
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readline()
+            content = b''.join(chunks)
+        elif 'content-length' in headers:
+            content = await reader.readexactly(int(headers['content-length']))
+        else:
+            content = await reader.read()
+            keep_alive = False
+        return AsyncResponse(url, status, reason, headers, content, keep_alive=keep_alive)
+
+    async def close(self):
+        for idle in self.idle.values():
+            for (_, writer) in idle:
+                writer.close()
+        self.idle = {}
+
+
+class AsyncRequestHandler(object):
+
+    # max requests in flight at once across all hosts
+    concurrency = 100
+    # default per request timeout secs
+    timeout = 10
+
+    def __init__(self, transport=None, concurrency=None, timeout=None):
+        self.url = None
+        self.transport = transport or StreamTransport()
+        if concurrency is not None:
+            self.concurrency = concurrency
+        if timeout is not None:
+            self.timeout = timeout
+        # created on first use in each event loop as it's bound to the loop, at creation on older Pythons,
+        # otherwise when first waited on, and run() uses a new loop each time
+        self.__semaphore = None
+        self.__semaphore_loop = None
+
+    @property
+    def semaphore(self):
+        # Python 3.7+
+        loop = getattr(asyncio, 'get_running_loop', asyncio.get_event_loop)()
+        if self.__semaphore is None or self.__semaphore_loop is not loop:
+            self.__semaphore = asyncio.Semaphore(self.concurrency)
+            self.__semaphore_loop = loop
+        return self.__semaphore
+
+    async def req(self, method, url, headers=None, data=None, timeout=None):
+        if '://' not in url:
+            url = 'http://' + url
+        self.url = url
+        req = await self._send(method, url, headers=headers, data=data, timeout=timeout)
+        self.log_output(req)
+        self.process_req(req)
+        return req
+
+    async def _send(self, method, url, headers=None, data=None, timeout=None):
+        if '://' not in url:
+            url = 'http://' + url
+        headers = dict(headers or {})
+        headers['User-Agent'] = get_topfile()
+        if timeout is None:
+            timeout = self.timeout
+        log.debug('%s %s', str(method).upper(), url)
+        req = None
+        async with self.semaphore:
+            start = time.time()
+            try:
+                req = await asyncio.wait_for(self.transport.request(method, url, headers=headers, body=data),
+                                             timeout)
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, TransportError) as _:
+                # the url of this request as the handler may have several in flight
+                _.url = url
+                self.exception_handler(_)
+            else:
+                req.elapsed = time.time() - start
+        return req
+
+    async def get(self, url, headers=None, timeout=None):
+        return await self.req('get', url, headers=headers, timeout=timeout)
+
+    async def put(self, url, data=None, headers=None, timeout=None):
+        return await self.req('put', url, headers=headers, data=data, timeout=timeout)
+
+    async def post(self, url, data=None, headers=None, timeout=None):
+        return await self.req('post', url, headers=headers, data=data, timeout=timeout)
+
+    async def head(self, url, headers=None, timeout=None):
+        return await self.req('head', url, headers=headers, timeout=timeout)
+
+    async def delete(self, url, headers=None, timeout=None):
+        return await self.req('delete', url, headers=headers, timeout=timeout)
+
+    async def req_many(self, method, urls, budget=None, **kwargs):
+        """
+        Requests all the urls concurrently, bounded by the semaphore, returning an OrderedDict of
+        url => RequestResult in the order given, with errors captured per url as in RequestHandler.get_many()
+
+        budget is the total secs allowed, requests still outstanding after it are cancelled with timeout errors
+        """
+        start = time.time()
+        results = OrderedDict()
+        for url in urls:
+            results[url] = RequestResult(url)
+        tasks = [asyncio.ensure_future(self._req_one(method, result, **kwargs)) for result in results.values()]
+        if not tasks:
+            return results
+        (_, pending) = await asyncio.wait(tasks, timeout=budget)
+        for task in pending:
+            task.cancel()
+        if pending:
+            # let the cancellations run so their connections are closed
+            await asyncio.wait(pending)
+        for (task, result) in zip(tasks, results.values()):
+            if task in pending:
+                result.error = CriticalError('request to {0} did not complete within the {1} secs budget'
+                                             .format(result.url, budget))
+        log.debug('%s requests in %.4f secs, %s failed', len(results), time.time() - start,
+                  len([_ for _ in results.values() if not _.ok]))
+        return results
+
+    async def get_many(self, urls, budget=None, **kwargs):
+        return await self.req_many('get', urls, budget=budget, **kwargs)
+
+    async def _req_one(self, method, result, **kwargs):
+        start = time.time()
+        try:
+            req = await self._send(method, result.url, **kwargs)
+            result.req = req
+            self.log_output(req)
+            self.check_response_code(req)
+            result.content = self.__parse__(req)
+            self.check_content(result.content)
+        except Exception as _:  # pylint: disable=broad-except
+            log.debug('%s %s failed: %s', str(method).upper(), result.url, _)
+            result.error = _
+        result.elapsed = time.time() - start
+        return result
+
+    def run(self, coroutine):
+        """
+        Runs a coroutine of this handler to completion in a new event loop from synchronous code, closing the
+        transport afterwards, eg. results = handler.run(handler.get_many(urls))
+        """
+        async def run_and_close():
+            try:
+                return await coroutine
+            finally:
+                await self.transport.close()
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(run_and_close())
+        finally:
+            loop.close()
+
+    def process_req(self, req):
+        self.check_response(req)
+        return req
+
+    def check_response(self, req):
+        self.check_response_code(req)
+        content = self.__parse__(req)
+        self.check_content(content)
+
+    def exception_handler(self, arg):  # pylint: disable=no-self-use
+        assert issubclass(type(arg), Exception)
+        errhint = ''
+        url = getattr(arg, 'url', None) or self.url
+        message = str(arg)
+        if isinstance(arg, asyncio.TimeoutError):
+            message = 'request to {0} timed out'.format(url)
+        elif 'BadStatusLine' in message:
+            errhint = ' (possibly connecting to an SSL secured port using plain HTTP?)'
+        elif url and 'https://' in url and ('unknown protocol' in message or 'WRONG_VERSION_NUMBER' in message):
+            errhint = ' (possibly connecting to a plain HTTP port with the -S / --ssl switch enabled?)'
+        raise CriticalError('{type}: {exception}{errhint}'.format(type=type(arg).__name__,
+                                                                  exception=message,
+                                                                  errhint=errhint))
+
+    def log_output(self, req):  # pylint: disable=no-self-use
+        log.debug("response: %s %s", req.status_code, req.reason)
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("content:\n%s\n%s\n%s", '=' * 80, req.content.strip(), '=' * 80)
+
+    def check_response_code(self, req):  # pylint: disable=no-self-use
+        if req.status_code != 200:
+            extra_info = ''
+            try:
+                json_data = json_loads(req.content)
+                for key in ('status', 'error', 'reason', 'message'):
+                    if key in json_data:
+                        extra_info += ', {key}: {info}'.format(key=key, info=json_data[key])
+            except (ValueError, TypeError):
+                log.debug('output is not json, not extracting additional error info')
+            raise CriticalError('{status} {reason}{extra_info}'\
+                                .format(status=req.status_code, reason=req.reason, extra_info=extra_info))
+
+    def check_content(self, content):  # pylint: disable=no-self-use
+        pass
+
+    def __parse__(self, req):
+        return self.parse(req)
+
+    def parse(self, req):  # pylint: disable=no-self-use
+        return req.content
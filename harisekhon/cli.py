@@ -28,18 +28,19 @@ from __future__ import print_function
 # import inspect
 import logging
 import os
+import re
 import signal
 import sys
 import time
 import traceback
 #import traceback
+from collections import OrderedDict
 from optparse import IndentedHelpFormatter
 from optparse import OptionParser
 from optparse import SUPPRESS_HELP
 # Python 2.6+ only
 from abc import ABCMeta, abstractmethod
-import _curses
-from blessings import Terminal
+# _curses and blessings are imported in __set_help_width() only when printing help
 # inspect.getfile(inspect.currentframe()) # filename
 # libdir = os.path.join(os.path.dirname(inspect.getfile(inspect.currentframe())), '..')
 libdir = os.path.join(os.path.dirname(__file__), '..')
@@ -47,12 +48,82 @@ sys.path.append(libdir)
 # pylint: disable=wrong-import-position
 import harisekhon
 from harisekhon.utils import log, getenvs2, isBlankOrNone, isInt, isHost, isPort, isStr, validate_int, plural
-from harisekhon.utils import CodingError, InvalidOptionException, ERRORS, qquit #, die
-from harisekhon.utils import get_topfile, get_file_docstring, get_file_github_repo, get_file_version
-from harisekhon.utils import CriticalError, WarningError, UnknownError
+from harisekhon.utils import CodingError, InvalidOptionException, ERRORS, qquit, capture_quit, QuitException #, die
+from harisekhon.utils import get_topfile, get_file_docstring, get_file_metadata
+from harisekhon.utils import CriticalError, WarningError, UnknownError, Deadline
 
 __author__ = 'Hari Sekhon'
-__version__ = '0.8.20'
+__version__ = '0.9.0'
+
+# nagios perfdata label=value[UOM];warn;crit;min;max, labels with spaces are quoted
+_perfdata_regex = re.compile(r"(?:'([^']+)'|([^\s=']+))=(-?\d+(?:\.\d+)?)?\S*")
+
+
+class CLIResult(object):
+    """
+    Result of CLI.main(return_result=True) in place of printing the status and message and exiting
+    """
+
+    def __init__(self, status, msg='', timings=None):
+        self.status = status
+        self.code = ERRORS[status]
+        msg = '{0}'.format(msg) if msg is not None else ''
+        self.perfdata = ''
+        if '|' in msg:
+            (msg, self.perfdata) = msg.split('|', 1)
+            self.perfdata = self.perfdata.strip()
+        self.msg = msg.strip()
+        # secs by name, eg. run
+        self.timings = timings if timings is not None else OrderedDict()
+
+    @classmethod
+    def from_exit(cls, exc, timings=None):
+        """ Returns the result of a QuitException, or of a SystemExit from sys.exit() being called directly """
+        if isinstance(exc, QuitException):
+            return cls(exc.status, exc.msg, timings=timings)
+        code = exc.code
+        msg = ''
+        if code is None:
+            code = 0
+        elif not isInt(code):
+            # sys.exit(msg) exits 1
+            (code, msg) = (1, code)
+        status = 'UNKNOWN'
+        for (name, value) in ERRORS.items():
+            if value == int(code):
+                status = name
+        return cls(status, msg, timings=timings)
+
+    @property
+    def output(self):
+        """ The line qquit() would have printed """
+        output = '{0}: {1}'.format(self.status, self.msg) if self.msg else self.status
+        if self.perfdata:
+            output += ' | ' + self.perfdata
+        return output
+
+    def get_perfdata(self):
+        """ Returns an OrderedDict of perfdata label => value, None where the value is unknown ('U') """
+        perfdata = OrderedDict()
+        for match in _perfdata_regex.finditer(self.perfdata):
+            value = match.group(3)
+            perfdata[match.group(1) or match.group(2)] = float(value) if value is not None else None
+        return perfdata
+
+    def __repr__(self):
+        return '{0}({1!r})'.format(self.__class__.__name__, self.output)
+
+
+# OptionParser exits on invalid options after printing the usage, see CLI.__parse_args__()
+class _OptionParser(OptionParser):
+
+    raise_errors = False
+
+    def error(self, msg):
+        if self.raise_errors:
+            raise InvalidOptionException(msg)
+        # Python 2 OptionParser is an old style class so can't use super()
+        OptionParser.error(self, msg)
 
 
 class CLI(object):
@@ -85,14 +156,21 @@ class CLI(object):
         self.__timeout_default = 10
         self.__timeout = None
         self.__timeout_max = 86400
+        # Deadline from the timeout for network calls to derive their timeouts from, None if there is no timeout
+        self.deadline = None
+        # secs of the timeout held back from the deadline for parsing and output, default 10% up to 1 sec
+        self.deadline_reserve = None
         self.__total_run_time = time.time()
+        # command line arguments to parse instead of sys.argv[1:], see main()
+        self.__argv = None
+        self.__return_result = False
         self.topfile = get_topfile()
-        self._docstring = get_file_docstring(self.topfile)
-        if self._docstring:
-            self._docstring = '\n' + self._docstring.strip() + '\n'
-        if self._docstring is None:
-            self._docstring = ''
-        self._topfile_version = get_file_version(self.topfile)
+        # docstring and usage message are only materialised if usage is printed, see properties below
+        self.__docstring = None
+        self.__usagemsg = None
+        # single pass over the top level program file, cached on disk
+        topfile_metadata = get_file_metadata(self.topfile)
+        self._topfile_version = topfile_metadata['version']
         # this doesn't work in unit tests
         # if self._topfile_version:
         #     raise CodingError('failed to get topfile version - did you set a __version__ in top cli program?')
@@ -101,17 +179,12 @@ class CLI(object):
         # returns 'python -m unittest' :-/
         # prog = os.path.basename(sys.argv[0])
         self._prog = os.path.basename(self.topfile)
-        self._github_repo = get_file_github_repo(self.topfile)
+        self._github_repo = topfile_metadata['github_repo']
         # _hidden attributes are shown in __dict__
         self.version = '{prog} version {topfile_version} '.format(prog=self._prog,
                                                                   topfile_version=self._topfile_version) + \
                        '=>  CLI version {cli_version} '.format(cli_version=self._cli_version) + \
                        '=>  Utils version {utils_version}'.format(utils_version=self._utils_version)
-        self.usagemsg = 'Hari Sekhon{sep}{github_repo}\n\n{prog}\n{docstring}\n'.format(\
-                            sep=' - ' if self._github_repo else '',
-                            github_repo=self._github_repo,
-                            prog=self._prog,
-                            docstring=self._docstring)
         self.usagemsg_short = 'Hari Sekhon%(_github_repo)s\n\n' % self.__dict__
         # set this in simpler client programs when you don't want to exclude
         # self.__parser = OptionParser(usage=self.usagemsg_short, version=self.version)
@@ -119,14 +192,9 @@ class CLI(object):
         # will be added by default_opts later so that it's not annoyingly at the top of the option help
         # also this allows us to print full docstring for a complete description and not just the cli switches
         # description=self._docstring # don't want description printed for option errors
-        width = os.getenv('COLUMNS', None)
-        if not isInt(width) or not width:
-            try:
-                width = Terminal().width
-            except _curses.error:
-                width = 80
-        #width = min(width, 200)
-        self.__parser = OptionParser(add_help_option=False, formatter=IndentedHelpFormatter(width=width))
+        # terminal width for the help formatter is only resolved when help is printed, see __set_help_width(),
+        # as most runs are non-interactive and never print it. Explicit width stops optparse probing it meanwhile
+        self.__parser = _OptionParser(add_help_option=False, formatter=IndentedHelpFormatter(width=80))
         # duplicate key error or duplicate options, sucks
         # self.__parser.add_option('-V', dest='version', help='Show version and exit', action='store_true')
         self.setup()
@@ -134,7 +202,42 @@ class CLI(object):
     def setup(self):
         pass
 
-    def main(self):
+    @property
+    def _docstring(self):
+        if self.__docstring is None:
+            docstring = get_file_docstring(self.topfile)
+            if docstring:
+                docstring = '\n' + docstring.strip() + '\n'
+            if docstring is None:
+                docstring = ''
+            self.__docstring = docstring
+        return self.__docstring
+
+    @property
+    def usagemsg(self):
+        if self.__usagemsg is None:
+            self.__usagemsg = 'Hari Sekhon{sep}{github_repo}\n\n{prog}\n{docstring}\n'.format(\
+                                  sep=' - ' if self._github_repo else '',
+                                  github_repo=self._github_repo,
+                                  prog=self._prog,
+                                  docstring=self._docstring)
+        return self.__usagemsg
+
+    @usagemsg.setter
+    def usagemsg(self, msg):
+        self.__usagemsg = msg
+
+    def main(self, argv=None, return_result=False):
+        """
+        Parses argv, sys.argv[1:] by default, and runs the program, printing the status and message and exiting
+
+        With return_result, returns a CLIResult of them instead, restoring the timeout alarm handler and log level
+        afterwards, so that many programs can be run in one process, see harisekhon.nagiosplugin.CheckRunner.
+        Construct a new instance for each run. Must be called from the main thread if there is a timeout
+        """
+        self.__argv = argv
+        if return_result and not self.__return_result:
+            return self.__main_result__()
         # DEBUG env var is picked up immediately in pylib utils, do not override it here if so
         if os.getenv('DEBUG'):
             log.setLevel(logging.DEBUG)
@@ -161,6 +264,11 @@ class CLI(object):
                 log.debug('setting timeout alarm (%s)', self.timeout)
                 signal.signal(signal.SIGALRM, self.timeout_handler)
                 signal.alarm(int(self.timeout))
+                if self.timeout:
+                    reserve = self.deadline_reserve
+                    if reserve is None:
+                        reserve = min(1, self.timeout / 10.0)
+                    self.deadline = Deadline(self.timeout, reserve=reserve)
             # if self.options.version:
             #     print(self.version)
             #     sys.exit(ERRORS['UNKNOWN'])
@@ -180,6 +288,8 @@ class CLI(object):
                 log.debug(traceback.format_exc())
             self.usage(_)  # pragma: no cover
         except KeyboardInterrupt:
+            if self.__return_result:
+                raise
             # log.debug('Caught control-c...')
             print('Caught control-c...')  # pragma: no cover
         #except Exception as _:  # pylint: disable=broad-except
@@ -189,14 +299,62 @@ class CLI(object):
         #        log.debug(traceback.format_exc())
         #    die('{exception_type}: {msg}'.format(exception_type=exception_type, msg=_))
 
+    def __main_result__(self):
+        start = time.time()
+        log_level = log.level
+        alarm_handler = signal.getsignal(signal.SIGALRM)
+        self.__return_result = True
+        self.__parser.raise_errors = True
+        result = None
+        try:
+            with capture_quit():
+                # the subclass' main() as NagiosPlugin's handles exceptions from run()
+                self.main(self.__argv)
+            # returned without quitting, eg. a CLI which only prints
+            result = CLIResult('OK', timings=self.result_timings())
+        except SystemExit as _:
+            result = CLIResult.from_exit(_, timings=self.result_timings())
+        finally:
+            signal.alarm(0)
+            signal.signal(signal.SIGALRM, alarm_handler)
+            log.setLevel(log_level)
+            self.__return_result = False
+            self.__parser.raise_errors = False
+        result.timings['run'] = time.time() - start
+        return result
+
+    def result_timings(self):  # pylint: disable=no-self-use
+        """ Override to add timings in secs to the CLIResult from main(return_result=True) """
+        return OrderedDict()
+
     def usage(self, msg='', status='UNKNOWN'):
+        if msg and self.__return_result:
+            # the result's message rather than printing the usage
+            qquit(status, msg)
         if msg:
             print('%s\n' % msg)
         else:
             print(self.usagemsg)
+        self.__set_help_width()
         self.__parser.print_help()
         qquit(status)
 
+    def __set_help_width(self):
+        width = os.getenv('COLUMNS', None)
+        if isInt(width) and int(width):
+            width = int(width)
+        else:
+            import _curses
+            from blessings import Terminal
+            try:
+                width = Terminal().width
+            except _curses.error:
+                width = 80
+        #width = min(width, 200)
+        formatter = IndentedHelpFormatter(width=width)
+        formatter.set_parser(self.__parser)
+        self.__parser.formatter = formatter
+
     def no_args(self):
         if self.args:
             self.usage('invalid non-switch arguments supplied on command line')
@@ -233,6 +391,7 @@ class CLI(object):
         log.info('disabling timeout')
         self.timeout = 0
         signal.alarm(0)
+        self.deadline = None
 
     @property
     def timeout(self):
@@ -246,6 +405,13 @@ class CLI(object):
         log.debug('setting timeout to %s secs', secs)
         self.__timeout = int(secs)
 
+    @property
+    def timeout_remaining(self):
+        """Secs left before the timeout alarm goes off, None if there is no timeout"""
+        if self.deadline is None:
+            return None
+        return max(self.deadline.end - time.time(), 0)
+
     @property
     def timeout_default(self):
         return self.__timeout_default
@@ -324,7 +490,7 @@ class CLI(object):
 
     def __parse_args__(self):
         try:
-            (self.options, self.args) = self.__parser.parse_args()
+            (self.options, self.args) = self.__parser.parse_args(self.__argv)
         # I don't agree with zero exit code from OptionParser for help/usage,
         # and want UNKNOWN not CRITICAL(2) for switch mis-usage...
         except SystemExit:  # pragma: no cover
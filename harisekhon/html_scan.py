@@ -0,0 +1,237 @@
+#!/usr/bin/env python
+#  vim:ts=4:sts=4:sw=4:et
+#
+#  Author: Hari Sekhon
+#  Date: 2026-10-19 00:58:03 +0100 (Mon, 19 Oct 2026)
+#
+#  https://github.com/harisekhon/pylib
+#
+#  License: see accompanying Hari Sekhon LICENSE file
+#
+#  If you're using my code you're welcome to connect with me on LinkedIn and optionally send me feedback
+#  to help improve or steer this or other code I publish
+#
+#  https://www.linkedin.com/in/harisekhon
+#
+
+"""
+
+HTML Label Scanner - pulls 'label => value' pairs out of HTML status pages, eg. the td following the
+                     '<th>Uptime:</th>' header cell, without building a tree of the document
+
+Rules are a dict of name => label, where the label is a string matching the whole text of the label element,
+whitespace normalized, or a compiled regex searched for in it. The value is the text of the label element's next
+sibling element, stripped, as BeautifulSoup's find_next_sibling().get_text().strip() would give
+
+The document is scanned from an iterable of str or bytes chunks, eg. RequestHandler.iter_content(req), with the
+stdlib HTMLParser, which only holds the unparsed remainder of the current chunk. Only the names of the open
+elements and the text of candidate labels and matched values are kept, so memory is bounded by the nesting
+depth rather than the size of the page. Scanning stops as soon as every rule has matched, the first match of each
+wins. Text within script and style elements and comments is ignored, unclosed table cells, rows, list items and
+definition terms are closed implicitly as browsers do
+
+Pure stdlib
+
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+#from __future__ import unicode_literals
+
+import codecs
+import os
+import sys
+import traceback
+try:
+    from html.parser import HTMLParser
+except ImportError:
+    from HTMLParser import HTMLParser  # pylint: disable=import-error
+libdir = os.path.abspath(os.path.join(os.path.dirname(__file__), 'pylib'))
+sys.path.append(libdir)
+try:
+    # pylint: disable=wrong-import-position
+    from harisekhon.utils import isStr, CodingError
+except ImportError as _:
+    print(traceback.format_exc(), end='')
+    sys.exit(4)
+
+__author__ = 'Hari Sekhon'
+__version__ = '0.1'
+
+# elements which never have content or an end tag
+_void_tags = frozenset(('area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'keygen', 'link', 'meta',
+                        'param', 'source', 'track', 'wbr'))
+# start tag => (open elements it implicitly closes, elements bounding the search for them)
+_implied_end_tags = {
+    'td': (('td', 'th'), ('tr', 'table')),
+    'th': (('td', 'th'), ('tr', 'table')),
+    'tr': (('tr',), ('table',)),
+    'dt': (('dt', 'dd'), ('dl',)),
+    'dd': (('dt', 'dd'), ('dl',)),
+    'li': (('li',), ('ul', 'ol')),
+}
+
+
+class _Done(Exception):
+    pass
+
+
+class _Capture(object):
+
+    def __init__(self, names=None, max_length=None):
+        # names of the rules this is the value of, None for a candidate label
+        self.names = names
+        self.max_length = max_length
+        self.text = []
+        self.length = 0
+
+    def add(self, text):
+        if self.max_length is not None:
+            if self.length > self.max_length:
+                return
+            self.length += len(text)
+        self.text.append(text)
+
+    def get_text(self):
+        return ''.join(self.text)
+
+
+class HTMLLabelScanner(HTMLParser):  # pylint: disable=abstract-method
+
+    # elements whose text may be a label, most status pages use th or td cells, dt terms or bold text
+    label_tags = ('th', 'td', 'dt', 'dd', 'li', 'b', 'strong', 'label', 'span')
+    # longer text isn't considered as a label, bounds the text held for elements which turn out to be layout
+    max_label_length = 256
+
+    def __init__(self, rules, label_tags=None):
+        # Python 2 HTMLParser is an old style class so can't use super()
+        try:
+            HTMLParser.__init__(self, convert_charrefs=True)
+        except TypeError:
+            # Python 2, entities are converted by handle_entityref() / handle_charref() below
+            HTMLParser.__init__(self)
+        if not isinstance(rules, dict) or not rules:
+            raise CodingError('rules must be a non-empty dict of name => label string or regex')
+        self.rules = []
+        for (name, label) in rules.items():
+            if isStr(label):
+                label = ' '.join(label.split())
+            elif not hasattr(label, 'search'):
+                raise CodingError("invalid label for rule '{0}', must be a string or compiled regex".format(name))
+            self.rules.append((name, label))
+        if label_tags is not None:
+            self.label_tags = label_tags
+        self.label_tags = frozenset(self.label_tags)
+        self.found = {}
+        # open elements as [tag, capture or None]
+        self.stack = []
+        self.captures = []
+        # (rule names, stack depth) waiting for the next sibling element after a matched label
+        self.pending = None
+
+    def scan(self, chunks, encoding='utf-8'):
+        """
+        Returns a dict of name => value for the rules matched in the HTML document read from chunks
+
+        bytes chunks are decoded with encoding
+        """
+        decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        try:
+            for chunk in chunks:
+                if isinstance(chunk, bytes):
+                    chunk = decoder.decode(chunk)
+                self.feed(chunk)
+            self.feed(decoder.decode(b'', final=True))
+            self.close()
+            # elements left open at the end of the document, eg. the last cell of a truncated page
+            self._pop(0)
+        except _Done:
+            pass
+        return self.found
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _void_tags:
+            return
+        if tag in _implied_end_tags:
+            (closes, bounds) = _implied_end_tags[tag]
+            for i in range(len(self.stack) - 1, -1, -1):
+                if self.stack[i][0] in bounds:
+                    break
+                if self.stack[i][0] in closes:
+                    self._pop(i)
+                    break
+        capture = None
+        if self.pending is not None and len(self.stack) == self.pending[1]:
+            capture = _Capture(names=self.pending[0])
+            self.pending = None
+        elif tag in self.label_tags:
+            capture = _Capture(max_length=self.max_label_length)
+        if capture is not None:
+            self.captures.append(capture)
+        self.stack.append([tag, capture])
+
+    def handle_startendtag(self, tag, attrs):
+        # self closing, eg. <br/>, has no content
+        pass
+
+    def handle_endtag(self, tag):
+        for i in range(len(self.stack) - 1, -1, -1):
+            if self.stack[i][0] == tag:
+                self._pop(i)
+                return
+        # stray end tag, ignored as browsers do
+
+    def _pop(self, index):
+        """ Closes the open elements from index, finishing their captures innermost first """
+        while len(self.stack) > index:
+            capture = self.stack.pop()[1]
+            if capture is not None:
+                self.captures.remove(capture)
+                self._finish(capture)
+        if self.pending is not None and len(self.stack) < self.pending[1]:
+            # the label's parent closed without another element, there's no value
+            self.pending = None
+
+    def _finish(self, capture):
+        if capture.names is not None:
+            value = capture.get_text().strip()
+            for name in capture.names:
+                self.found[name] = value
+            if len(self.found) == len(self.rules):
+                raise _Done()
+            return
+        if capture.length > self.max_label_length:
+            return
+        text = ' '.join(capture.get_text().split())
+        names = []
+        for (name, label) in self.rules:
+            if name in self.found:
+                continue
+            if (label == text) if isStr(label) else label.search(text):
+                names.append(name)
+        if names:
+            # the element is closed, the value is the next element opened at its depth
+            self.pending = (names, len(self.stack))
+
+    def handle_data(self, data):
+        if not self.captures or (self.stack and self.stack[-1][0] in ('script', 'style')):
+            return
+        for capture in self.captures:
+            capture.add(data)
+
+    def handle_entityref(self, name):
+        # Python 2 only
+        self.handle_data(self.unescape('&{0};'.format(name)))  # pylint: disable=no-member
+
+    def handle_charref(self, name):
+        # Python 2 only
+        self.handle_data(self.unescape('&#{0};'.format(name)))  # pylint: disable=no-member
+
+
+def scan_html(chunks, rules, encoding='utf-8', label_tags=None):
+    """
+    Returns a dict of name => value for the rules of name => label matched in the HTML document read from the
+    iterable of str / bytes chunks
+    """
+    return HTMLLabelScanner(rules, label_tags=label_tags).scan(chunks, encoding=encoding)
@@ -0,0 +1,236 @@
+#!/usr/bin/env python
+#  vim:ts=4:sts=4:sw=4:et
+#
+#  Author: Hari Sekhon
+#  Date: 2026-10-18 21:36:52 +0100 (Sun, 18 Oct 2026)
+#
+#  https://github.com/harisekhon/pylib
+#
+#  License: see accompanying Hari Sekhon LICENSE file
+#
+#  If you're using my code you're welcome to connect with me on LinkedIn and optionally send me feedback
+#  to help improve or steer this or other code I publish
+#
+#  https://www.linkedin.com/in/harisekhon
+#
+
+"""
+
+HTTP Cache Class - on disk cache of GET responses shared between processes, eg. several Nagios instances and
+                   scripts polling the same REST endpoints within seconds of each other
+
+Entries are fresh for ttl secs after being fetched, after which they are revalidated with a conditional request
+using If-None-Match / If-Modified-Since from their ETag / Last-Modified, so an unchanged document costs the
+service a 304 rather than generating the body again
+
+An exclusive lock per entry is held while fetching so that concurrent processes with a missing or stale entry
+wait for the first one to fetch it rather than all hitting the service. Entries are written to a temp file and
+renamed so readers never need the lock. Locking is skipped on platforms without fcntl
+
+Responses may be to authenticated requests, so the cache dir is created only accessible by the user and entries
+and lock files only readable by them. Entries are keyed on the credentials and request headers too, requests with
+auth objects other than requests' own basic / digest / proxy auth aren't cached
+
+Used by RequestHandler when its cache attribute is set
+
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+#from __future__ import unicode_literals
+
+import hashlib
+import json
+import os
+import sys
+import time
+import traceback
+from contextlib import contextmanager
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+try:
+    import requests
+    from requests.structures import CaseInsensitiveDict
+except ImportError:
+    print(traceback.format_exc(), end='')
+    sys.exit(4)
+libdir = os.path.abspath(os.path.join(os.path.dirname(__file__), 'pylib'))
+sys.path.append(libdir)
+try:
+    # pylint: disable=wrong-import-position
+    from harisekhon.utils import log, get_cache_dir
+except ImportError as _:
+    print(traceback.format_exc(), end='')
+    sys.exit(4)
+
+__author__ = 'Hari Sekhon'
+__version__ = '0.2'
+
+
+class HTTPCache(object):
+
+    # response headers kept with the cached body, not Content-Encoding as requests has already decoded it
+    headers = ('Content-Type', 'ETag', 'Last-Modified', 'Cache-Control')
+
+    def __init__(self, ttl=60, cache_dir=None):
+        self.ttl = ttl
+        self.cache_dir = cache_dir or os.path.join(get_cache_dir(), 'http')
+
+    # request headers left out of the key as they don't change the document, User-Agent is the calling program,
+    # Connection depends on the handler's keep_alive and the others are added to revalidate entries
+    unkeyed_headers = ('user-agent', 'connection', 'if-none-match', 'if-modified-since')
+    # auth objects whose credentials are all in their username and password
+    keyable_auth_classes = (requests.auth.HTTPBasicAuth, requests.auth.HTTPDigestAuth, requests.auth.HTTPProxyAuth)
+
+    @classmethod
+    def key(cls, url, params=None, auth=None, headers=None):
+        """
+        Returns the cache key for a request, or None if it mustn't be cached as its auth can't be keyed
+
+        The credentials and request headers, eg. Authorization, tokens or Accept, are part of the key so documents
+        are never served to a caller using different credentials or asking for a different representation. These
+        are keyed on their values, not their reprs, as those of objects include memory addresses so would never
+        match in another process
+        """
+        auth = cls.get_auth_key(auth)
+        if auth is None:
+            return None
+        if hasattr(params, 'items'):
+            params = sorted(params.items())
+        _ = hashlib.sha256()
+        for part in (url, params, auth, cls.get_headers_key(headers)):
+            _.update(repr(part).encode('utf-8'))
+            _.update(b'\0')
+        return _.hexdigest()
+
+    @classmethod
+    def get_auth_key(cls, auth):
+        """ Returns a tuple of the auth type and credentials, or None if they can't be determined """
+        if auth is None:
+            return ()
+        # requests sends (user, password) tuples as basic auth
+        if isinstance(auth, (tuple, list)):
+            return ('HTTPBasicAuth',) + tuple(auth)
+        # not isinstance() as subclasses may hold other credentials
+        if type(auth) in cls.keyable_auth_classes:  # pylint: disable=unidiomatic-typecheck
+            return (type(auth).__name__, auth.username, auth.password)
+        return None
+
+    @classmethod
+    def get_headers_key(cls, headers):
+        """ Returns the headers as a sorted tuple of (lowercased name, value) without the unkeyed_headers """
+        return tuple(sorted([(str(name).strip().lower(), str(value).strip())
+                             for (name, value) in (headers or {}).items()
+                             if value is not None and str(name).strip().lower() not in cls.unkeyed_headers]))
+
+    def get_filename(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def lookup(self, key):
+        """ Returns the cache entry dict for key or None if there isn't a readable one """
+        try:
+            with open(self.get_filename(key), 'rb') as _:
+                meta = json.loads(_.readline().decode('utf-8'))
+                meta['content'] = _.read()
+        except (IOError, OSError, ValueError):
+            return None
+        return meta
+
+    def is_fresh(self, entry):
+        return entry is not None and time.time() - entry['time'] < self.ttl
+
+    @staticmethod
+    def get_conditional_headers(entry):
+        headers = {}
+        if entry['headers'].get('ETag'):
+            headers['If-None-Match'] = entry['headers']['ETag']
+        if entry['headers'].get('Last-Modified'):
+            headers['If-Modified-Since'] = entry['headers']['Last-Modified']
+        return headers
+
+    @staticmethod
+    def is_storable(req):
+        return req.status_code == 200 and 'no-store' not in req.headers.get('Cache-Control', '')
+
+    def store(self, key, req, content):
+        """ Stores the response with its already read body, failures are logged and ignored """
+        entry = {
+            'url': req.url,
+            'status_code': req.status_code,
+            'reason': req.reason,
+            'headers': dict([(_, req.headers[_]) for _ in self.headers if _ in req.headers]),
+            'time': time.time()
+        }
+        return self.__write(key, entry, content)
+
+    def refresh(self, key, entry):
+        """ Restarts the ttl of an entry the server has confirmed is unchanged """
+        entry = dict(entry)
+        content = entry.pop('content')
+        entry['time'] = time.time()
+        return self.__write(key, entry, content)
+
+    def make_cache_dir(self):
+        if not os.path.isdir(self.cache_dir):
+            os.makedirs(self.cache_dir, 0o700)
+
+    @staticmethod
+    def open_private(filename, flags, mode):
+        """ Opens filename, creating it readable only by the user """
+        return os.fdopen(os.open(filename, os.O_WRONLY | os.O_CREAT | flags, 0o600), mode)
+
+    def __write(self, key, entry, content):
+        filename = self.get_filename(key)
+        tmp_filename = '{0}.{1}.tmp'.format(filename, os.getpid())
+        try:
+            self.make_cache_dir()
+            with self.open_private(tmp_filename, os.O_TRUNC, 'wb') as _:
+                _.write(json.dumps(entry).encode('utf-8') + b'\n')
+                _.write(content)
+            os.rename(tmp_filename, filename)
+            return True
+        except (IOError, OSError) as _:
+            log.debug("failed to write http cache entry '%s': %s", filename, _)
+            try:
+                os.remove(tmp_filename)
+            except OSError:
+                pass
+        return False
+
+    @contextmanager
+    def lock(self, key):
+        lock_file = None
+        if fcntl is not None:
+            try:
+                self.make_cache_dir()
+                lock_file = self.open_private(self.get_filename(key) + '.lock', os.O_APPEND, 'a')
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            except (IOError, OSError) as _:
+                log.debug('failed to lock http cache entry %s, continuing without lock: %s', key, _)
+                if lock_file is not None:
+                    lock_file.close()
+                    lock_file = None
+        try:
+            yield
+        finally:
+            if lock_file is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+                lock_file.close()
+
+    @staticmethod
+    def response(entry):
+        """ Returns a requests.Response for the cache entry """
+        req = requests.Response()
+        req.url = entry['url']
+        req.status_code = entry['status_code']
+        req.reason = entry['reason']
+        req.headers = CaseInsensitiveDict(entry['headers'])
+        req.encoding = requests.utils.get_encoding_from_headers(req.headers)
+        # pylint: disable=protected-access
+        req._content = entry['content']
+        req._content_consumed = True
+        req.from_cache = True
+        return req
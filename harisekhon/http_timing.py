@@ -0,0 +1,239 @@
+#!/usr/bin/env python
+#  vim:ts=4:sts=4:sw=4:et
+#
+#  Author: Hari Sekhon
+#  Date: 2026-10-19 00:12:37 +0100 (Mon, 19 Oct 2026)
+#
+#  https://github.com/harisekhon/pylib
+#
+#  License: see accompanying Hari Sekhon LICENSE file
+#
+#  If you're using my code you're welcome to connect with me on LinkedIn and optionally send me feedback
+#  to help improve or steer this or other code I publish
+#
+#  https://www.linkedin.com/in/harisekhon
+#
+
+"""
+
+HTTP Timing - per phase timings of requests made via the requests module, to tell whether a slow response is
+              down to name resolution, the network, the TLS handshake, the server or the size of the body
+
+Mount TimedHTTPAdapter on a requests.Session, as RequestHandler does when its phase_timings attribute is set,
+and get_timings(response) returns an HTTPTimings of the phases in secs:
+
+    dns      - name resolution
+    connect  - TCP connect
+    tls      - TLS handshake, None for plain http
+    ttfb     - time to first byte, from sending the request to having received the response headers
+    transfer - reading the body, set once it has been read
+
+dns, connect and tls are 0 when a kept alive connection was reused
+
+Measured with a monotonic clock where available
+
+Name resolution is timed separately from the connect by overriding urllib3's private HTTPConnection._new_conn()
+and _dns_host, which is only done for the urllib3 versions it's known to work with, 1.25 to 2.x. With others the
+DNS time is included in the connect time and dns is 0
+
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+#from __future__ import unicode_literals
+
+import socket
+import sys
+import time
+import traceback
+from collections import OrderedDict
+try:
+    from requests.adapters import HTTPAdapter
+    # pylint: disable=wrong-import-order
+    import urllib3
+    from urllib3 import poolmanager
+    from urllib3.connection import HTTPConnection, HTTPSConnection
+    from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+    from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+    from urllib3.util.connection import allowed_gai_family
+except ImportError:
+    print(traceback.format_exc(), end='')
+    sys.exit(4)
+
+__author__ = 'Hari Sekhon'
+__version__ = '0.2'
+
+# Python 3.3+, not affected by system clock changes
+_clock = getattr(time, 'monotonic', time.time)
+
+
+def _version_tuple(version):
+    parts = []
+    for part in version.split('.')[:2]:
+        digits = ''.join([_ for _ in part if _.isdigit()])
+        parts.append(int(digits) if digits else 0)
+    return tuple(parts)
+
+# see TimedConnectionMixin._new_conn()
+_time_dns = (1, 25) <= _version_tuple(urllib3.__version__) < (3, 0)
+
+
+class HTTPTimings(object):
+
+    phases = ('dns', 'connect', 'tls', 'ttfb', 'transfer')
+
+    def __init__(self):
+        self.dns = None
+        self.connect = None
+        self.tls = None
+        self.ttfb = None
+        self.transfer = None
+        # False if a new connection was made for the request
+        self.reused = True
+        self.headers_at = None
+
+    def finish(self):
+        """ Records the transfer time, called once the body has been read """
+        if self.transfer is None and self.headers_at is not None:
+            self.transfer = _clock() - self.headers_at
+
+    def as_dict(self):
+        """ Returns an OrderedDict of phase => secs for the phases measured """
+        return OrderedDict([(_, getattr(self, _)) for _ in self.phases if getattr(self, _) is not None])
+
+    def __repr__(self):
+        return '{0}({1}{2})'.format(self.__class__.__name__,
+                                    ', '.join(['{0}={1:.4f}'.format(*_) for _ in self.as_dict().items()]),
+                                    ', reused' if self.reused else '')
+
+
+class TimedConnectionMixin(object):
+
+    is_tls = False
+    # HTTPTimings of the current request
+    timings = None
+    _connect_timings = None
+    _connected_at = None
+    _request_start = None
+
+    def _new_conn(self):
+        # resolves the host here to time it separately from the connect, then has urllib3 connect to each address
+        # in turn as it would have done itself, keeping its error handling and socket options
+        dns_host = getattr(self, '_dns_host', None)
+        if not _time_dns or dns_host is None:
+            return super(TimedConnectionMixin, self)._new_conn()
+        start = _clock()
+        try:
+            addresses = socket.getaddrinfo(dns_host.strip('[]'), self.port, allowed_gai_family(), socket.SOCK_STREAM)
+        except (socket.gaierror, UnicodeError):
+            # left to urllib3 to raise its usual error
+            return super(TimedConnectionMixin, self)._new_conn()
+        if not addresses:
+            return super(TimedConnectionMixin, self)._new_conn()
+        resolved = _clock()
+        error = None
+        try:
+            for address in OrderedDict([(_[4][0], None) for _ in addresses]):
+                self._dns_host = address
+                try:
+                    sock = super(TimedConnectionMixin, self)._new_conn()
+                except (NewConnectionError, ConnectTimeoutError) as _:
+                    error = _
+                    continue
+                self._connect_timings = {'dns': resolved - start, 'connect': _clock() - resolved}
+                return sock
+        finally:
+            self._dns_host = dns_host
+        raise error
+
+    def connect(self):
+        start = _clock()
+        super(TimedConnectionMixin, self).connect()
+        self._connected_at = _clock()
+        if self._connect_timings is None:
+            self._connect_timings = {'dns': 0.0, 'connect': self._connected_at - start}
+        if self.is_tls:
+            self._connect_timings['tls'] = max(self._connected_at - start - self._connect_timings['dns']
+                                               - self._connect_timings['connect'], 0.0)
+
+    def request(self, *args, **kwargs):
+        # plain http connections are made within this
+        self.timings = HTTPTimings()
+        self._request_start = _clock()
+        return super(TimedConnectionMixin, self).request(*args, **kwargs)
+
+    def request_chunked(self, *args, **kwargs):
+        self.timings = HTTPTimings()
+        self._request_start = _clock()
+        return super(TimedConnectionMixin, self).request_chunked(*args, **kwargs)
+
+    def getresponse(self, *args, **kwargs):
+        response = super(TimedConnectionMixin, self).getresponse(*args, **kwargs)
+        now = _clock()
+        timings = self.timings or HTTPTimings()
+        self.timings = None
+        # from when the request was sent, after any connect
+        sent = max(self._request_start or now, self._connected_at or 0)
+        timings.ttfb = now - sent
+        timings.headers_at = now
+        if self._connect_timings is not None:
+            timings.reused = False
+            timings.dns = self._connect_timings['dns']
+            timings.connect = self._connect_timings['connect']
+            timings.tls = self._connect_timings.get('tls')
+            self._connect_timings = None
+        else:
+            timings.dns = 0.0
+            timings.connect = 0.0
+            if self.is_tls:
+                timings.tls = 0.0
+        response.timings = timings
+        return response
+
+
+class TimedHTTPConnection(TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(TimedConnectionMixin, HTTPSConnection):
+    is_tls = True
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+pool_classes_by_scheme = {
+    'http': TimedHTTPConnectionPool,
+    'https': TimedHTTPSConnectionPool,
+}
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+
+    def init_poolmanager(self, *args, **kwargs):
+        super(TimedHTTPAdapter, self).init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = pool_classes_by_scheme
+
+    def proxy_manager_for(self, proxy, **proxy_kwargs):
+        manager = super(TimedHTTPAdapter, self).proxy_manager_for(proxy, **proxy_kwargs)
+        # not SOCKS proxies, which have their own connection classes
+        if manager.pool_classes_by_scheme is poolmanager.pool_classes_by_scheme:
+            manager.pool_classes_by_scheme = pool_classes_by_scheme
+        return manager
+
+
+def get_timings(response):
+    """ Returns the HTTPTimings of a requests.Response made via TimedHTTPAdapter, otherwise None """
+    raw = getattr(response, 'raw', None)
+    # urllib3 < 2 wraps the http.client response the timings are set on
+    for _ in (raw, getattr(raw, '_original_response', None)):
+        timings = getattr(_, 'timings', None)
+        if isinstance(timings, HTTPTimings):
+            return timings
+    return None
@@ -0,0 +1,279 @@
+#!/usr/bin/env python
+#  vim:ts=4:sts=4:sw=4:et
+#
+#  Author: Hari Sekhon
+#  Date: 2026-10-18 22:47:19 +0100 (Sun, 18 Oct 2026)
+#
+#  https://github.com/harisekhon/pylib
+#
+#  License: see accompanying Hari Sekhon LICENSE file
+#
+#  If you're using my code you're welcome to connect with me on LinkedIn and optionally send me feedback
+#  to help improve or steer this or other code I publish
+#
+#  https://www.linkedin.com/in/harisekhon
+#
+
+"""
+
+Incremental JSON path extraction - pulls a few values out of a large JSON document, eg. a /jmx or cluster node
+                                   listing REST response, without parsing or holding all of it
+
+Paths are dotted strings of object keys and array indices, eg. 'clusterName' or 'beans.0.HeapMemoryUsage.used',
+or tuples / lists of the same components for keys containing dots. The value at each path is decoded in full,
+so a path may also select an object or array
+
+The document is read from an iterable of str or bytes chunks, eg. RequestHandler.iter_content(req). Everything
+else is skipped using regex searches, which run in C, rather than decoded, and consumed chunks are discarded,
+so memory is bounded by the chunk size plus the largest selected value. Reading stops as soon as all the paths
+have been found. Where an object has duplicate keys the first is used
+
+Pure stdlib
+
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+#from __future__ import unicode_literals
+
+import codecs
+import os
+import re
+import sys
+import traceback
+libdir = os.path.abspath(os.path.join(os.path.dirname(__file__), 'pylib'))
+sys.path.append(libdir)
+try:
+    # pylint: disable=wrong-import-position
+    from harisekhon.utils import isStr, json_loads
+except ImportError as _:
+    print(traceback.format_exc(), end='')
+    sys.exit(4)
+
+__author__ = 'Hari Sekhon'
+__version__ = '0.1'
+
+_whitespace_re = re.compile(r'[ \t\r\n]*')
+_string_re = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"', re.S)
+# up to the next bracket outside of a string
+_skip_re = re.compile(r'[^"\[\]{}]*(?:"[^"\\]*(?:\\.[^"\\]*)*"[^"\[\]{}]*)*', re.S)
+# numbers, true, false, null
+_scalar_re = re.compile(r'[^ \t\r\n,\]}]*')
+
+
+class _Done(Exception):
+    pass
+
+
+def split_json_path(path):
+    if isStr(path):
+        return tuple(path.split('.'))
+    return tuple([str(_) for _ in path])
+
+
+class JSONPathExtractor(object):
+
+    def __init__(self, paths):
+        # original path => tuple of components
+        self.paths = dict([(path if isStr(path) else tuple(path), split_json_path(path)) for path in paths])
+        self.wanted = set(self.paths.values())
+        self.prefixes = set()
+        for path in self.wanted:
+            for i in range(len(path)):
+                self.prefixes.add(path[:i])
+        self.found = None
+        self.chunks = None
+        self.decoder = None
+        self.buf = ''
+        self.pos = 0
+        # start of a selected value being read, the buffer is kept from here rather than the current position
+        self.mark = None
+        self.eof = False
+
+    def extract(self, chunks):
+        """
+        Returns a dict of path => value for the paths found in the JSON document read from chunks
+        """
+        self.found = {}
+        self.chunks = iter(chunks)
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.buf = ''
+        self.pos = 0
+        self.mark = None
+        self.eof = False
+        if self.wanted:
+            try:
+                self._walk(())
+            except _Done:
+                pass
+        found = {}
+        for (path, components) in self.paths.items():
+            if components in self.found:
+                found[path] = self.found[components]
+        return found
+
+    def _fill(self):
+        """
+        Reads the next chunk into the buffer, discarding what has been consumed
+
+        Returns the number of chars the buffer was shifted left by, or None at the end of the document
+        """
+        while not self.eof:
+            try:
+                chunk = next(self.chunks)
+            except StopIteration:
+                self.eof = True
+                chunk = self.decoder.decode(b'', final=True)
+            else:
+                if isinstance(chunk, bytes):
+                    chunk = self.decoder.decode(chunk)
+            if not chunk:
+                continue
+            keep = self.pos if self.mark is None else self.mark
+            self.buf = self.buf[keep:] + chunk
+            self.pos -= keep
+            if self.mark is not None:
+                self.mark -= keep
+            return keep
+        return None
+
+    def _error(self, msg):
+        raise ValueError('invalid JSON: {0} near: {1}'.format(msg, self.buf[self.pos:self.pos + 40]))
+
+    def _peek(self):
+        """ Skips whitespace and returns the next char, None at the end of the document """
+        while True:
+            self.pos = _whitespace_re.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if self._fill() is None:
+                return None
+
+    def _expect(self, chars):
+        char = self._peek()
+        if char is None or char not in chars:
+            self._error('expected one of {0!r}, got {1!r}'.format(chars, char))
+        self.pos += 1
+        return char
+
+    def _walk(self, path):
+        char = self._peek()
+        if path in self.wanted:
+            value = self._decode_value()
+            self.found[path] = value
+            if path in self.prefixes:
+                self._found_within(path, value)
+            if len(self.found) == len(self.wanted):
+                raise _Done()
+        elif char == '{' and path in self.prefixes:
+            self.pos += 1
+            if self._peek() == '}':
+                self.pos += 1
+                return
+            while True:
+                if self._peek() != '"':
+                    self._error('expected object key')
+                key = self._decode_value()
+                self._expect(':')
+                self._walk(path + (key,))
+                if self._expect(',}') == '}':
+                    return
+        elif char == '[' and path in self.prefixes:
+            self.pos += 1
+            if self._peek() == ']':
+                self.pos += 1
+                return
+            index = 0
+            while True:
+                self._walk(path + (str(index),))
+                index += 1
+                if self._expect(',]') == ']':
+                    return
+        else:
+            self._skip_value()
+
+    def _found_within(self, path, value):
+        # other paths within a selected value
+        for wanted in self.wanted:
+            if len(wanted) <= len(path) or wanted[:len(path)] != path or wanted in self.found:
+                continue
+            subvalue = value
+            for component in wanted[len(path):]:
+                if isinstance(subvalue, dict) and component in subvalue:
+                    subvalue = subvalue[component]
+                elif isinstance(subvalue, list) and component.isdigit() and int(component) < len(subvalue):
+                    subvalue = subvalue[int(component)]
+                else:
+                    break
+            else:
+                self.found[wanted] = subvalue
+
+    def _decode_value(self):
+        self._peek()
+        self.mark = self.pos
+        try:
+            self._skip_value()
+            return json_loads(self.buf[self.mark:self.pos])
+        finally:
+            self.mark = None
+
+    def _skip_value(self):
+        char = self._peek()
+        if char is None:
+            self._error('unexpected end of document')
+        if char == '"':
+            self._skip_string()
+        elif char in '{[':
+            self._skip_container()
+        else:
+            self._skip_scalar()
+
+    def _skip_string(self):
+        # self.pos is at the opening quote
+        while True:
+            match = _string_re.match(self.buf, self.pos)
+            if match is not None:
+                self.pos = match.end()
+                return
+            # the rest of the string is in the next chunk
+            if self._fill() is None:
+                self._error('unterminated string')
+
+    def _skip_container(self):
+        depth = 0
+        while True:
+            # skips everything up to the next bracket outside of strings in one match
+            pos = _skip_re.match(self.buf, self.pos).end()
+            if pos >= len(self.buf) or self.buf[pos] == '"':
+                # reached the end of the buffer, possibly within a string which is kept to be matched again
+                self.pos = pos
+                if self._fill() is None:
+                    self._error('unterminated object or array')
+                continue
+            self.pos = pos + 1
+            if self.buf[pos] in '{[':
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    return
+
+    def _skip_scalar(self):
+        while True:
+            end = _scalar_re.match(self.buf, self.pos).end()
+            if end < len(self.buf) or self.eof:
+                if end == self.pos:
+                    self._error('unexpected character')
+                self.pos = end
+                return
+            # the scalar may continue in the next chunk
+            self._fill()
+
+
+def extract_json_paths(chunks, paths):
+    """
+    Returns a dict of path => value for those of the given paths found in the JSON document read from the
+    iterable of str / bytes chunks
+    """
+    return JSONPathExtractor(paths).extract(chunks)
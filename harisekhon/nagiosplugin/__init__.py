@@ -22,21 +22,48 @@ from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
 
-# enables 'from harisekhon.nagiosplugin import NagiosPlugin'
-from harisekhon.nagiosplugin.nagiosplugin import NagiosPlugin
-from harisekhon.nagiosplugin.keycheck_nagiosplugin import KeyCheckNagiosPlugin
-from harisekhon.nagiosplugin.keywrite_nagiosplugin import KeyWriteNagiosPlugin
-from harisekhon.nagiosplugin.livenodes_nagiosplugin import LiveNodesNagiosPlugin
-from harisekhon.nagiosplugin.deadnodes_nagiosplugin import DeadNodesNagiosPlugin
-from harisekhon.nagiosplugin.pubsub_nagiosplugin import PubSubNagiosPlugin
-from harisekhon.nagiosplugin.rest_nagiosplugin import RestNagiosPlugin
-from harisekhon.nagiosplugin.rest_version_nagiosplugin import RestVersionNagiosPlugin
-from harisekhon.nagiosplugin.status_nagiosplugin import StatusNagiosPlugin
-from harisekhon.nagiosplugin.version_nagiosplugin import VersionNagiosPlugin
-
-# enables 'from harisekhon.nagiosplugin import Threshold'
-from harisekhon.nagiosplugin.threshold import Threshold
-from harisekhon.nagiosplugin.threshold import InvalidThresholdException
-
-# pulls submodules in to 'from harisekhon import *'
-# __all__ = [ 'submodule1', 'submodule2' ]
+import importlib
+import sys
+
+# enables 'from harisekhon.nagiosplugin import NagiosPlugin' / 'from harisekhon.nagiosplugin import Threshold' etc.
+#
+# loaded lazily on first access via module __getattr__ below (PEP 562) so that using one plugin class doesn't
+# import all the others along with their dependencies such as requests for RestNagiosPlugin
+_lazy_imports = {
+    'NagiosPlugin': 'harisekhon.nagiosplugin.nagiosplugin',
+    'CheckRunner': 'harisekhon.nagiosplugin.check_runner',
+    'KeyCheckNagiosPlugin': 'harisekhon.nagiosplugin.keycheck_nagiosplugin',
+    'KeyWriteNagiosPlugin': 'harisekhon.nagiosplugin.keywrite_nagiosplugin',
+    'LiveNodesNagiosPlugin': 'harisekhon.nagiosplugin.livenodes_nagiosplugin',
+    'DeadNodesNagiosPlugin': 'harisekhon.nagiosplugin.deadnodes_nagiosplugin',
+    'PubSubNagiosPlugin': 'harisekhon.nagiosplugin.pubsub_nagiosplugin',
+    'RestNagiosPlugin': 'harisekhon.nagiosplugin.rest_nagiosplugin',
+    'RestVersionNagiosPlugin': 'harisekhon.nagiosplugin.rest_version_nagiosplugin',
+    'StatusNagiosPlugin': 'harisekhon.nagiosplugin.status_nagiosplugin',
+    'VersionNagiosPlugin': 'harisekhon.nagiosplugin.version_nagiosplugin',
+    'Threshold': 'harisekhon.nagiosplugin.threshold',
+    'InvalidThresholdException': 'harisekhon.nagiosplugin.threshold',
+}
+
+# pulls these in to 'from harisekhon.nagiosplugin import *'
+# str() as unicode_literals would break 'import *' on Python 2
+__all__ = [str(_) for _ in sorted(_lazy_imports)]
+
+
+def __getattr__(name):
+    if name not in _lazy_imports:
+        raise AttributeError("module '{0}' has no attribute '{1}'".format(__name__, name))
+    value = getattr(importlib.import_module(_lazy_imports[name]), name)
+    # cache so __getattr__ is only called on first access
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazy_imports))
+
+
+# no module level __getattr__ before Python 3.7 (PEP 562) so have to import eagerly there
+if sys.version_info < (3, 7):
+    for _ in __all__:
+        __getattr__(_)
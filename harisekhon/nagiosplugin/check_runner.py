@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+#  vim:ts=4:sts=4:sw=4:et
+#
+#  Author: Hari Sekhon
+#  Date: 2026-10-19 02:37:51 +0100 (Mon, 19 Oct 2026)
+#
+#  https://github.com/harisekhon/pylib
+#
+#  License: see accompanying Hari Sekhon LICENSE file
+#
+#  If you're using my code you're welcome to connect with me on LinkedIn and optionally send me feedback
+#  to help improve or steer this or other code I publish
+#
+#  https://www.linkedin.com/in/harisekhon
+#
+
+"""
+
+Check Runner - runs many Nagios Plugins in one process and returns a CLIResult of the status, message, perfdata and
+               timings of each, rather than each check starting its own interpreter and importing the library
+               again, which is most of the CPU cost of a quick check
+
+Jobs are (plugin class, argv) pairs, eg.
+
+    results = CheckRunner([(CheckHadoopNameNode, ['-H', 'nn1']),
+                           (CheckHadoopNameNode, ['-H', 'nn2', '-w', '80'])]).run()
+
+Each job gets a new instance of its class. They're run one after another in the main thread, as the timeout of each
+check is a SIGALRM
+
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+#from __future__ import unicode_literals
+
+import os
+import sys
+import traceback
+libdir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.append(libdir)
+# pylint: disable=wrong-import-position
+from harisekhon.utils import log, support_msg, capture_quit, CodingError
+from harisekhon.cli import CLI, CLIResult
+
+__author__ = 'Hari Sekhon'
+__version__ = '0.1'
+
+
+class CheckRunner(object):
+
+    def __init__(self, jobs=None):
+        self.jobs = []
+        if jobs is not None:
+            for job in jobs:
+                self.add(*job)
+
+    def add(self, plugin_class, argv=None):
+        if not isinstance(plugin_class, type) or not issubclass(plugin_class, CLI):
+            raise CodingError('invalid plugin class {0} passed to CheckRunner, must be a subclass of CLI'
+                              .format(plugin_class))
+        if argv is not None and not isinstance(argv, (list, tuple)):
+            raise CodingError('invalid argv {0} passed to CheckRunner for {1}, must be a list'
+                              .format(argv, plugin_class.__name__))
+        self.jobs.append((plugin_class, list(argv or [])))
+
+    def run(self):
+        """ Returns a list of the CLIResult of each job, in the order of the jobs """
+        return [self.run_check(plugin_class, argv) for (plugin_class, argv) in self.jobs]
+
+    @staticmethod
+    def run_check(plugin_class, argv=None):
+        """ Returns the CLIResult of running plugin_class with argv, sys.argv[1:] if None """
+        (stdout, stderr) = (sys.stdout, sys.stderr)
+        try:
+            with capture_quit():
+                plugin = plugin_class()
+            return plugin.main(argv, return_result=True)
+        except SystemExit as _:
+            return CLIResult.from_exit(_)
+        # NagiosPlugin handles its own, this is for CLIs and the constructors
+        except Exception as _:  # pylint: disable=broad-except
+            log.debug(traceback.format_exc())
+            return CLIResult('UNKNOWN', '{0} Exception: {1}: {2}. {3}'
+                             .format(plugin_class.__name__, type(_).__name__, _, support_msg()))
+        finally:
+            # NagiosPlugin points stderr at stdout
+            (sys.stdout, sys.stderr) = (stdout, stderr)
@@ -39,7 +39,7 @@ from harisekhon.nagiosplugin.threshold import Threshold
 from harisekhon.nagiosplugin.threshold import InvalidThresholdException
 
 __author__ = 'Hari Sekhon'
-__version__ = '0.9.3'
+__version__ = '0.10.0'
 
 
 class NagiosPlugin(CLI):
@@ -170,6 +170,8 @@ class NagiosPlugin(CLI):
             threshold = self.get_opt(name)
             # log.debug("got threshold '%s'", threshold)
         if optional and threshold is None:
+            # known but not set so checking it is a no-op rather than a typo
+            self.__thresholds.setdefault(name, None)
             return None
         else:
             try:
@@ -214,11 +216,15 @@ class NagiosPlugin(CLI):
         elif threshold_breach_msg2:
             self.msg += ' ' + threshold_breach_msg2
 
-    def get_perf_thresholds(self, boundary='upper'):
+    def get_perf_thresholds(self, boundary='upper', name=''):
         if boundary not in ('lower', 'upper'):
             raise CodingError('invalid boundary passed to get_perf_thresholds()')
-        warning = self.get_threshold('warning', optional=True)
-        critical = self.get_threshold('critical', optional=True)
+        if not isStr(name):
+            raise CodingError('non-string passed as name argument to get_perf_thresholds()')
+        if name:
+            name += '_'
+        warning = self.get_threshold('{0}warning'.format(name), optional=True)
+        critical = self.get_threshold('{0}critical'.format(name), optional=True)
         warning_msg = ''
         critical_msg = ''
         if not warning or warning.thresholds[boundary] is not None:
@@ -229,10 +235,13 @@ class NagiosPlugin(CLI):
 
     # Generic exception handler for Nagios to rewrite any unhandled exceptions as UNKNOWN rather than allowing
     # the default python exit code of 1 which would equate to WARNING in Nagios compatible systems
-    def main(self):
+    def main(self, argv=None, return_result=False):
+        if return_result:
+            # comes back through here without return_result to handle the exceptions
+            return super(NagiosPlugin, self).main(argv, return_result=True)
         try:
             # Python 2.x
-            super(NagiosPlugin, self).main()
+            super(NagiosPlugin, self).main(argv)
             # Python 3.x
             # super().__init__()
             # redirect_stderr_stdout()
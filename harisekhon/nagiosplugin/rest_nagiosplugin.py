@@ -26,7 +26,6 @@ from __future__ import print_function
 #from __future__ import unicode_literals
 
 import logging
-import json
 import os
 import sys
 import time
@@ -38,16 +37,19 @@ libdir = os.path.join(srcdir, 'pylib')
 sys.path.append(libdir)
 try:
     # pylint: disable=wrong-import-position
-    from harisekhon.utils import log, log_option, UnknownError, support_msg_api, jsonpp
-    from harisekhon.utils import validate_host, validate_port, validate_user, validate_password
+    from harisekhon.utils import log, log_option, UnknownError, support_msg_api, jsonpp, json_loads, isStr, plural
+    from harisekhon.utils import validate_host, validate_port, validate_user, validate_password, validate_int
     from harisekhon.nagiosplugin import NagiosPlugin
-    from harisekhon import RequestHandler
+    from harisekhon import RequestHandler, HTTPCache
 except ImportError as _:
     print(traceback.format_exc(), end='')
     sys.exit(4)
 
 __author__ = 'Hari Sekhon'
-__version__ = '0.2'
+__version__ = '0.6'
+
+# same clock as the phase timings of harisekhon.http_timing so query_time is comparable with them
+_clock = getattr(time, 'monotonic', time.time)
 
 
 class RestNagiosPlugin(NagiosPlugin):
@@ -55,6 +57,15 @@ class RestNagiosPlugin(NagiosPlugin):
     __version__ = __version__
     # abstract class
     __metaclass__ = ABCMeta
+    # retries of GET / HEAD connection failures / timeouts / 502 / 504 within the deadline when --timeout is set,
+    # see RequestHandler.retry_statuses to also retry 503
+    retries = 2
+    # request phases of harisekhon.http_timing.HTTPTimings, which is only imported when phase timings are used
+    timing_phases = (('dns', 'DNS resolution'),
+                     ('connect', 'TCP connect'),
+                     ('tls', 'TLS handshake'),
+                     ('ttfb', 'time to first byte'),
+                     ('transfer', 'response body transfer'))
 
     def __init__(self):
         # Python 2.x
@@ -74,10 +85,18 @@ class RestNagiosPlugin(NagiosPlugin):
         self.msg = 'rest msg not defined yet'
         self.request = RequestHandler()
         self.req = None
+        self.query_time = None
         self.json_data = None
         self.path = None
         self.json = False
+        # paths for parse_json() to be given instead of the whole document, extracted as the response is streamed,
+        # eg. ['beans.0.HeapMemoryUsage.used'], see harisekhon.json_stream
+        self.json_paths = None
         self.auth = True
+        # report the request's DNS / connect / TLS / time to first byte / transfer times as perfdata
+        self.phase_timings = False
+        # add --phase-timings and the per phase --<phase>-warning / --<phase>-critical threshold options
+        self.timing_options = False
         self.ok()
 
     def add_options(self):
@@ -89,10 +108,45 @@ class RestNagiosPlugin(NagiosPlugin):
                                 default_user=self.default_user,
                                 default_password=self.default_password)
         self.add_ssl_option()
+        self.add_cache_option()
+        if self.timing_options:
+            self.add_timing_options()
 
     def add_ssl_option(self):
         self.add_opt('-S', '--ssl', action='store_true', default=False, help='Use SSL')
 
+    def add_cache_option(self):
+        self.add_opt('--cache-ttl', metavar='secs', default=os.getenv('HARISEKHON_HTTP_CACHE_TTL', 0),
+                     help='Cache responses on local disk for this many secs, shared with other runs, ' + \
+                          'and revalidate them with the server afterwards ($HARISEKHON_HTTP_CACHE_TTL, ' + \
+                          'default: 0 = disabled)')
+
+    def process_cache_option(self):
+        cache_ttl = self.get_opt('cache_ttl')
+        validate_int(cache_ttl, 'cache ttl', 0)
+        cache_ttl = int(cache_ttl)
+        if cache_ttl:
+            self.request.cache = HTTPCache(ttl=cache_ttl)
+
+    def add_timing_options(self):
+        self.add_opt('--phase-timings', action='store_true', default=False,
+                     help='Output DNS, connect, TLS, time to first byte and transfer times of the request as ' + \
+                          'perfdata, implied by any of the thresholds below')
+        for (phase, desc) in self.timing_phases:
+            self.add_opt('--{0}-warning'.format(phase), metavar='secs',
+                         help='{0} time warning threshold or ra:nge (inclusive)'.format(desc.capitalize()))
+            self.add_opt('--{0}-critical'.format(phase), metavar='secs',
+                         help='{0} time critical threshold or ra:nge (inclusive)'.format(desc.capitalize()))
+
+    def process_timing_options(self):
+        if self.get_opt('phase_timings'):
+            self.phase_timings = True
+        for (phase, _) in self.timing_phases:
+            self.validate_thresholds(name=phase, optional=True, integer=False)
+            if self.get_opt('{0}_warning'.format(phase)) is not None or \
+               self.get_opt('{0}_critical'.format(phase)) is not None:
+                self.phase_timings = True
+
     def process_options(self):
         self.no_args()
         self.host = self.get_opt('host')
@@ -108,19 +162,80 @@ class RestNagiosPlugin(NagiosPlugin):
         log_option('ssl', ssl)
         if ssl and self.protocol == 'http':
             self.protocol = 'https'
+        self.process_cache_option()
+        if self.timing_options:
+            self.process_timing_options()
+        log_option('phase timings', self.phase_timings)
+        if self.phase_timings:
+            self.request.phase_timings = True
+        self.process_deadline()
+        if self.json_paths:
+            self.request.json_paths = self.json_paths
+            self.request.stream = True
+
+    def process_deadline(self):
+        # timeouts and retries of the requests are bounded by the time left on --timeout
+        if self.deadline is not None:
+            self.request.deadline = self.deadline
+            if not self.request.retries:
+                self.request.retries = self.retries
 
     def run(self):
-        start_time = time.time()
+        start_time = _clock()
         self.req = self.query()
-        query_time = time.time() - start_time
+        query_time = _clock() - start_time
+        self.query_time = query_time
         if self.json:
-            self.process_json(self.req.content)
+            self.process_json_req(self.req)
         else:
             self.parse(self.req)
+        perfdata = ''
+        if self.phase_timings:
+            perfdata = self.process_timings(getattr(self.req, 'timings', None))
         if '|' not in self.msg:
             self.msg += ' |'
         if ' query_time=' not in self.msg:
             self.msg += ' query_time={0:.4f}s'.format(query_time)
+        self.msg += perfdata
+
+    def result_timings(self):
+        timings = super(RestNagiosPlugin, self).result_timings()
+        if self.query_time is not None:
+            timings['query'] = self.query_time
+        phase_timings = getattr(self.req, 'timings', None)
+        if phase_timings is not None:
+            timings.update(phase_timings.as_dict())
+        return timings
+
+    def process_timings(self, timings):
+        """
+        Checks the request's phase timings against their thresholds if timing_options is set, adding any breaches
+        to the message before the perfdata, and returns the perfdata for them. Nothing for responses served from
+        the cache
+        """
+        if timings is None:
+            log.info('no request timings, response served from cache')
+            return ''
+        breaches = ''
+        perfdata = ''
+        for (phase, secs) in timings.as_dict().items():
+            # fixed point as Threshold doesn't accept the exponent notation of small floats
+            secs = '{0:.4f}'.format(secs)
+            if not self.timing_options:
+                perfdata += ' {0}_time={1}s'.format(phase, secs)
+                continue
+            breach = self.check_threshold('{0}_critical'.format(phase), secs) or \
+                     self.check_threshold('{0}_warning'.format(phase), secs)
+            if breach:
+                breaches += ' {0}_time {1}'.format(phase, breach)
+            perfdata += ' {0}_time={1}s{2}'.format(phase, secs, self.get_perf_thresholds(name=phase))
+        if breaches:
+            if '|' in self.msg:
+                (msg, msg_perfdata) = self.msg.split('|', 1)
+                self.msg = msg.rstrip() + breaches + ' |' + msg_perfdata
+            else:
+                self.msg += breaches
+        return perfdata
 
     def query(self):
         url = '{proto}://{host}:{port}/'.format(proto=self.protocol,
@@ -135,6 +250,21 @@ class RestNagiosPlugin(NagiosPlugin):
         req = self.request.get(url, auth=auth)
         return req
 
+    def get_auth(self):
+        if self.user and self.password:
+            return (self.user, self.password)
+        return None
+
+    def query_many(self, urls, **kwargs):
+        """
+        Queries the urls concurrently, eg. the same endpoint on every node of a cluster, returning an OrderedDict
+        of url => RequestResult with any error per url rather than raising on the first one
+
+        Bounded by the deadline from --timeout, leaving time to report the results before the alarm
+        """
+        kwargs.setdefault('auth', self.get_auth())
+        return self.request.get_many(urls, **kwargs)
+
     #@abstractmethod
     def parse(self, req):
         pass
@@ -143,9 +273,24 @@ class RestNagiosPlugin(NagiosPlugin):
     def parse_json(self, json_data):
         pass
 
+    def process_json_req(self, req):
+        if self.json_paths:
+            return self.process_json_paths(req.json_values)
+        return self.process_json(req.content)
+
+    def process_json_paths(self, values):
+        missing = [str(_) for _ in self.json_paths if (_ if isStr(_) else tuple(_)) not in values]
+        if missing:
+            raise UnknownError('json path{0} not found in response: {1}. {2}'\
+                               .format(plural(missing), ', '.join(missing), support_msg_api()))
+        self.json_data = values
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug('JSON paths:\n\n%s\n%s', jsonpp(dict([(str(_), values[_]) for _ in values])), '='*80)
+        return self.parse_json(values)
+
     def process_json(self, content):
         try:
-            self.json_data = json.loads(content)
+            self.json_data = json_loads(content)
             if log.isEnabledFor(logging.DEBUG):
                 log.debug('JSON prettified:\n\n%s\n%s', jsonpp(self.json_data), '='*80)
             return self.parse_json(self.json_data)
@@ -106,7 +106,7 @@ class RestVersionNagiosPlugin(RestNagiosPlugin):
     def get_version(self):
         req = self.query()
         if self.json:
-            version = self.process_json(req.content)
+            version = self.process_json_req(req)
         else:
             version = self.parse(req)
         return version
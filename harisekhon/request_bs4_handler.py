@@ -32,7 +32,8 @@ import traceback
 # Python 2.6+ only
 from abc import ABCMeta, abstractmethod
 try:
-    from bs4 import BeautifulSoup
+    from bs4 import BeautifulSoup, SoupStrainer, Tag
+    from bs4.builder import builder_registry
     # import requests
 except ImportError:
     print(traceback.format_exc(), end='')
@@ -41,14 +42,153 @@ libdir = os.path.abspath(os.path.join(os.path.dirname(__file__), 'pylib'))
 sys.path.append(libdir)
 try:
     # pylint: disable=wrong-import-position
-    from harisekhon.utils import log
+    from harisekhon.utils import log, isStr, CodingError, UnknownError, support_msg
     from harisekhon import RequestHandler
 except ImportError as _:
     print(traceback.format_exc(), end='')
     sys.exit(4)
 
 __author__ = 'Hari Sekhon'
-__version__ = '0.1'
+__version__ = '0.4'
+
+# HTML parsers for BeautifulSoup in order of preference, auto picks the first installed
+#
+# html.parser is the default as it is always available and the parsers build different trees from some broken
+# markup, eg. unclosed <td> / <tr> cells, which html.parser nests inside each other, so installing lxml mustn't
+# change what existing parse() methods find. lxml is C and several times faster than the pure Python html.parser
+# so auto opts in to it when installed. html5lib isn't picked by auto as it is slower still and ignores
+# parse_only, but may be chosen for its browser-like handling of broken markup
+#
+# $HARISEKHON_HTML_PARSER = html.parser (default) / auto / lxml / html5lib
+_html_parsers = ('lxml', 'html.parser', 'html5lib')
+_html_parser = None
+
+
+def _load_html_parser(name):
+    name = (name or 'html.parser').strip().lower()
+    if name == 'auto':
+        for candidate in _html_parsers[:2]:
+            if builder_registry.lookup(candidate) is not None:
+                return candidate
+    elif name not in _html_parsers:
+        log.warning("unknown HTML parser '%s', must be one of: auto, %s. Using html.parser",
+                    name, ', '.join(_html_parsers))
+    elif builder_registry.lookup(name) is None:
+        log.warning("HTML parser '%s' is not installed, using html.parser", name)
+    else:
+        return name
+    return 'html.parser'
+
+
+def get_html_parser():
+    """ Returns the name of the default HTML parser, detected on first use """
+    global _html_parser  # pylint: disable=global-statement
+    if _html_parser is None:
+        _html_parser = _load_html_parser(os.getenv('HARISEKHON_HTML_PARSER'))
+        log.debug('using HTML parser: %s', _html_parser)
+    return _html_parser
+
+
+def set_html_parser(name):
+    """ Selects the default HTML parser by name as for $HARISEKHON_HTML_PARSER, returning the one in use """
+    global _html_parser  # pylint: disable=global-statement
+    _html_parser = _load_html_parser(name)
+    return _html_parser
+
+
+class FieldSpec(object):
+    """
+    Compiled extraction rule for a field of RequestBS4Handler.fields, from a dict of:
+
+        tag          - tag name or list of tag names to match, None for any tag
+        attrs        - dict of attribute => string, compiled regex, or True for present
+        text         - string matching the tag's whole text, whitespace normalized, or compiled regex searched for in it,
+                       requires tag as every tag's text includes all of its descendants' text
+        next_sibling - True or tag name, take the next sibling element of the matched tag
+        child        - tag name, take the first descendant of that name of the matched tag, after next_sibling
+        attr         - take this attribute's value instead of the text
+        optional     - True if the field may be missing from the page
+
+    The value is the stripped text of the tag arrived at, or its attribute value if attr is given
+    """
+
+    keys = ('tag', 'attrs', 'text', 'next_sibling', 'child', 'attr', 'optional')
+
+    def __init__(self, name, spec):
+        self.name = name
+        if not isinstance(spec, dict):
+            raise CodingError("field '{0}' spec must be a dict, got {1}".format(name, type(spec).__name__))
+        for key in spec:
+            if key not in self.keys:
+                raise CodingError("invalid key '{0}' in field '{1}' spec, must be one of: {2}"
+                                  .format(key, name, ', '.join(self.keys)))
+        tag = spec.get('tag')
+        if isStr(tag):
+            tag = [tag]
+        self.tags = frozenset(tag) if tag else None
+        self.attrs = []
+        for (attr, value) in (spec.get('attrs') or {}).items():
+            if value is not True and not isStr(value) and not hasattr(value, 'search'):
+                raise CodingError("invalid value for attribute '{0}' in field '{1}' spec".format(attr, name))
+            self.attrs.append((attr, value))
+        self.text = spec.get('text')
+        if isStr(self.text):
+            self.text = ' '.join(self.text.split())
+        elif self.text is not None and not hasattr(self.text, 'search'):
+            raise CodingError("invalid text in field '{0}' spec, must be a string or compiled regex".format(name))
+        if self.text is not None and self.tags is None:
+            raise CodingError("field '{0}' spec must have a tag to match text against".format(name))
+        if self.tags is None and not self.attrs and self.text is None:
+            raise CodingError("field '{0}' spec must have at least one of tag, attrs or text".format(name))
+        self.next_sibling = spec.get('next_sibling')
+        self.child = spec.get('child')
+        self.attr = spec.get('attr')
+        self.optional = bool(spec.get('optional'))
+
+    @staticmethod
+    def match_value(value, matcher):
+        if isStr(matcher):
+            return value == matcher
+        return matcher.search(value) is not None
+
+    def matches(self, tag):
+        if self.tags is not None and tag.name not in self.tags:
+            return False
+        for (attr, matcher) in self.attrs:
+            value = tag.get(attr)
+            if value is None:
+                return False
+            if matcher is True:
+                continue
+            # multi-valued attributes such as class are lists, matched on any value or the whole string
+            if isinstance(value, list):
+                if not any([self.match_value(_, matcher) for _ in value]) and \
+                   not self.match_value(' '.join(value), matcher):
+                    return False
+            elif not self.match_value(value, matcher):
+                return False
+        if self.text is not None and not self.match_value(' '.join(tag.get_text().split()), self.text):
+            return False
+        return True
+
+    def extract(self, tag):
+        """ Returns (value, None) for a matched tag, or (None, reason) if navigating from it fails """
+        if self.next_sibling:
+            tag = tag.find_next_sibling(None if self.next_sibling is True else self.next_sibling)
+            if tag is None:
+                return (None, 'next sibling tag not found')
+        if self.child:
+            tag = tag.find(self.child)
+            if tag is None:
+                return (None, 'child tag not found')
+        if self.attr:
+            value = tag.get(self.attr)
+            if value is None:
+                return (None, "attribute '{0}' not found".format(self.attr))
+            if isinstance(value, list):
+                value = ' '.join(value)
+            return (value, None)
+        return (tag.get_text().strip(), None)
 
 
 class RequestBS4Handler(RequestHandler):
@@ -56,18 +196,119 @@ class RequestBS4Handler(RequestHandler):
     # abstract class
     __metaclass__ = ABCMeta
 
-    # def __init__(self):
+    # Tags to build the soup from instead of the whole document, which for large pages saves most of the memory
+    # and tree building time. A tag name or list of tag names, eg. ['th', 'td'] for the usual 'Uptime:' header and
+    # value cells which are then siblings in the soup, a dict of attributes, eg. {'id': 'status'}, or a bs4
+    # SoupStrainer. Matching tags are kept whole including their descendants. None parses the whole document
+    parse_only = None
+    # class => (parse_only, SoupStrainer) so the strainer is built once per handler class
+    _strainers = {}
+
+    # HTML parser for this handler, overriding the default from get_html_parser(), see above. Set to 'auto' or 'lxml'
+    # only where parse() has been checked to give the same results with it
+    html_parser = None
+
+    # Declarative alternative to hand written soup.find() chains in parse(), a dict of field name => FieldSpec dict,
+    # eg. {'uptime': {'tag': 'th', 'text': re.compile('^Uptime:?$'), 'next_sibling': 'td'}}, compiled once per class.
+    # All the fields are found in a single pass over the soup and parse() is given a dict of name => value instead
+    # of the soup. Missing fields raise UnknownError
+    fields = None
+    # class => (fields, [FieldSpec])
+    _field_specs = {}
+
+    def __init__(self, *args, **kwargs):
+        # set before the base class processes any req given, resolving 'auto' or uninstalled parsers set on the class
+        html_parser = kwargs.pop('html_parser', None) or self.html_parser
+        if html_parser is not None:
+            self.html_parser = _load_html_parser(html_parser)
         # Python 2.x
-        #super(RequestHandler, self).__init__()
+        super(RequestBS4Handler, self).__init__(*args, **kwargs)
         # Python 3.x
         # super().__init__()
-        # pass
+
+    def get_html_parser(self):
+        return self.html_parser or get_html_parser()
 
     def __parse__(self, req):
-        soup = BeautifulSoup(req.content, 'html.parser')
+        soup = BeautifulSoup(self.get_content(req), self.get_html_parser(), parse_only=self.get_strainer())
         self.soup_print(soup)
+        if self.fields:
+            return self.parse(self.extract_fields(soup))
         return self.parse(soup)
 
+    def get_field_specs(self):
+        fields = self.fields
+        cls = self.__class__
+        cached = self._field_specs.get(cls)
+        if cached is None or cached[0] is not fields:
+            cached = (fields, [FieldSpec(name, spec) for (name, spec) in sorted(fields.items())])
+            self._field_specs[cls] = cached
+        return cached[1]
+
+    def extract_fields(self, soup):
+        """
+        Returns a dict of field name => value from the soup for the fields declared, the first match of each
+
+        Raises UnknownError for any non-optional fields not found
+        """
+        specs = self.get_field_specs()
+        by_tag = {}
+        any_tag = []
+        for spec in specs:
+            if spec.tags is None:
+                any_tag.append(spec)
+            else:
+                for tag in spec.tags:
+                    by_tag.setdefault(tag, []).append(spec)
+        values = {}
+        # field name => why a matching tag didn't give a value
+        reasons = {}
+        for tag in soup.descendants:
+            if not isinstance(tag, Tag):
+                continue
+            for spec in by_tag.get(tag.name, []) + any_tag:
+                if spec.name in values or not spec.matches(tag):
+                    continue
+                (value, reason) = spec.extract(tag)
+                if reason is None:
+                    values[spec.name] = value
+                else:
+                    reasons.setdefault(spec.name, reason)
+            if len(values) == len(specs):
+                break
+        log.debug('extracted fields: %s', values)
+        missing = [_ for _ in specs if _.name not in values and not _.optional]
+        if missing:
+            raise UnknownError('failed to find {0}. {1}'.format(
+                ', '.join(['{0} tag{1}'.format(_.name, ' ({0})'.format(reasons[_.name]) if _.name in reasons else '')
+                           for _ in missing]),
+                support_msg()))
+        return values
+
+    def get_strainer(self):
+        parse_only = self.parse_only
+        if parse_only is None or isinstance(parse_only, SoupStrainer):
+            return parse_only
+        cls = self.__class__
+        cached = self._strainers.get(cls)
+        if cached is None or cached[0] is not parse_only:
+            cached = (parse_only, self.create_strainer(parse_only))
+            self._strainers[cls] = cached
+        return cached[1]
+
+    @staticmethod
+    def create_strainer(parse_only):
+        if isStr(parse_only):
+            return SoupStrainer(parse_only)
+        elif isinstance(parse_only, (list, tuple)):
+            if not parse_only or not all([isStr(_) for _ in parse_only]):
+                raise CodingError('parse_only list must contain tag names')
+            return SoupStrainer(list(parse_only))
+        elif isinstance(parse_only, dict):
+            return SoupStrainer(attrs=parse_only)
+        raise CodingError('invalid parse_only, must be a tag name, list of tag names, dict of attributes or ' +
+                          'SoupStrainer')
+
     def soup_print(self, soup):  # pylint: disable=no-self-use
         if log.isEnabledFor(logging.DEBUG):
             log.debug("BeautifulSoup prettified:\n%s\n%s", soup.prettify(), '=' * 80)
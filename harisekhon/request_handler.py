@@ -25,11 +25,17 @@ from __future__ import division
 from __future__ import print_function
 #from __future__ import unicode_literals
 
-import json
-# import logging
+import logging
 import os
 import sys
+import threading
+import time
 import traceback
+from collections import OrderedDict, deque
+try:
+    from urllib.parse import urlparse
+except ImportError:
+    from urlparse import urlparse  # pylint: disable=import-error
 try:
     import requests
 except ImportError:
@@ -39,40 +45,401 @@ libdir = os.path.abspath(os.path.join(os.path.dirname(__file__), 'pylib'))
 sys.path.append(libdir)
 try:
     # pylint: disable=wrong-import-position
-    from harisekhon.utils import log, CriticalError, get_topfile
+    from harisekhon.utils import log, CriticalError, get_topfile, json_loads, Deadline
 except ImportError as _:
     print(traceback.format_exc(), end='')
     sys.exit(4)
 
 __author__ = 'Hari Sekhon'
-__version__ = '0.5.1'
+__version__ = '0.11.0'
+
+
+class RequestResult(object):
+    """
+    Result of one url from RequestHandler.get_many()
+
+    req is the requests.Response, content is what parse() returned for it and error is the exception raised by the
+    request or any of the response checks, None if it succeeded
+    """
+
+    def __init__(self, url):
+        self.url = url
+        self.req = None
+        self.content = None
+        self.error = None
+        self.elapsed = None
+
+    @property
+    def ok(self):
+        return self.error is None and self.req is not None
+
+    def __repr__(self):
+        return '{0}({1}, status={2}, error={3!r}, elapsed={4})'\
+               .format(self.__class__.__name__, self.url,
+                       self.req.status_code if self.req is not None else None,
+                       self.error, self.elapsed)
 
 
 class RequestHandler(object):
 
-    def __init__(self, req=None):
+    # Requests go through a requests.Session owned by this handler so that connections are kept alive and reused
+    # across requests to the same host instead of a new TCP connection and TLS handshake for every request.
+    # These pool settings may be overridden in subclasses or per instance via the constructor
+
+    # number of hosts to keep connection pools for
+    pool_connections = 10
+    # max connections kept open to each host, raise for concurrent requests to the same host
+    pool_maxsize = 10
+    # if True then wait for a free connection when all pool_maxsize connections to a host are in use,
+    # otherwise opens extra connections which are discarded afterwards
+    pool_block = False
+    keep_alive = True
+    # get_many() defaults, per_host defaults to pool_maxsize so concurrent requests to a host all reuse connections
+    max_workers = 10
+    per_host = None
+
+    # Streaming mode doesn't download the body with the headers. It is read on demand via iter_content() in chunks,
+    # or in full by get_content() which the default parse() uses, so subclasses can process large responses such
+    # as /jmx incrementally by overriding parse(). Setting max_bytes also streams so the limit is enforced as the
+    # body is read rather than after it has all been buffered
+    stream = False
+    # max response body size in bytes, larger bodies raise CriticalError
+    max_bytes = None
+    chunk_size = 65536
+
+    # HTTPCache to serve GET responses from, shared on disk with other processes
+    cache = None
+
+    # paths to extract incrementally from JSON responses with stream, see harisekhon.json_stream, rather than
+    # reading the whole body. parse() returns a dict of path => value, also available as req.json_values
+    json_paths = None
+
+    # Deadline, eg. CLI.deadline, which caps the connect and read timeouts of each request to the time remaining
+    # and bounds retries, so a stuck connection fails with a timeout error before the CLI timeout alarm goes off
+    deadline = None
+    # default connect / read timeouts in secs, None is no timeout other than the deadline
+    connect_timeout = None
+    read_timeout = None
+    # retries of connection errors, timeouts and retry_statuses with exponential backoff, backoff * 2 ^ attempt secs
+    retries = 0
+    backoff = 0.5
+    # add 503 to retry services which are temporarily unavailable, it isn't by default as health endpoints return it
+    # deliberately
+    retry_statuses = (502, 504)
+    # only requests which are safe to replay are retried, a POST / PUT / DELETE may have been acted on already
+    retry_methods = ('get', 'head', 'options')
+
+    # records the DNS, connect, TLS, time to first byte and body transfer times of each request as req.timings,
+    # see harisekhon.http_timing. Not for responses served from the cache
+    phase_timings = False
+
+    # positional args after the url as accepted by the requests module's get() / post() etc functions
+    _positional_args = {
+        'get': ('params',),
+        'post': ('data', 'json'),
+        'put': ('data',),
+        'patch': ('data',),
+    }
+
+    def __init__(self, req=None, session=None, pool_connections=None, pool_maxsize=None, pool_block=None,
+                 keep_alive=None, stream=None, max_bytes=None, cache=None, deadline=None, retries=None,
+                 phase_timings=None):
         self.url = None
+        self.__session = session
+        if phase_timings is not None:
+            self.phase_timings = phase_timings
+        if deadline is not None:
+            self.deadline = deadline
+        if retries is not None:
+            self.retries = retries
+        if cache is not None:
+            self.cache = cache
+        if stream is not None:
+            self.stream = stream
+        if max_bytes is not None:
+            self.max_bytes = max_bytes
+        if pool_connections is not None:
+            self.pool_connections = pool_connections
+        if pool_maxsize is not None:
+            self.pool_maxsize = pool_maxsize
+        if pool_block is not None:
+            self.pool_block = pool_block
+        if keep_alive is not None:
+            self.keep_alive = keep_alive
         if req:
             self.process_req(req)
 
+    @property
+    def session(self):
+        # created on first request as most handlers only make one or two requests and some none at all
+        if self.__session is None:
+            self.__session = self.create_session()
+        return self.__session
+
+    @session.setter
+    def session(self, session):
+        self.__session = session
+
+    def create_session(self):
+        session = requests.Session()
+        adapter_class = requests.adapters.HTTPAdapter
+        if self.phase_timings:
+            # deferred as only needed by handlers with phase_timings
+            from harisekhon.http_timing import TimedHTTPAdapter
+            adapter_class = TimedHTTPAdapter
+        adapter = adapter_class(pool_connections=self.pool_connections,
+                                pool_maxsize=self.pool_maxsize,
+                                pool_block=self.pool_block)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        if not self.keep_alive:
+            session.headers['Connection'] = 'close'
+        log.debug('created requests session with pool_connections=%s pool_maxsize=%s pool_block=%s keep_alive=%s '
+                  'phase_timings=%s', self.pool_connections, self.pool_maxsize, self.pool_block, self.keep_alive,
+                  self.phase_timings)
+        return session
+
+    def close(self):
+        if self.__session is not None:
+            self.__session.close()
+            self.__session = None
+
     def req(self, method, url, *args, **kwargs):
         if '://' not in url:
             url = 'http://' + url
         self.url = url
-        log.debug('%s %s', str(method).upper(), url)
         req = None
-        if 'headers' in kwargs:
-            kwargs['headers']['User-Agent'] = get_topfile()
-        else:
-            kwargs['headers'] = {'User-Agent': get_topfile()}
         try:
-            req = getattr(requests, method)(url, *args, **kwargs)
+            req = self._send(method, url, *args, **kwargs)
         except requests.exceptions.RequestException as _:
             self.exception_handler(_)
         self.log_output(req)
+        self.log_connection_stats()
         self.process_req(req)
+        self.log_timings(req)
         return req
 
+    def _send(self, method, url, *args, **kwargs):
+        # no instance state is set here as get_many() calls this concurrently from its threads
+        if '://' not in url:
+            url = 'http://' + url
+        log.debug('%s %s', str(method).upper(), url)
+        if 'headers' in kwargs:
+            kwargs['headers']['User-Agent'] = get_topfile()
+        else:
+            kwargs['headers'] = {'User-Agent': get_topfile()}
+        # Session methods don't take the same positional args as the requests module functions
+        if args:
+            names = self._positional_args.get(method, ())
+            if len(args) > len(names):
+                raise TypeError('{0}() takes at most {1} positional args after the url, {2} given'
+                                .format(method, len(names), len(args)))
+            for (name, arg) in zip(names, args):
+                kwargs[name] = arg
+        if self.stream or self.max_bytes is not None:
+            kwargs.setdefault('stream', True)
+        if self.cache is not None and method == 'get':
+            return self._send_cached(url, kwargs)
+        return self._send_retrying(method, url, kwargs)
+
+    def get_timeout(self, timeout=None):
+        """
+        Returns the timeout for the next request, the given timeout or the connect_timeout / read_timeout defaults,
+        capped to the time left on the deadline. Raises CriticalError if the deadline has passed
+        """
+        if timeout is None:
+            (connect, read) = (self.connect_timeout, self.read_timeout)
+        elif isinstance(timeout, tuple):
+            (connect, read) = timeout
+        else:
+            connect = read = timeout
+        if self.deadline is not None:
+            return self.deadline.timeout(connect, read)
+        if connect is None and read is None:
+            return None
+        return (connect, read)
+
+    def _send_retrying(self, method, url, kwargs):
+        timeout = kwargs.get('timeout')
+        retries = self.retries if str(method).lower() in self.retry_methods else 0
+        attempt = 0
+        while True:
+            kwargs['timeout'] = self.get_timeout(timeout)
+            req = None
+            try:
+                req = getattr(self.session, method)(url, **kwargs)
+                if self.phase_timings:
+                    self.set_timings(req, kwargs.get('stream'))
+                if req.status_code not in self.retry_statuses or attempt >= retries:
+                    return req
+                reason = '{0} {1}'.format(req.status_code, req.reason)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as _:
+                if attempt >= retries:
+                    raise
+                reason = '{0}: {1}'.format(type(_).__name__, _)
+                error = _
+            sleep_secs = self.backoff * 2 ** attempt
+            # don't start a retry that can't finish within the deadline, returning or raising the last failure
+            if self.deadline is not None and self.deadline.remaining() < sleep_secs * 2:
+                log.debug('not retrying %s %s after %s, only %.3f secs left before deadline',
+                          str(method).upper(), url, reason, self.deadline.remaining())
+                if req is not None:
+                    return req
+                raise error
+            attempt += 1
+            log.debug('retrying %s %s in %.3f secs after %s (retry %s/%s)',
+                      str(method).upper(), url, sleep_secs, reason, attempt, retries)
+            if req is not None:
+                req.close()
+            time.sleep(sleep_secs)
+
+    def _send_cached(self, url, kwargs):
+        cache = self.cache
+        # as merged by requests
+        session = self.session
+        headers = requests.structures.CaseInsensitiveDict(session.headers)
+        headers.update(kwargs['headers'])
+        key = cache.key(url, kwargs.get('params'), kwargs.get('auth') or session.auth, headers)
+        if key is None:
+            log.debug('not caching %s as its auth credentials are unknown', url)
+            return self._send_retrying('get', url, kwargs)
+        entry = cache.lookup(key)
+        if cache.is_fresh(entry):
+            log.debug('http cache hit for %s', url)
+            return cache.response(entry)
+        with cache.lock(key):
+            # another process may have fetched it while we waited for the lock
+            entry = cache.lookup(key)
+            if cache.is_fresh(entry):
+                log.debug('http cache hit for %s after waiting for lock', url)
+                return cache.response(entry)
+            if entry is not None:
+                kwargs['headers'].update(cache.get_conditional_headers(entry))
+            req = self._send_retrying('get', url, kwargs)
+            if req.status_code == 304 and entry is not None:
+                log.debug('http cache entry for %s revalidated', url)
+                cache.refresh(key, entry)
+                response = cache.response(entry)
+                # the revalidation request's
+                response.timings = getattr(req, 'timings', None)
+                return response
+            if cache.is_storable(req):
+                log.debug('http cache miss for %s, storing response', url)
+                cache.store(key, req, self.get_content(req))
+            return req
+
+    def get_many(self, urls, max_workers=None, per_host=None, budget=None, **kwargs):
+        return self.req_many('get', urls, max_workers=max_workers, per_host=per_host, budget=budget, **kwargs)
+
+    def req_many(self, method, urls, max_workers=None, per_host=None, budget=None, **kwargs):
+        """
+        Requests the urls concurrently on a pool of max_workers threads with at most per_host requests in flight
+        to any one host:port at a time
+
+        Each response goes through check_response_code(), parse() and check_content() as for req(), but errors are
+        captured per url instead of raised. Returns an OrderedDict of url => RequestResult in the order given
+
+        budget is the total secs allowed for all the requests, by default the time remaining on the deadline if
+        one is set. Requests still outstanding when it runs out are given timeout errors. Any other kwargs are
+        passed to every request
+        """
+        # deferred as few programs need it and Python 2 requires the futures backport
+        from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+        if max_workers is None:
+            max_workers = self.max_workers
+        if per_host is None:
+            per_host = self.per_host or self.pool_maxsize
+        start = time.time()
+        if budget is None and self.deadline is not None:
+            budget = self.deadline.remaining()
+        deadline = None
+        if budget is not None:
+            deadline = start + budget
+        results = OrderedDict()
+        for url in urls:
+            results[url] = RequestResult(url)
+        if not results:
+            return results
+        # host => urls not yet submitted. A url is only submitted when its host has a free slot so that a burst of
+        # urls to one host can't take all the threads, leaving the other hosts waiting behind it
+        queues = OrderedDict()
+        for url in results:
+            host = urlparse(url if '://' in url else 'http://' + url).netloc
+            queues.setdefault(host, deque()).append(url)
+        # future => (url, host)
+        futures = {}
+        executor = ThreadPoolExecutor(max_workers=min(max_workers, len(results)))
+        def submit(host):
+            url = queues[host].popleft()
+            future = executor.submit(self._req_one, method, url, deadline, kwargs)
+            futures[future] = (url, host)
+            return future
+        try:
+            not_done = set()
+            for host in queues:
+                for _ in range(min(per_host, len(queues[host]))):
+                    not_done.add(submit(host))
+            while not_done:
+                (done, not_done) = wait(not_done, timeout=None if deadline is None else max(deadline - time.time(), 0),
+                                        return_when=FIRST_COMPLETED)
+                if not done:
+                    break
+                for future in done:
+                    (url, host) = futures[future]
+                    # each thread fills in its own RequestResult, only taken when complete, so requests abandoned
+                    # past the budget can't change the results returned
+                    results[url] = future.result()
+                    if queues[host] and (deadline is None or time.time() < deadline):
+                        not_done.add(submit(host))
+            for future in not_done:
+                future.cancel()
+                url = futures[future][0]
+                results[url].error = CriticalError('request to {0} did not complete within the {1} secs budget'
+                                                   .format(url, budget))
+            for queue in queues.values():
+                for url in queue:
+                    results[url].error = CriticalError('budget exhausted before request to {0} was sent'.format(url))
+        finally:
+            # don't wait on requests abandoned past the budget, they end on their own timeouts
+            executor.shutdown(wait=False)
+        log.debug('%s requests to %s hosts in %.4f secs, %s failed', len(results), len(queues),
+                  time.time() - start, len([_ for _ in results.values() if not _.ok]))
+        self.log_connection_stats()
+        return results
+
+    def _req_one(self, method, url, deadline, kwargs):
+        result = RequestResult(url)
+        start = time.time()
+        kwargs = dict(kwargs)
+        # headers are modified when sending
+        kwargs['headers'] = dict(kwargs.get('headers') or {})
+        if deadline is not None:
+            remaining = deadline - start
+            if remaining <= 0:
+                result.error = CriticalError('budget exhausted before request to {0} was sent'.format(url))
+                return result
+        try:
+            if deadline is not None:
+                # each of a (connect, read) timeout tuple is capped
+                timeout = kwargs.get('timeout')
+                (connect, read) = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+                kwargs['timeout'] = Deadline(remaining).timeout(connect or None, read or None)
+            req = None
+            try:
+                req = self._send(method, url, **kwargs)
+            except requests.exceptions.RequestException as _:
+                self.exception_handler(_)
+            result.req = req
+            self.log_output(req)
+            self.check_response_code(req)
+            result.content = self.__parse__(req)
+            self.check_content(result.content)
+        except Exception as _:  # pylint: disable=broad-except
+            log.debug('%s %s failed: %s', str(method).upper(), url, _)
+            result.error = _
+        result.elapsed = time.time() - start
+        return result
+
     def get(self, url, *args, **kwargs):
         return self.req('get', url, *args, **kwargs)
 
@@ -101,23 +468,120 @@ class RequestHandler(object):
         assert issubclass(type(arg), Exception)
         # TODO: improve this to extract connection refused for more concise errors
         errhint = ''
-        if 'BadStatusLine' in str(arg.message):
+        # the request's url rather than self.url as get_many() handles exceptions from several requests at once
+        url = self.url
+        if getattr(arg, 'request', None) is not None and arg.request.url:
+            url = arg.request.url
+        # exception .message attribute no longer exists in Python 3
+        message = str(arg)
+        if 'BadStatusLine' in message:
             errhint = ' (possibly connecting to an SSL secured port using plain HTTP?)'
-        elif 'https://' in self.url and 'unknown protocol' in str(arg.message):
+        elif url and 'https://' in url and 'unknown protocol' in message:
             errhint = ' (possibly connecting to a plain HTTP port with the -S / --ssl switch enabled?)'
         raise CriticalError('{type}: {exception}{errhint}'.format(type=type(arg).__name__,
                                                                   exception=arg,
                                                                   errhint=errhint))
 
-    def log_output(self, req):  # pylint: disable=no-self-use
+    def get_connection_stats(self):
+        """
+        Returns a dict of (scheme, host, port) => (connections opened, requests made) for this handler's session
+
+        connections reused = requests made - connections opened
+        """
+        stats = {}
+        if self.__session is None:
+            return stats
+        for adapter in set(self.__session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                try:
+                    pool = pools[key]
+                except KeyError:  # pragma: no cover
+                    # evicted from the pool manager meanwhile
+                    continue
+                stats[(pool.scheme, pool.host, pool.port)] = (pool.num_connections, pool.num_requests)
+        return stats
+
+    def log_connection_stats(self):
+        if not log.isEnabledFor(logging.DEBUG):
+            return
+        for ((scheme, host, port), (connections, requests_made)) in sorted(self.get_connection_stats().items()):
+            log.debug('connection pool %s://%s:%s - %s connections opened, %s requests, %s connection reuses',
+                      scheme, host, port, connections, requests_made, requests_made - connections)
+
+    @staticmethod
+    def set_timings(req, stream=False):
+        from harisekhon.http_timing import get_timings
+        req.timings = get_timings(req)
+        # the body has already been read unless streaming
+        if req.timings is not None and not stream:
+            req.timings.finish()
+
+    @staticmethod
+    def finish_timings(req):
+        timings = getattr(req, 'timings', None)
+        if timings is not None:
+            timings.finish()
+
+    @staticmethod
+    def log_timings(req):
+        timings = getattr(req, 'timings', None)
+        if timings is not None:
+            log.debug('request timings: %s', timings)
+
+    def iter_content(self, req, chunk_size=None):
+        """
+        Yields the response body in chunks, raising CriticalError once more than max_bytes have been read
+
+        Use this in parse() for streaming responses to process the body without holding all of it in memory
+        """
+        max_bytes = self.max_bytes
+        if max_bytes is not None:
+            content_length = req.headers.get('Content-Length')
+            if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+                req.close()
+                raise CriticalError('response from {0} is {1} bytes, larger than the max of {2} bytes'
+                                    .format(req.url, content_length, max_bytes))
+        num_bytes = 0
+        for chunk in req.iter_content(chunk_size or self.chunk_size):
+            num_bytes += len(chunk)
+            if max_bytes is not None and num_bytes > max_bytes:
+                req.close()
+                raise CriticalError('response from {0} exceeded the max of {1} bytes'.format(req.url, max_bytes))
+            yield chunk
+        self.finish_timings(req)
+
+    def get_content(self, req):
+        """
+        Returns the whole response body, reading it within the max_bytes limit first if it was streamed
+
+        req.content / req.text / req.json() work as normal afterwards
+        """
+        # pylint: disable=protected-access
+        if getattr(req, '_content_consumed', True):
+            content = req.content
+            if self.max_bytes is not None and content and len(content) > self.max_bytes:
+                raise CriticalError('response from {0} is {1} bytes, larger than the max of {2} bytes'
+                                    .format(req.url, len(content), self.max_bytes))
+            return content
+        content = b''.join(self.iter_content(req))
+        # store as requests does for non-streamed responses
+        req._content = content
+        req._content_consumed = True
+        return content
+
+    def log_output(self, req):
+        if not log.isEnabledFor(logging.DEBUG):
+            return
         log.debug("response: %s %s", req.status_code, req.reason)
-        log.debug("content:\n%s\n%s\n%s", '=' * 80, req.content.strip(), '=' * 80)
+        # buffers streamed responses but only when debugging
+        log.debug("content:\n%s\n%s\n%s", '=' * 80, self.get_content(req).strip(), '=' * 80)
 
     def check_response_code(self, req):  # pylint: disable=no-self-use
         if req.status_code != 200:
             extra_info = ''
             try:
-                json_data = json.loads(req.content)
+                json_data = json_loads(self.get_content(req))
                 for key in ('status', 'error', 'reason', 'message'):
                     if key in json_data:
                         extra_info += ', {key}: {info}'.format(key=key, info=json_data[key])
@@ -132,5 +596,22 @@ class RequestHandler(object):
     def __parse__(self, req):
         return self.parse(req)
 
-    def parse(self, req):  # pylint: disable=no-self-use
-        return req.content
+    def parse(self, req):
+        if self.json_paths:
+            return self.extract_json_paths(req)
+        return self.get_content(req)
+
+    def extract_json_paths(self, req):
+        # deferred as only needed by handlers with json_paths
+        from harisekhon.json_stream import extract_json_paths
+        # pylint: disable=protected-access
+        if getattr(req, '_content_consumed', True):
+            values = extract_json_paths([self.get_content(req)], self.json_paths)
+        else:
+            values = extract_json_paths(self.iter_content(req), self.json_paths)
+            # stops reading once all the paths are found, the connection can't be reused with the rest unread
+            req.close()
+            self.finish_timings(req)
+        log.debug('extracted json paths: %s', values)
+        req.json_values = values
+        return values
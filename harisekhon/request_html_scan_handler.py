@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+#  vim:ts=4:sts=4:sw=4:et
+#
+#  Author: Hari Sekhon
+#  Date: 2026-10-19 01:24:46 +0100 (Mon, 19 Oct 2026)
+#
+#  https://github.com/harisekhon/pylib
+#
+#  License: see accompanying Hari Sekhon LICENSE file
+#
+#  If you're using my code you're welcome to connect with me on LinkedIn and optionally send me feedback
+#  to help improve or steer this or other code I publish
+#
+#  https://www.linkedin.com/in/harisekhon
+#
+
+"""
+
+Request HTML Scan Handler Class - alternative to RequestBS4Handler for checks which only need the values next to
+                                  a few labels on an HTML page, eg. 'Uptime:' and 'Version:' on Hadoop daemon
+                                  status pages, scanning the response as it streams in rather than parsing it
+
+Subclasses declare rules of name => label, see harisekhon.html_scan, and parse() is given a dict of name => value
+for those found. The rest of the page isn't downloaded once every rule has matched
+
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+#from __future__ import unicode_literals
+
+import codecs
+import os
+import sys
+import traceback
+# Python 2.6+ only
+from abc import ABCMeta, abstractmethod
+libdir = os.path.abspath(os.path.join(os.path.dirname(__file__), 'pylib'))
+sys.path.append(libdir)
+try:
+    # pylint: disable=wrong-import-position
+    from harisekhon.utils import log, CodingError
+    from harisekhon.html_scan import scan_html
+    from harisekhon import RequestHandler
+except ImportError as _:
+    print(traceback.format_exc(), end='')
+    sys.exit(4)
+
+__author__ = 'Hari Sekhon'
+__version__ = '0.1'
+
+
+class RequestHTMLScanHandler(RequestHandler):
+
+    # abstract class
+    __metaclass__ = ABCMeta
+
+    # name => label string or compiled regex, eg. {'uptime': 'Uptime:', 'version': re.compile('^Version:?$')}
+    rules = None
+    # elements which may be labels, None for the HTMLLabelScanner default of th, td, dt, dd, li, b, strong, label
+    # and span
+    label_tags = None
+    # scanned as the body is read instead of after downloading all of it
+    stream = True
+
+    def __parse__(self, req):
+        return self.parse(self.scan_html(req))
+
+    def scan_html(self, req):
+        if not self.rules:
+            raise CodingError('rules not defined in {0}'.format(self.__class__.__name__))
+        encoding = self.get_encoding(req)
+        # pylint: disable=protected-access
+        if getattr(req, '_content_consumed', True):
+            values = scan_html([self.get_content(req)], self.rules, encoding=encoding, label_tags=self.label_tags)
+        else:
+            values = scan_html(self.iter_content(req), self.rules, encoding=encoding, label_tags=self.label_tags)
+            # stops reading once all the rules have matched, the connection can't be reused with the rest unread
+            req.close()
+            self.finish_timings(req)
+        log.debug('scanned html values: %s', values)
+        return values
+
+    @staticmethod
+    def get_encoding(req):
+        # requests defaults text/html without a charset to ISO-8859-1, utf-8 is far more likely nowadays
+        if 'charset=' in req.headers.get('Content-Type', '').lower() and req.encoding:
+            try:
+                return codecs.lookup(req.encoding).name
+            except LookupError:
+                log.debug("unknown charset '%s' for %s, using utf-8", req.encoding, req.url)
+        return 'utf-8'
+
+    @abstractmethod
+    def parse(self, values):  # pylint: disable=no-self-use,arguments-differ
+        # values is a dict of rule name => text of the element following the label, missing rules are absent
+        #
+        # try:
+        #     uptime = values['uptime']
+        #     version = values['version']
+        # except KeyError as _:
+        #     qquit('UNKNOWN', 'failed to find {0} on page. {1}'.format(_, support_msg()))
+        pass
@@ -26,24 +26,31 @@ from __future__ import print_function
 # from __future__ import unicode_literals
 
 import ast
-import collections
+from contextlib import contextmanager
+# Python 3.3+, collections.Iterable alias was removed in Python 3.10
+try:
+    from collections.abc import Iterable as _Iterable
+except ImportError:
+    from collections import Iterable as _Iterable
 import glob
-import inspect
+import importlib
 # import itertools
 import json
 import os
 import re
 import logging
-import logging.config
 import platform
 import signal
 #import six
 import string
 import sys
+import threading
+import time
 import traceback
 from types import CodeType
 import warnings
 import xml.etree.ElementTree as ET
+import zlib
 import yaml
 # not available Python < 2.7
 # try:
@@ -54,7 +61,7 @@ import yaml
 # from xml.parsers.expat import ExpatError
 
 __author__ = 'Hari Sekhon'
-__version__ = '0.10.22'
+__version__ = '0.10.23'
 
 # Standard Nagios return codes
 ERRORS = {
@@ -65,6 +72,16 @@ ERRORS = {
     "DEPENDENT" : 4
 }
 
+# Interpreter capabilities resolved once here rather than on every call of isStr() / isUnicode() etc,
+# which are called from nearly everywhere
+if sys.version_info[0] >= 3:
+    _str_types = (str,)
+    _unicode_type = str
+else:
+    # pylint thinks unicode is an undefined variable
+    _str_types = (str, unicode)  # pylint: disable=undefined-variable
+    _unicode_type = unicode  # pylint: disable=undefined-variable
+
 libdir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 sys.path.append(libdir)
 import harisekhon # pylint: disable=wrong-import-position
@@ -72,7 +89,9 @@ import harisekhon # pylint: disable=wrong-import-position
 def get_caller():
     # return inspect.currentframe().f_back.f_back
     # try:
-    return inspect.stack()[2][3]
+    # return inspect.stack()[2][3]
+    # much cheaper than inspect.stack() which builds a FrameInfo with source context for every frame
+    return sys._getframe(2).f_code.co_name  # pylint: disable=protected-access
     # except Exception:
     #     return '<failed to get caller function>'
 
@@ -91,8 +110,79 @@ def trace(self, message, *args, **kwargs):
 logging.Logger.trace = trace
 # =============================================
 
-logging.config.fileConfig(os.path.join(libdir, 'resources', 'logging.conf'))
+# ============================================================================ #
+#                              Logging Config
+# ============================================================================ #
+#
+# Logging used to be configured at import via logging.config.fileConfig() of resources/logging.conf, which costs
+# the logging.config and configparser imports plus parsing the INI file in every process, as well as disabling any
+# loggers already created by the embedding application. Now only the levels are set at import and the handlers
+# equivalent to that file are built on the first log record that would actually be emitted, by a bootstrap handler.
+#
+# Applications embedding this library can call configure_logging() with their own config instead of ours
+
 log = logging.getLogger('HariSekhonUtils')
+log.setLevel(logging.WARN)
+log.propagate = False
+# captured at import as NagiosPlugin later redirects sys.stderr to sys.stdout but logging must still go to stderr
+_log_stream = sys.stderr
+_log_format = '%(asctime)s - %(filename)s[%(funcName)s:%(lineno)d](%(process)d) - %(levelname)-5s - %(message)s'
+_log_handler = None
+_log_lock = threading.Lock()
+
+
+class _LoggingBootstrapHandler(logging.Handler):
+    """ Applies the default logging config on the first record that reaches it, then emits that record """
+
+    def handle(self, record):
+        configure_logging()
+        _log_handler.handle(record)
+        return True
+
+    def emit(self, record):
+        pass
+
+
+_log_bootstrap_handler = _LoggingBootstrapHandler()
+log.addHandler(_log_bootstrap_handler)
+# leave any root handlers already set up by an embedding application alone
+if not logging.getLogger().handlers:
+    logging.getLogger().addHandler(_log_bootstrap_handler)
+
+
+def configure_logging(config=None):
+    """
+    Configures logging handlers, otherwise done automatically on the first log record that would be emitted
+
+    config defaults to the equivalent of resources/logging.conf, without parsing it, for both the root and
+    HariSekhonUtils loggers. Embedding applications may instead pass a dict for logging.config.dictConfig(),
+    a filename for logging.config.fileConfig(), or False to not add any handlers and have the HariSekhonUtils
+    logger propagate to the application's own logging config
+    """
+    global _log_handler  # pylint: disable=global-statement
+    with _log_lock:
+        for logger in (logging.getLogger(), log):
+            logger.removeHandler(_log_bootstrap_handler)
+        if config is None:
+            if _log_handler is None:
+                handler = logging.StreamHandler(_log_stream)
+                # restricted at the logger level first so this is not relevant
+                handler.setLevel(logging.DEBUG)
+                handler.setFormatter(logging.Formatter(_log_format))
+                _log_handler = handler
+            for logger in (logging.getLogger(), log):
+                logger.addHandler(_log_handler)
+        elif config is False:
+            log.propagate = True
+        else:
+            # only imported if needed as logging.config and the configparser it uses are relatively expensive
+            from logging import config as logging_config
+            if isDict(config):
+                logging_config.dictConfig(config)
+            else:
+                logging_config.fileConfig(config, disable_existing_loggers=False)
+
+
 if os.getenv('DEBUG'):
     log.setLevel(logging.DEBUG)
     log.debug('DEBUG environment variable set, enabling debug logging')
@@ -110,7 +200,7 @@ if os.getenv('DEBUG'):
 # XXX: enable for prod
 #raiseExceptions = False
 
-# Settings now controlled separately in logging.conf file
+# Settings now controlled separately in logging.conf file, now applied by configure_logging() above
 # log.setLevel(logging.WARN)
 # log_streamhandler = logging.StreamHandler()
 # log_formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
@@ -200,6 +290,8 @@ def qquit(status, msg=''):
                  status, get_caller(), traceback.format_exc())
         status = 'CRITICAL'
     # log.error('%s: %s', status, msg)
+    if getattr(_quit_local, 'capture', False):
+        raise QuitException(status, msg)
     if msg:
         print('{0}: {1}'.format(status, msg))
         if log.isEnabledFor(logging.DEBUG):
@@ -208,7 +300,25 @@ def qquit(status, msg=''):
             _ = traceback.format_exc().strip()
             if _ != 'None':
                 print('\n{0}'.format(_))
-    sys.exit(ERRORS[status])
+    raise QuitException(status, msg)
+
+
+# per thread as the programs run in process by one thread shouldn't stop another printing its result
+_quit_local = threading.local()
+
+
+@contextmanager
+def capture_quit():
+    """
+    Within this qquit() raises QuitException without printing the message, for the caller to catch and take the
+    status and message from, see CLI.main(return_result=True)
+    """
+    capture = getattr(_quit_local, 'capture', False)
+    _quit_local.capture = True
+    try:
+        yield
+    finally:
+        _quit_local.capture = capture
 
 
 # use CLI's self.usage() mostly instead which doesn't require passing in the parser
@@ -226,17 +336,40 @@ def usage(parser, msg='', status='UNKNOWN'):
     qquit(status)
 
 
+# the outermost frame of the main thread doesn't change for the life of the process so the result is cached,
+# as this is called for every request by RequestHandler to set the User-Agent
+_topfile = None
+try:
+    _main_thread = threading.main_thread()
+except AttributeError:  # Python 2
+    _main_thread = threading.current_thread()
+
 def get_topfile():
+    global _topfile  # pylint: disable=global-statement
+    if _topfile is not None:
+        return _topfile
+    filename = _get_topfile()
+    # the outermost frame of other threads is the threading module's bootstrap so don't cache that
+    if threading.current_thread() is _main_thread:
+        _topfile = filename
+    return filename
+
+
+def _get_topfile():
     # this gets 'python -m unittest' as filename
     # filename = sys.argv[0]
-    frame = inspect.stack()[-1][0]
+    # frame = inspect.stack()[-1][0]
+    # walk the frames directly as inspect.stack() builds a FrameInfo for every frame and reads source lines from disk
+    frame = sys._getframe()  # pylint: disable=protected-access
+    while frame.f_back is not None:
+        frame = frame.f_back
     # filename = inspect.stack()[-1][1]
-    filename = inspect.getfile(frame)
+    filename = frame.f_code.co_filename
     # filename = os.path.splitext(filename)[0] + '.py'
     filename = re.sub('.pyc$', '.py', filename)
     assert isStr(filename)
-    # this gets utrunner.py in PyCharm and runpy.py from unittest
-    if os.path.basename(filename) in ('utrunner.py', 'runpy.py', 'ipython'):
+    # this gets utrunner.py in PyCharm and runpy.py from unittest, or <frozen runpy> in Python 3.11+
+    if os.path.basename(filename) in ('utrunner.py', 'runpy.py', '<frozen runpy>', 'ipython'):
         return __file__
     # workaround for interactive mode
     if filename == '<stdin>':
@@ -249,22 +382,128 @@ def get_topfile():
     return filename
 
 
-def get_file_docstring(filename):
+def get_file_metadata(filename):
+    """
+    Returns a dict of the module docstring (uncleaned), __version__ and github repo url of the given file
+
+    These are extracted in a single read and token scan of the file rather than full AST parses
+    and cached on disk keyed on the file's mtime and size since they're needed on every CLI start up
+    """
     assert isStr(filename)
     assert isFilename(filename)
     # .pyc files cause the following error:
     # TypeError: compile() expected string without null bytes
     filename = re.sub('.pyc$', '.py', filename)
-    file_contents = open(filename).read()
+    # one cache file per script so that different programs don't keep invalidating each other's cache entry
+    cache_name = 'file_metadata.{0}.{1:08x}'.format(os.path.basename(filename),
+                                                    zlib.crc32(os.path.abspath(filename).encode('utf-8')) & 0xffffffff)
+    cache_key = file_cache_key(filename)
+    metadata = read_cache(cache_name, cache_key)
+    if isDict(metadata):
+        return metadata
+    metadata = _parse_file_metadata(filename)
+    write_cache(cache_name, cache_key, metadata)
+    return metadata
+
+
+def _parse_file_metadata(filename):
+    import tokenize
+    metadata = {'docstring': None, 'version': None, 'github_repo': ''}
+    with open(filename) as _:
+        file_contents = _.read()
+    lines = iter(file_contents.splitlines(True))
+
+    # checks each line for the github repo as the tokenizer pulls it so everything is found in one pass
+    def readline():
+        line = next(lines, '')
+        if not metadata['github_repo'] and 'https://github.com/harisekhon' in line:
+            metadata['github_repo'] = line.lstrip('#').strip()
+        return line
+
     # binary, maybe started with python command
     if '\0' in file_contents:
-        #file_contents = ''
-        return ''
+        metadata['docstring'] = ''
+    else:
+        try:
+            _scan_file_tokens(tokenize.generate_tokens(readline), metadata, filename.endswith('.py'))
+        except (tokenize.TokenError, SyntaxError) as _:
+            log.debug("failed to tokenize file '%s': %s", filename, _)
+    while not metadata['github_repo'] and readline():
+        pass
+    return metadata
+
+
+def _literal_strings(tokens):
+    # returns the value of a run of string tokens, implicitly concatenated, or None if not a plain string literal
     try:
-        _ = ast.parse(file_contents, filename=filename, mode='exec')
-    except TypeError:
-        return ''
-    return ast.get_docstring(_)
+        values = [ast.literal_eval(_) for _ in tokens]
+    except (ValueError, SyntaxError):
+        return None
+    if not values or not all(isStr(_) for _ in values):
+        return None
+    return ''.join(values)
+
+
+def _scan_file_tokens(tokens, metadata, find_version=True):
+    import tokenize
+    skip = (tokenize.COMMENT, tokenize.NL)
+    docstring_done = False
+    strings = []
+    # state for matching a top level statement of: __version__ = 'string'
+    version_state = None
+    depth = 0
+    statement_start = True
+    for (toktype, tokstr, start, _, _) in tokens:
+        if toktype in skip:
+            continue
+        # the docstring is the first statement if it's a plain string literal, same as ast.get_docstring()
+        if not docstring_done:
+            if toktype == tokenize.STRING:
+                strings.append(tokstr)
+                continue
+            docstring_done = True
+            if strings and toktype in (tokenize.NEWLINE, tokenize.ENDMARKER):
+                metadata['docstring'] = _literal_strings(strings)
+                strings = []
+                if not find_version:
+                    return
+                continue
+            # otherwise this token is either the start of the first statement or part of an expression statement
+            # starting with a string, which isn't a docstring
+            statement_start = not strings
+            strings = []
+            if not find_version:
+                return
+        if toktype == tokenize.OP and tokstr in ('(', '[', '{'):
+            depth += 1
+        elif toktype == tokenize.OP and tokstr in (')', ']', '}'):
+            depth -= 1
+        if version_state == 'name':
+            version_state = 'equals' if (toktype == tokenize.OP and tokstr == '=') else None
+        elif version_state == 'equals' and toktype == tokenize.STRING:
+            strings.append(tokstr)
+        # redundant parens around the string(s) aren't in the AST either
+        elif version_state == 'equals' and toktype == tokenize.OP and tokstr in ('(', ')'):
+            pass
+        elif version_state == 'equals':
+            if strings and depth == 0 and toktype in (tokenize.NEWLINE, tokenize.ENDMARKER):
+                metadata['version'] = _literal_strings(strings)
+                if metadata['version'] is not None:
+                    return
+            version_state = None
+            strings = []
+        elif statement_start and depth == 0 and start[1] == 0 and toktype == tokenize.NAME and tokstr == '__version__':
+            version_state = 'name'
+        statement_start = toktype in (tokenize.NEWLINE, tokenize.INDENT, tokenize.DEDENT)
+
+
+def get_file_docstring(filename):
+    docstring = get_file_metadata(filename)['docstring']
+    if docstring:
+        # imported here as it's only needed when printing usage, same cleaning as ast.get_docstring()
+        import inspect
+        docstring = inspect.cleandoc(docstring)
+    return docstring
     # inspect.getdoc is another option but looks like it'll only get docstring of object, we want file/module
 ###### old way #####
 #    # returns a code object
@@ -283,38 +522,11 @@ def get_file_docstring(filename):
 
 
 def get_file_version(filename):
-    assert isStr(filename)
-    assert isFilename(filename)
-    # .pyc files cause the following error:
-    # TypeError: compile() expected string without null bytes
-    filename = re.sub('.pyc$', '.py', filename)
-    if re.search(r'\.py$', filename):
-        tree = ast.parse(open(filename).read(), filename=filename, mode='exec')
-        # print(ast.dump(tree))
-        # print(dir(tree._fields))
-        for node in (n for n in tree.body if isinstance(n, ast.Assign)):
-            if len(node.targets) == 1:
-                name = node.targets[0]
-                if isinstance(name, ast.Name) and name.id == '__version__':
-                    _ = node.value
-                    if isinstance(_, ast.Str):
-                        return _.s
-    return None
+    return get_file_metadata(filename)['version']
 
 
 def get_file_github_repo(filename):
-    assert isStr(filename)
-    assert isFilename(filename)
-    # .pyc files cause the following error:
-    # TypeError: compile() expected string without null bytes
-    filename = re.sub('.pyc$', '.py', filename)
-    _ = open(filename)
-    for line in _:
-        if 'https://github.com/harisekhon' in line:
-            _.close()
-            return line.lstrip('#').strip()
-    _.close()
-    return ''
+    return get_file_metadata(filename)['github_repo']
 
 
 def gen_prefixes(prefixes, names, sort_by_names=False):
@@ -432,6 +644,158 @@ def find_git_root(target):
     return None
 
 
+# ============================================================================ #
+#                                 Disk Cache
+# ============================================================================ #
+
+# small JSON cache for data that is expensive to derive at start up, shared between short lived check processes
+# and invalidated by the key passed in, which is normally the stat() of the source file(s) the data was derived from
+
+def get_cache_dir():
+    cache_dir = os.getenv('HARISEKHON_CACHE_DIR')
+    if not cache_dir:
+        cache_dir = os.getenv('XDG_CACHE_HOME')
+        if not cache_dir:
+            cache_dir = os.path.join(os.path.expanduser('~'), '.cache')
+        cache_dir = os.path.join(cache_dir, 'harisekhon')
+    return cache_dir
+
+
+def file_cache_key(*filenames):
+    """ Returns a cache key for the given files based on their mtime and size, None for files that don't exist """
+    key = []
+    for filename in filenames:
+        try:
+            _ = os.stat(filename)
+            key.append([filename, _.st_mtime, _.st_size])
+        except OSError:
+            key.append([filename, None, None])
+    return key
+
+
+def read_cache(name, key):
+    """ Returns data from the named cache if it was stored with the same key, otherwise None """
+    try:
+        with open(os.path.join(get_cache_dir(), name + '.json')) as _:
+            cache = json.load(_)
+    except (IOError, OSError, ValueError):
+        return None
+    if not isDict(cache) or cache.get('key') != key:
+        return None
+    return cache.get('data')
+
+
+def write_cache(name, key, data):
+    """ Stores data in the named cache, failures are logged and ignored as the cache is only an optimization """
+    cache_dir = get_cache_dir()
+    filename = os.path.join(cache_dir, name + '.json')
+    # write to a temp file and rename so concurrent processes never read a partially written cache file
+    tmp_filename = '{0}.{1}.tmp'.format(filename, os.getpid())
+    try:
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        with open(tmp_filename, 'w') as _:
+            json.dump({'key': key, 'data': data}, _)
+        os.rename(tmp_filename, filename)
+        return True
+    except (IOError, OSError) as _:
+        log.debug("failed to write cache '%s': %s", filename, _)
+        try:
+            os.remove(tmp_filename)
+        except OSError:
+            pass
+    return False
+
+
+# ============================================================================ #
+#                                JSON Backend
+# ============================================================================ #
+
+# JSON decoding goes through json_loads() which uses a faster decoder if one is installed, selectable with
+# $HARISEKHON_JSON_BACKEND = auto (default) / orjson / ujson / simplejson / json
+#
+# auto only picks orjson, which returns the same results as the stdlib json module for everything it accepts
+# other than integers beyond 64 bits, which it decodes as floats. Documents with a run of 19 or more digits, which
+# any such integer has, are decoded by the stdlib json module instead, as is anything a backend rejects (NaN /
+# Infinity, lone surrogates), so they decode the same and invalid JSON raises the same json.JSONDecodeError
+# (a ValueError) as before. The digit check is a C speed translate() and substring search, which leaves
+# json_loads() with orjson around 2x faster than the stdlib json module on typical REST documents
+#
+# Encoding stays with the stdlib json module since the faster encoders can't reproduce its output formatting
+
+_json_backends = ('orjson', 'ujson', 'simplejson', 'json')
+# (name, loads function), resolved on first use
+_json_backend = None
+# backends which decode big integers exactly
+_json_big_int_backends = ('simplejson', 'json')
+# maps every digit to '0' to find runs of digits with a substring search
+_json_digits_table = bytes(bytearray([48 if 48 <= _ <= 57 else _ for _ in range(256)]))
+# integers within 64 bits have at most 20 digits, those below -2 ^ 63 have 19 or more
+_json_big_int_digits = b'0' * 19
+
+
+def _json_may_have_big_int(content):
+    if not isinstance(content, bytes):
+        if isinstance(content, bytearray):
+            content = bytes(content)
+        else:
+            content = content.encode('utf-8', 'surrogatepass')
+    return _json_big_int_digits in content.translate(_json_digits_table)
+
+
+def _load_json_backend(name):
+    name = (name or 'auto').strip().lower()
+    if name == 'auto':
+        candidates = ('orjson',)
+    elif name in _json_backends:
+        candidates = (name,)
+    else:
+        log.warning("unknown JSON backend '%s', must be one of: auto, %s. Using json", name, ', '.join(_json_backends))
+        candidates = ()
+    for candidate in candidates:
+        if candidate == 'json':
+            break
+        try:
+            module = importlib.import_module(candidate)
+        except ImportError:
+            if name != 'auto':
+                log.warning("JSON backend '%s' is not installed, using json", candidate)
+            continue
+        return (candidate, module.loads)
+    return ('json', json.loads)
+
+
+def get_json_backend():
+    """ Returns the name of the JSON backend in use """
+    global _json_backend  # pylint: disable=global-statement
+    if _json_backend is None:
+        _json_backend = _load_json_backend(os.getenv('HARISEKHON_JSON_BACKEND'))
+        log.debug('using JSON backend: %s', _json_backend[0])
+    return _json_backend[0]
+
+
+def set_json_backend(name):
+    """ Selects the JSON backend by name as for $HARISEKHON_JSON_BACKEND, returning the name of the one in use """
+    global _json_backend  # pylint: disable=global-statement
+    _json_backend = _load_json_backend(name)
+    return _json_backend[0]
+
+
+def json_loads(content):
+    """ json.loads() via the JSON backend, with the same results and exceptions """
+    if _json_backend is None:
+        get_json_backend()
+    (name, loads) = _json_backend
+    if name == 'json':
+        return json.loads(content)
+    if name not in _json_big_int_backends and _json_may_have_big_int(content):
+        return json.loads(content)
+    try:
+        return loads(content)
+    except (ValueError, TypeError, OverflowError):
+        return json.loads(content)
+
+
 # ============================================================================ #
 #                              Custom Exceptions
 # ============================================================================ #
@@ -478,6 +842,15 @@ class InvalidOptionException(AssertionError):
     pass
 
 
+class QuitException(SystemExit):
+    """ Raised by qquit(), exits with the code of the status as before unless caught, eg. by CLI.main() """
+
+    def __init__(self, status, msg=''):
+        super(QuitException, self).__init__(ERRORS[status])
+        self.status = status
+        self.msg = msg
+
+
 class FileNotExecutableException(IOError):
     pass
 
@@ -490,6 +863,56 @@ class FileNotFoundException(IOError):
     pass
 
 
+# ============================================================================ #
+#                                  Deadline
+# ============================================================================ #
+
+
+class Deadline(object):
+    """
+    Time budget for a run, eg. from the CLI --timeout, for network calls to derive their timeouts from so they
+    fail with a meaningful error before the global timeout alarm goes off
+
+    reserve secs are held back from remaining() to leave time for parsing and output afterwards
+    """
+
+    def __init__(self, secs, reserve=0):
+        if not isFloat(secs) or float(secs) < 0:
+            code_error('invalid secs passed to Deadline(), must be a positive number')
+        self.secs = float(secs)
+        self.reserve = float(reserve)
+        self.start = time.time()
+        self.end = self.start + self.secs
+
+    def elapsed(self):
+        return time.time() - self.start
+
+    def remaining(self):
+        """ Returns the secs left for work, excluding the reserve """
+        return max(self.end - self.reserve - time.time(), 0)
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def timeout(self, connect=None, read=None):
+        """
+        Returns a (connect, read) timeout tuple for requests with each capped to the secs remaining
+
+        Raises CriticalError if there is no time left
+        """
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise CriticalError('deadline of {0:.3g} secs exceeded'.format(self.secs))
+        if connect is None or connect > remaining:
+            connect = remaining
+        if read is None or read > remaining:
+            read = remaining
+        return (connect, read)
+
+    def __repr__(self):
+        return '{0}({1:.3g} secs, {2:.3f} remaining)'.format(self.__class__.__name__, self.secs, self.remaining())
+
+
 # ============================================================================ #
 #                               Jython Utils
 # ============================================================================ #
@@ -536,22 +959,67 @@ def java_oom_fix_msg():
 
 # ============================================================================ #
 
-def curl(url, *args, **kwargs):
-    # request_handler should be a subclass of harisekhon.RequestHandler
-    if 'request_handler' in kwargs:
-        request_handler = kwargs['request_handler']
-        if not isStr(request_handler):
-            raise CodingError('request_handler passed to curl() must be a string')
-        containing_module = re.sub(r'[^\.]+$', '', request_handler).rstrip('.')
-        target_class = request_handler.split('.')[-1]
-        # log.debug('containing module is %s' % containing_module)
-        module = __import__(containing_module, globals(), locals(), [], -1)
-        # module = __import__(request_handler, globals(), locals(), [request_handler.split('.')[-1]], -1)
+# request handler classes resolved from their dotted names and the instances shared by curl() calls, so scripts
+# calling curl() in a loop don't import, construct and open new connections each time
+_request_handler_classes = {}
+_request_handlers = {}
+_request_handler_lock = threading.Lock()
+
+
+def get_request_handler_class(request_handler):
+    """
+    Returns the class for a dotted name such as 'harisekhon.RequestHandler', resolved on first use and cached
+    """
+    _class = _request_handler_classes.get(request_handler)
+    if _class is not None:
+        return _class
+    if not isStr(request_handler) or '.' not in request_handler:
+        raise CodingError("request_handler must be a string of the form 'module.Class', got '{0}'"
+                          .format(request_handler))
+    (containing_module, target_class) = request_handler.rsplit('.', 1)
+    try:
+        module = importlib.import_module(containing_module)
         _class = getattr(module, target_class)
-        del kwargs['request_handler']
-        return _class().get(url, *args, **kwargs)
-    else:
-        return harisekhon.RequestHandler().get(url, *args, **kwargs)
+    except (ImportError, AttributeError) as _:
+        raise CodingError("failed to load request_handler '{0}': {1}".format(request_handler, _))
+    _request_handler_classes[request_handler] = _class
+    return _class
+
+
+def get_request_handler(request_handler=None):
+    """
+    Returns the shared instance of the request handler class named by request_handler, by default
+    harisekhon.RequestHandler, so its connection pool is reused by subsequent calls
+    """
+    if request_handler is None:
+        request_handler = 'harisekhon.RequestHandler'
+    handler = _request_handlers.get(request_handler)
+    if handler is None:
+        with _request_handler_lock:
+            handler = _request_handlers.get(request_handler)
+            if handler is None:
+                handler = get_request_handler_class(request_handler)()
+                _request_handlers[request_handler] = handler
+    return handler
+
+
+def curl(url, *args, **kwargs):
+    # request_handler should be the dotted name of a subclass of harisekhon.RequestHandler
+    request_handler = kwargs.pop('request_handler', None)
+    if request_handler is not None and not isStr(request_handler):
+        raise CodingError('request_handler passed to curl() must be a string')
+    return get_request_handler(request_handler).get(url, *args, **kwargs)
+
+
+def curl_many(urls, request_handler=None, **kwargs):
+    """
+    Fetches all the urls concurrently through the shared request handler, see RequestHandler.get_many()
+
+    Returns an OrderedDict of url => RequestResult with any error per url rather than raising
+    """
+    if request_handler is not None and not isStr(request_handler):
+        raise CodingError('request_handler passed to curl_many() must be a string')
+    return get_request_handler(request_handler).get_many(urls, **kwargs)
 
 # This doesn't make sense since you always have to override RequestBS4Handler's parse() and then call
 # def curl_bs4(*args, **kwargs):
@@ -593,7 +1061,7 @@ def read_file_without_comments(filename):
 
 def jsonpp(json_data):
     if isStr(json_data):
-        json_data = json.loads(json_data)
+        json_data = json_loads(json_data)
     return json.dumps(json_data, sort_keys=True, indent=4, separators=(',', ': '))
 
 
@@ -649,9 +1117,14 @@ def _load_tlds(filename):
     log.debug("loaded %s TLDs from file '%s'", tld_count, filename)
 
 _tld_file = libdir + '/resources/tlds-alpha-by-domain.txt'
-_load_tlds(_tld_file)
+_custom_tlds = libdir + '/resources/custom_tlds.txt'
 
 def _check_tldcount():
+    if not _tlds_loaded:
+        _init_tlds()
+    _validate_tldcount()
+
+def _validate_tldcount():
     log.debug('%s total unique TLDs loaded', len(_tlds))
     # must be at least this many if the IANA set loaded properly
     if len(_tlds) < 1000:
@@ -660,43 +1133,111 @@ def _check_tldcount():
     if len(_tlds) > 2000:
         code_error('%s tlds loaded, expected <= 2000' % len(_tlds))
 
-_check_tldcount()
+# The TLDs and the regexes embedding them are only needed by the domain / fqdn / host / email / url validators,
+# so they are loaded on first use rather than at import, since most check processes never call those validators.
+# The validated TLD list is cached on disk keyed on the TLD files' mtimes so that each new process can skip
+# re-parsing and re-validating the ~1500 lines of the TLD files
+_tlds_loaded = False
+# upper cased snapshot of the TLDs taken at load time for case insensitive suffix matching in _is_domain()
+_tld_index = None
+_tld_regexes = None
+# validators may be called from several threads at once, eg. by RequestHandler.get_many() checks
+_tlds_lock = threading.Lock()
+
+def _init_tlds():
+    global _tlds_loaded  # pylint: disable=global-statement
+    global _tld_index  # pylint: disable=global-statement
+    with _tlds_lock:
+        # loaded by another thread while this one waited for the lock
+        if _tlds_loaded:
+            return
+        cache_key = file_cache_key(_tld_file, _custom_tlds)
+        cached_tlds = read_cache('tlds', cache_key)
+        if isList(cached_tlds):
+            _tlds.update(cached_tlds)
+            log.debug("loaded %s TLDs from cache", len(cached_tlds))
+            # custom TLDs are included in the cache so this is only a sanity check that it's not corrupt
+            _validate_tldcount()
+        else:
+            _load_tlds(_tld_file)
+            _validate_tldcount()
+            if os.path.isfile(_custom_tlds):
+                _load_tlds(_custom_tlds)
+            write_cache('tlds', cache_key, sorted(_tlds))
+        _tld_index = frozenset([tld.upper() for tld in _tlds])
+        # set last so no other thread sees them loaded before they all are
+        _tlds_loaded = True
+
+
+def _get_tld_index():
+    if _tld_index is None:
+        _init_tlds()
+    return _tld_index
+
+
+def _get_tld_regexes():
+    global _tld_regexes  # pylint: disable=global-statement
+    if _tld_regexes is None:
+        _tld_regexes = _build_tld_regexes(_get_tld_index())
+    return _tld_regexes
+
+
+def _build_tld_regexes(tlds):
+    # pylint: disable=bad-whitespace
+    _ = {}
+    _['tld_regex']              = r'(?i)\b(?:' + '|'.join(sorted(tlds)) + r')\b'
+    _['domain_regex']           = r'(?:' + domain_component_regex + r'\.)*' + _['tld_regex']
+    _['domain_regex2']          = r'(?:' + domain_component_regex + r'\.)+' + _['tld_regex']
+    _['domain_regex_strict']    = _['domain_regex2']
+    _['hostname_regex']         = hostname_component + r'(?:\.' + _['domain_regex'] + ')?'
+    _['aws_hostname_regex']     = aws_host_component + r'(?:\.' + _['domain_regex'] + ')?'
+    _['fqdn_regex']             = hostname_component + r'\.' + _['domain_regex']
+    _['aws_fqdn_regex']         = aws_host_component + r'\.' + _['domain_regex']
+    # SECURITY NOTE: I'm allowing single quote through as it's found in Irish email addresses.
+    # This makes the email_regex non-safe without further validation.
+    # This regex only tests whether it's a valid email address, nothing more.
+    _['email_regex']            = r"\b[A-Za-z0-9](?:[A-Za-z0-9\._\%\'\+-]{0,62}[A-Za-z0-9\._\%\+-])?@" + \
+                                  _['domain_regex']
+    _['host_regex']             = r'\b(?:' + _['hostname_regex'] + '|' + ip_regex + r')\b'
+    _['url_regex']              = r'(?i)\bhttps?://' + _['host_regex'] + r'(?::\d{1,5})?(?:' + \
+                                  url_path_suffix_regex + ')?'
+    _['krb5_principal_regex']   = r'(?i)' + user_regex + r'(?:\/' + _['hostname_regex'] + r')?(?:\@' + \
+                                  _['domain_regex'] + r')?'
+    # pylint: enable=bad-whitespace
+    return _
 
-_custom_tlds = libdir + '/resources/custom_tlds.txt'
-if os.path.isfile(_custom_tlds):
-    _load_tlds(_custom_tlds)
 
-tld_regex = r'(?i)\b(?:' + '|'.join(_tlds) + r')\b'
+# these regexes embed the TLD list so are built lazily via module __getattr__ below, they are no longer used by the
+# validators below which use the faster _is_domain() suffix matching instead, but remain for regex use in client code
+# and are in __all__ at the end of this module so 'from harisekhon.utils import *' still gets them
+_tld_regex_names = ('tld_regex', 'domain_regex', 'domain_regex2', 'domain_regex_strict', 'hostname_regex',
+                    'aws_hostname_regex', 'fqdn_regex', 'aws_fqdn_regex', 'email_regex', 'host_regex',
+                    'url_regex', 'krb5_principal_regex')
+
+def __getattr__(name):
+    if name in _tld_regex_names:
+        return _get_tld_regexes()[name]
+    raise AttributeError("module '{0}' has no attribute '{1}'".format(__name__, name))
 
 # pylint: disable=bad-whitespace
+# domain_regex, hostname_regex, fqdn_regex, email_regex, host_regex, url_regex and krb5_principal_regex
+# embed the TLD list and are built on first use in _build_tld_regexes() above
 domain_component_regex = r'\b[a-zA-Z0-9](?:[a-zA-Z0-9\-]{0,61}[a-zA-Z0-9])?\b'
 # AWS regex from http://blogs.aws.amazon.com/security/blog/tag/key+rotation
 aws_access_key_regex   = r'(?<![A-Z0-9])[A-Z0-9]{20}(?![A-Z0-9])'
 aws_secret_key_regex   = r'(?<![A-Za-z0-9/+=])[A-Za-z0-9/+=]{40}(?![A-Za-z0-9/+=])'
-domain_regex           = r'(?:' + domain_component_regex + r'\.)*' + tld_regex
-domain_regex2          = r'(?:' + domain_component_regex + r'\.)+' + tld_regex
-domain_regex_strict    = domain_regex2
 # must permit numbers as valid host identifiers that are being used in the wild in FQDNs
 hostname_component     = r'\b[A-Za-z0-9](?:[A-Za-z0-9_\-]{0,61}[a-zA-Z0-9])?\b'
 aws_host_component     = r'ip-(?:10-\d+-\d+-\d+|172-1[6-9]-\d+-\d+|172-2[0-9]-\d+-\d+|172-3[0-1]-\d+-\d+|192-168-\d+-\d+)'  # pylint: disable=line-too-long
-hostname_regex         = hostname_component + r'(?:\.' + domain_regex + ')?'
-aws_hostname_regex     = aws_host_component + r'(?:\.' + domain_regex + ')?'
 dirname_regex          = r'[\/\w\s\\.,:*()=%?+-]+'
 filename_regex         = dirname_regex + r'[^\/]'
 rwxt_regex             = r'[r-][w-][x-][r-][w-][x-][r-][w-][xt-]'
-fqdn_regex             = hostname_component + r'\.' + domain_regex
-aws_fqdn_regex         = aws_host_component + r'\.' + domain_regex
-# SECURITY NOTE: I'm allowing single quote through as it's found in Irish email addresses.
-# This makes the email_regex non-safe without further validation.
-# This regex only tests whether it's a valid email address, nothing more.
-email_regex            = r"\b[A-Za-z0-9](?:[A-Za-z0-9\._\%\'\+-]{0,62}[A-Za-z0-9\._\%\+-])?@" + domain_regex
 # TODO: review this IP regex again
 ip_prefix_regex        = r'\b(?:(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\.){3}'
 # now allowing 0 or 255 as the final octet due to CIDR
 ip_regex               = ip_prefix_regex + r'(?:25[0-5]|2[0-4][0-9]|[01]?[1-9][0-9]|[01]?0[1-9]|[12]00|[0-9])\b'
 subnet_mask_regex      = r'\b(?:(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\.){3}(?:25[0-5]|2[0-4][0-9]|[01]?[1-9][0-9]|[01]?0[1-9]|[12]00|[0-9])\b'  # pylint: disable=line-too-long
 mac_regex              = r'\b[0-9A-F-af]{1,2}[:-](?:[0-9A-Fa-f]{1,2}[:-]){4}[0-9A-Fa-f]{1,2}\b'
-host_regex             = r'\b(?:' + hostname_regex + '|' + ip_regex + r')\b'
 # I did a scan of registered running process names across several hundred linux servers of a diverse group of
 # enterprise applications with 500 unique process names (58k individual processes) to determine that there are cases
 # with spaces, slashes, dashes, underscores, chevrons (<defunct>), dots (script.p[ly], in.tftpd etc) to determine
@@ -704,11 +1245,9 @@ host_regex             = r'\b(?:' + hostname_regex + '|' + ip_regex + r')\b'
 # This is not from ps -ef etc it is the actual process registered name, hence init not [init] as it appears in ps output
 process_name_regex     = r'\s*[\w_\.\/\<\>-][\w\s_\.\/\<\>-]+'
 url_path_suffix_regex  = r'/(?:[\w.,:\/%&?#!=*|\[\]~+-]+)?'
-url_regex              = r'(?i)\bhttps?://' + host_regex + r'(?::\d{1,5})?(?:' + url_path_suffix_regex + ')?'
 user_regex             = r'\b[A-Za-z][A-Za-z0-9_-]*[A-Za-z0-9]\b'
 column_regex           = r'\b[\w\:]+\b'
 ldap_dn_regex          = r'\b\w+=[\w\s]+(?:,\w+=[\w\s]+)*\b'
-krb5_principal_regex   = r'(?i)' + user_regex + r'(?:\/' + hostname_regex + r')?(?:\@' + domain_regex + r')?'
 threshold_range_regex  = r'^(\@)?(-?\d+(?:\.\d+)?)(:)(-?\d+(?:\.\d+)?)?'
 threshold_simple_regex = r'^(-?\d+(?:\.\d+)?)'
 label_regex            = r'\s*[\%\(\)\/\*\w-][\%\(\)\/\*\w\s-]*'
@@ -717,6 +1256,161 @@ version_regex_short    = r'\d+(?:\.\d+)?'
 version_regex_lax      = version_regex + r'-?.+\b'
 # pylint: enable=bad-whitespace
 
+# no module level __getattr__ before Python 3.7 (PEP 562) so have to build the TLD regexes at import there
+if sys.version_info < (3, 7):
+    globals().update(_get_tld_regexes())
+
+
+# ============================================================================ #
+#                           Compiled regex registry
+# ============================================================================ #
+#
+# The is*() predicates used to call re.match('^' + some_regex + '$', arg), concatenating a new pattern string on
+# every call and relying on the re module's internal cache to avoid recompiling it, which bulk validation across
+# the many distinct patterns here thrashed. Instead each (regex, flags) is compiled once on first use and kept here.
+#
+# _anchored() compiles exactly the '^' + regex + '$' the predicates built so their results are unchanged, '$' still
+# allows a trailing newline and a top level alternation is still only anchored at its ends, eg. isInterface()
+# accepts 'eth0garbage'. _fullmatch() is for the validation engine below, where regexes are components of larger
+# ones so must match as a whole, its callers strip a trailing newline first as '$' would have allowed
+
+_regex_registry = {}
+# bounds the registry for callers building patterns dynamically eg. isChars()
+_regex_registry_max = 500
+_have_fullmatch = hasattr(re.compile(''), 'fullmatch')
+
+
+def _get_regex(regex, flags=0, anchor=None):
+    key = (regex, flags, anchor)
+    _ = _regex_registry.get(key)
+    if _ is not None:
+        return _
+    if '(?i)' in regex:
+        # inline global flags are an error in Python 3.11+ unless at the start, and applied to the whole regex
+        # in earlier versions anyway, eg. the TLD regexes built by concatenation, so hoist them in to the flags
+        regex = regex.replace('(?i)', '')
+        flags |= re.I
+    if anchor == 'match':
+        _ = re.compile('^' + regex + '$', flags).match
+    elif anchor == 'full' and _have_fullmatch:
+        _ = re.compile(regex, flags).fullmatch
+    elif anchor == 'full':
+        _ = re.compile('(?:' + regex + r')\Z', flags).match
+    else:
+        _ = re.compile(regex, flags)
+    if len(_regex_registry) >= _regex_registry_max:
+        _regex_registry.clear()
+    _regex_registry[key] = _
+    return _
+
+
+def _anchored(regex, flags=0):
+    # returns the match function of the compiled '^' + regex + '$'
+    return _get_regex(regex, flags, anchor='match')
+
+
+def _fullmatch(regex, flags=0):
+    # returns the fullmatch function of the compiled regex
+    return _get_regex(regex, flags, anchor='full')
+
+
+def _compiled(regex, flags=0):
+    return _get_regex(regex, flags)
+
+
+# ============================================================================ #
+#                   Domain / Host / Email / URL validation engine
+# ============================================================================ #
+#
+# Rather than matching against regexes embedding a ~1500-way alternation of TLDs, these split on the separators
+# and check the final domain label against the TLD set, using the regexes above for the other components.
+# These accept exactly what the equivalent anchored regexes built in _build_tld_regexes() accept - those are
+# compiled case insensitive since the embedded (?i) applies to the whole regex - and only load the TLDs if
+# there is a dotted domain to check, so plain hostnames and IPs never need them
+
+_domain_component_match = _fullmatch(domain_component_regex)
+_hostname_component_match = _fullmatch(hostname_component)
+_aws_host_component_match = _fullmatch(aws_host_component, re.I)
+_ip_match = _fullmatch(ip_regex)
+_email_user_match = _fullmatch(r"[A-Za-z0-9](?:[A-Za-z0-9\._\%\'\+-]{0,62}[A-Za-z0-9\._\%\+-])?")
+_user_match = _fullmatch(user_regex)
+_url_scheme_re = _compiled(r'https?://', re.I)
+_url_suffix_match = _fullmatch(r'(?::\d{1,5})?(?:' + url_path_suffix_regex + ')?')
+_url_host_end_re = _compiled('[:/]')
+
+
+def _strip_eol(arg):
+    # '$' in the anchored regexes also matches before a trailing newline
+    if arg[-1:] == '\n':
+        return arg[:-1]
+    return arg
+
+
+def _is_domain(arg, strict=False):
+    labels = arg.split('.')
+    if strict and len(labels) < 2:
+        return False
+    if labels[-1].upper() not in _get_tld_index():
+        return False
+    for label in labels[:-1]:
+        if not _domain_component_match(label):
+            return False
+    return True
+
+
+def _is_hostname(arg):
+    (host, sep, domain) = arg.partition('.')
+    if not _hostname_component_match(host):
+        return False
+    return not sep or _is_domain(domain)
+
+
+def _is_fqdn(arg):
+    (host, sep, domain) = arg.partition('.')
+    return bool(sep) and _hostname_component_match(host) is not None and _is_domain(domain)
+
+
+def _is_aws_hostname(arg, fqdn=False):
+    (host, sep, domain) = arg.partition('.')
+    if fqdn and not sep:
+        return False
+    if not _aws_host_component_match(host):
+        return False
+    return not sep or _is_domain(domain)
+
+
+def _is_host(arg):
+    # IP check first as it's cheaper and doesn't need the TLDs
+    return _ip_match(arg) is not None or _is_hostname(arg)
+
+
+def _is_email(arg):
+    (user, sep, domain) = arg.partition('@')
+    return bool(sep) and _email_user_match(user) is not None and _is_domain(domain)
+
+
+def _is_url(arg):
+    _ = _url_scheme_re.match(arg)
+    if not _:
+        return False
+    arg = arg[_.end():]
+    _ = _url_host_end_re.search(arg)
+    if _:
+        (host, suffix) = (arg[:_.start()], arg[_.start():])
+    else:
+        (host, suffix) = (arg, '')
+    return _is_host(host) and _url_suffix_match(suffix) is not None
+
+
+def _is_krb5_princ(arg):
+    (arg, sep, realm) = arg.partition('@')
+    if sep and not _is_domain(realm):
+        return False
+    (user, sep, host) = arg.partition('/')
+    if sep and not _is_hostname(host):
+        return False
+    return _user_match(user) is not None
+
 ##################
 #
 # see also inspect.isclass(obj)
@@ -738,7 +1432,11 @@ def isAlNum(arg):
 def isAwsAccessKey(arg):
     if arg is None:
         return False
-    if re.match('^' + aws_access_key_regex + '$', str(arg)):
+    arg = str(arg)
+    # with the trailing newline '$' allows
+    if len(arg) not in (20, 21):
+        return False
+    if _anchored(aws_access_key_regex)(arg):
         return True
     return False
 
@@ -746,7 +1444,7 @@ def isAwsAccessKey(arg):
 def isAwsHostname(arg):
     if arg is None:
         return False
-    if re.match('^' + aws_hostname_regex + '$', str(arg)):
+    if _is_aws_hostname(_strip_eol(str(arg))):
         return True
     return False
 
@@ -754,7 +1452,7 @@ def isAwsHostname(arg):
 def isAwsFqdn(arg):
     if arg is None:
         return False
-    if re.match('^' + aws_fqdn_regex + '$', str(arg)):
+    if _is_aws_hostname(_strip_eol(str(arg)), fqdn=True):
         return True
     return False
 
@@ -762,7 +1460,10 @@ def isAwsFqdn(arg):
 def isAwsSecretKey(arg):
     if arg is None:
         return False
-    if re.match('^' + aws_secret_key_regex + '$', str(arg)):
+    arg = str(arg)
+    if len(arg) not in (40, 41):
+        return False
+    if _anchored(aws_secret_key_regex)(arg):
         return True
     return False
 
@@ -784,7 +1485,7 @@ def isChars(arg, chars):
         code_error('no chars passed to isChars()')
     if not isRegex("[" + chars + "]"):
         code_error('invalid char range passed to isChars')
-    if re.match('^[' + chars + ']+$', str(arg)):
+    if _anchored('[' + chars + ']+')(str(arg)):
         return True
     return False
 
@@ -808,7 +1509,7 @@ def isCodeStr(arg):
 def isCollection(arg):
     if arg is None:
         return False
-    if re.match(r'^\w(?:[\w\.]*\w)?$', str(arg)):
+    if _anchored(r'\w(?:[\w\.]*\w)?')(str(arg)):
         return True
     return False
 
@@ -816,7 +1517,7 @@ def isCollection(arg):
 def isDatabaseName(arg):
     if arg is None:
         return False
-    if re.match(r'^\w+$', str(arg)):
+    if _anchored(r'\w+')(str(arg)):
         return True
     return False
 
@@ -824,7 +1525,7 @@ def isDatabaseName(arg):
 def isDatabaseColumnName(arg):
     if arg is None:
         return False
-    if re.match('^' + column_regex + '$', str(arg)):
+    if _anchored(column_regex)(str(arg)):
         return True
     return False
 
@@ -833,7 +1534,7 @@ def isDatabaseFieldName(arg):
     if arg is None:
         return False
     arg = str(arg)
-    if re.match(r'^\d+$', arg) or re.match(r'^[A-Za-z][\w()*,._-]+[A-Za-z0-9)]$', arg):
+    if _anchored(r'\d+')(arg) or _anchored(r'[A-Za-z][\w()*,._-]+[A-Za-z0-9)]')(arg):
         return True
     return False
 
@@ -843,10 +1544,10 @@ def isDatabaseTableName(arg, allow_qualified=False):
         return False
     arg = str(arg)
     if allow_qualified is True:
-        if re.match(r'^[A-Za-z0-9][\w\.]*[A-Za-z0-9]$', arg):
+        if _anchored(r'[A-Za-z0-9][\w\.]*[A-Za-z0-9]')(arg):
             return True
     else:
-        if re.match(r'^[A-Za-z0-9]\w*[A-Za-z0-9]$', arg):
+        if _anchored(r'[A-Za-z0-9]\w*[A-Za-z0-9]')(arg):
             return True
     return False
 
@@ -864,9 +1565,9 @@ def isDirname(arg):
     if arg is None:
         return False
     arg = str(arg)
-    if re.match(r'^\s*$', arg):
+    if not arg.strip():
         return False
-    if re.match('^' + dirname_regex + '$', arg):
+    if _anchored(dirname_regex)(arg):
         return True
     return False
 
@@ -877,7 +1578,7 @@ def isDomain(arg):
     arg = str(arg)
     if len(arg) > 255:
         return False
-    if re.match('^' + domain_regex + '$', arg):
+    if _is_domain(_strip_eol(arg)):
         return True
     return False
 
@@ -888,7 +1589,7 @@ def isDomainStrict(arg):
     arg = str(arg)
     if len(arg) > 255:
         return False
-    if re.match('^' + domain_regex_strict + '$', arg):
+    if _is_domain(_strip_eol(arg), strict=True):
         return True
     return False
 
@@ -899,7 +1600,7 @@ def isDnsShortname(arg):
     arg = str(arg)
     if len(arg) < 3 or len(arg) > 63:
         return False
-    if re.match('^' + hostname_component + '$', arg):
+    if _anchored(hostname_component)(arg):
         return True
     return False
 
@@ -910,9 +1611,9 @@ def isEmail(arg):
     if arg is None:
         return False
     arg = str(arg)
-    if len(arg) > 256:
+    if len(arg) > 256 or '@' not in arg:
         return False
-    if re.match('^' + email_regex + '$', arg):
+    if _is_email(_strip_eol(arg)):
         return True
     return False
 
@@ -921,9 +1622,9 @@ def isFilename(arg):
     if arg is None:
         return False
     arg = str(arg)
-    if re.match('/$', arg) or re.match(r'^\s*$', arg):
+    if arg in ('/', '/\n') or not arg.strip():
         return False
-    if re.match('^' + filename_regex + '$', arg):
+    if _anchored(filename_regex)(arg):
         return True
     return False
 
@@ -938,7 +1639,7 @@ def isFloat(arg, allow_negative=False):
     neg = ''
     if allow_negative is True:
         neg = '-?'
-    if re.match('^' + neg + r'\d+(?:\.\d+)?' + '$', str(arg)):
+    if _anchored(neg + r'\d+(?:\.\d+)?')(str(arg)):
         return True
     return False
 
@@ -949,7 +1650,7 @@ def isFqdn(arg):
     arg = str(arg)
     if len(arg) > 255:
         return False
-    if re.match('^' + fqdn_regex + '$', arg):
+    if _is_fqdn(_strip_eol(arg)):
         return True
     return False
 
@@ -960,7 +1661,7 @@ def isFqdn(arg):
 def isHex(arg):
     if arg is None:
         return False
-    if re.match(r'^(?:0x)?[A-Fa-f\d]+$', str(arg)):
+    if _anchored(r'(?:0x)?[A-Fa-f\d]+')(str(arg)):
         return True
     return False
 
@@ -974,7 +1675,7 @@ def isHost(arg):
         return False
     if len(arg) > 255:
         return False
-    if re.match('^' + host_regex + '$', str(arg)):
+    if _is_host(_strip_eol(arg)):
         return True
     return False
 
@@ -988,7 +1689,7 @@ def isHostname(arg):
         return False
     if len(arg) > 255:
         return False
-    if re.match('^' + hostname_regex + '$', arg):
+    if _is_hostname(_strip_eol(arg)):
         return True
     return False
 
@@ -1003,7 +1704,7 @@ def isInt(arg, allow_negative=False):
     neg = ""
     if allow_negative:
         neg = "-?"
-    if re.match('^' + neg + r'\d+(?:\.0+)?' + '$', str(arg)):
+    if _anchored(neg + r'\d+(?:\.0+)?')(str(arg)):
         return True
     return False
 
@@ -1011,7 +1712,7 @@ def isInt(arg, allow_negative=False):
 def isInterface(arg):
     if arg is None:
         return False
-    if re.match(r'^(?:em|eth|bond|lo|docker)\d+|lo|veth[A-Fa-f0-9]+$', str(arg)):
+    if _anchored(r'(?:em|eth|bond|lo|docker)\d+|lo|veth[A-Fa-f0-9]+')(str(arg)):
         return True
     return False
 
@@ -1020,10 +1721,13 @@ def isIP(arg):
     if arg is None:
         return False
     arg = str(arg)
+    # 15 chars plus the trailing newline '$' allows
+    if len(arg) > 16:
+        return False
     octets = arg.split('.')
-    if len(octets) > 4:
+    if len(octets) != 4:
         return False
-    if not re.match('^' + ip_regex + '$', str(arg)):
+    if not _anchored(ip_regex)(arg):
         return False
     for octet in octets:
         octet = int(octet)
@@ -1033,13 +1737,13 @@ def isIP(arg):
 
 
 def isIterable(arg):
-    # collections.Iterable Python 2.6+
-    return isinstance(arg, collections.Iterable)
+    # collections.Iterable Python 2.6+, collections.abc.Iterable Python 3.3+
+    return isinstance(arg, _Iterable)
 
 
 def isIterableNotStr(arg):
-    # collections.Iterable Python 2.6+
-    return isinstance(arg, collections.Iterable) and not isStr(arg)
+    # collections.Iterable Python 2.6+, collections.abc.Iterable Python 3.3+
+    return isinstance(arg, _Iterable) and not isinstance(arg, _str_types)
 
 
 def isJavaException(arg):
@@ -1060,7 +1764,7 @@ def isJson(arg):
     if not isStr(arg):
         return False
     try:
-        json.loads(arg)
+        json_loads(arg)
         return True
     except ValueError:
         pass
@@ -1094,7 +1798,7 @@ def isXml(arg):
 def isKrb5Princ(arg):
     if arg is None:
         return False
-    if re.match('^' + krb5_principal_regex + '$', str(arg)):
+    if _is_krb5_princ(_strip_eol(str(arg))):
         return True
     return False
 
@@ -1102,7 +1806,7 @@ def isKrb5Princ(arg):
 def isLabel(arg):
     if arg is None:
         return False
-    if re.match('^' + label_regex + '$', str(arg)):
+    if _anchored(label_regex)(str(arg)):
         return True
     return False
 
@@ -1110,7 +1814,10 @@ def isLabel(arg):
 def isLdapDn(arg):
     if arg is None:
         return False
-    if re.match('^' + ldap_dn_regex + '$', str(arg)):
+    arg = str(arg)
+    if '=' not in arg:
+        return False
+    if _anchored(ldap_dn_regex)(arg):
         return True
     return False
 
@@ -1159,7 +1866,7 @@ def isNagiosUnit(arg):
 def isNoSqlKey(arg):
     if arg is None:
         return False
-    if re.match(r'^([\w\_\,\.\:\+\-]+)$', str(arg)):
+    if _anchored(r'[\w\_\,\.\:\+\-]+')(str(arg)):
         return True
     return False
 
@@ -1175,7 +1882,7 @@ def isPathQualified(arg):
 def isPort(arg):
     if arg is None:
         return False
-    if not re.match(r'^\d+$', str(arg)):
+    if not _anchored(r'\d+')(str(arg)):
         return False
     if int(arg) >= 1 and int(arg) <= 65535:
         return True
@@ -1185,7 +1892,7 @@ def isPort(arg):
 def isProcessName(arg):
     if arg is None:
         return False
-    if re.match('^' + process_name_regex + '$', str(arg)):
+    if _anchored(process_name_regex)(str(arg)):
         return True
     return False
 
@@ -1254,7 +1961,7 @@ def isScientific(arg, allow_negative=False):
     neg = ""
     if allow_negative is True:
         neg = "-?"
-    if re.match('^' + neg + r'\d+(?:\.\d+)?e[+-]?\d+$', str(arg), re.I):
+    if _anchored(neg + r'\d+(?:\.\d+)?e[+-]?\d+', re.I)(str(arg)):
         return True
     return False
 
@@ -1264,10 +1971,8 @@ def isScientific(arg, allow_negative=False):
 
 def isStr(arg):
     # return type(arg).__name__ in [ 'str', 'unicode' ]
-    if isPythonMinVersion(3):
-        return isinstance(arg, str)
-    # pylint thinks unicode is an undefined variable
-    return isinstance(arg, str) or isinstance(arg, unicode)  # pylint: disable=undefined-variable
+    # str on Python 3, str or unicode on Python 2
+    return isinstance(arg, _str_types)
     # basestring is abstract superclass of both str and unicode
     # update: looks like this is removed in Python 3
     # return isinstance(arg, basestring)
@@ -1285,10 +1990,8 @@ def isTuple(arg):
 
 def isUnicode(arg):
     # return type(arg).__name__ == 'unicode'
-    if isPythonMinVersion(3):
-        return isinstance(arg, str)
-    else: # pylint thinks unicode is undefined variable just cos it's not in py3k
-        return isinstance(arg, unicode) # pylint: disable=undefined-variable
+    # str on Python 3, unicode on Python 2
+    return isinstance(arg, _unicode_type)
 
 
 def isUrl(arg):
@@ -1297,9 +2000,9 @@ def isUrl(arg):
     # checking for String yet another breakage between Python 2 and 3
     # see http://stackoverflow.com/questions/4843173/how-to-check-if-type-of-a-variable-is-string-in-python
     arg = str(arg).strip()
-    if not re.search('://', arg):
+    if '://' not in arg:
         arg = 'http://' + arg
-    if re.match('^' + url_regex + '$', arg):
+    if _is_url(_strip_eol(arg)):
         return True
     return False
 
@@ -1307,7 +2010,7 @@ def isUrl(arg):
 def isUrlPathSuffix(arg):
     if arg is None:
         return False
-    if re.match('^' + url_path_suffix_regex + '$', str(arg)):
+    if _anchored(url_path_suffix_regex)(str(arg)):
         return True
     return False
 
@@ -1315,7 +2018,7 @@ def isUrlPathSuffix(arg):
 def isUser(arg):
     if arg is None:
         return False
-    if re.match('^' + user_regex + '$', str(arg)):
+    if _anchored(user_regex)(str(arg)):
         return True
     return False
 
@@ -1323,7 +2026,11 @@ def isUser(arg):
 def isVersion(arg):
     if arg is None:
         return False
-    if re.match('^' + version_regex + '$', str(arg)):
+    arg = str(arg)
+    # cheap prefilter, must start with a digit
+    if not arg[:1].isdigit():
+        return False
+    if _anchored(version_regex)(arg):
         return True
     return False
 
@@ -1331,7 +2038,10 @@ def isVersion(arg):
 def isVersionLax(arg):
     if arg is None:
         return False
-    if re.match('^' + version_regex_lax + '$', str(arg)):
+    arg = str(arg)
+    if not arg[:1].isdigit():
+        return False
+    if _anchored(version_regex_lax)(arg):
         return True
     return False
 
@@ -1339,7 +2049,7 @@ def isVersionLax(arg):
 def isYes(arg):
     if arg is None:
         return False
-    if re.match(r'^\s*y(?:es)?\s*$', str(arg), re.I):
+    if _anchored(r'\s*y(?:es)?\s*', re.I)(str(arg)):
         return True
     return False
 
@@ -1399,11 +2109,18 @@ def min_value(val, min_val):
 # open_file
 
 
+_server_not_available_regex = r'\b(?:no[\s_]+{host}[\s_]+available|' + \
+                              r'no[\s_]+available[\s_]+{host}|' + \
+                              r'{host}[\s_]+not[\s_]+available)\b'
+_server_not_available_regex = _server_not_available_regex.format(host=r'(?:server|host)')
+
 def is_str_server_not_available(arg):
-    host = r'(?:server|host)'
-    if re.search(r'\b(?:no[\s_]+{host}[\s_]+available|'.format(host=host) +
-                 r'no[\s_]+available[\s_]+{host}|'.format(host=host) +
-                 r'{host}[\s_]+not[\s_]+available)\b'.format(host=host), str(arg), re.I):
+    arg = str(arg)
+    # cheap prefilter as this is called by isHost() / isHostname() on every arg. Not 'available' as re.I matches
+    # other characters to 'i'
+    if 'lable' not in arg.lower():
+        return False
+    if _compiled(_server_not_available_regex, re.I).search(arg):
         return True
     return False
 
@@ -2237,6 +2954,11 @@ def pyspark_path():
     #     print('module import failed: %s' % e, file=sys.stderr)
     #     sys.exit(ERRORS['UNKNOWN'])
 
+# 'from harisekhon.utils import *' exports every public name as it did before there was an __all__, plus the TLD
+# regexes only built on access via __getattr__, which star imports therefore build, from the TLD cache in a few ms
+# str() as they must be native strings in Python 2
+__all__ = sorted(set([str(_) for _ in globals() if not _.startswith('_')] + [str(_) for _ in _tld_regex_names]))
+
 # from math import pow, fabs, sqrt
 # def squaredError(label, prediction):
 #     """Calculates the the squared error for a single prediction.
@@ -0,0 +1,43 @@
+#  vim:ts=4:sts=4:sw=4:et
+#
+#  Author: Hari Sekhon
+#  Date: 2026-10-18 20:58:31 +0100 (Sun, 18 Oct 2026)
+#
+#  https://github.com/harisekhon/pylib
+#
+#  License: see accompanying Hari Sekhon LICENSE file
+#
+#  If you're using my code you're welcome to connect with me on LinkedIn and optionally send me feedback
+#  to help improve or steer this or other code I publish
+#
+#  https://www.linkedin.com/in/harisekhon
+#
+
+"""
+
+Coroutines for test_async_request_handler.py
+
+Python 3.5+ only as async / await is a SyntaxError on Python 2, which is why they're not in the test module itself.
+Not compiled on Python 2, see tests/excluded.sh
+
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+# from __future__ import unicode_literals
+
+__author__ = 'Hari Sekhon'
+__version__ = '0.1'
+
+
+def record_connections(transport):
+    """ Wraps the transport's _connect() to return a list of the writer of each connection it makes """
+    writers = []
+    connect = transport._connect  # pylint: disable=protected-access
+    async def recording_connect(key):
+        (reader, writer, reused) = await connect(key)
+        writers.append(writer)
+        return (reader, writer, reused)
+    transport._connect = recording_connect  # pylint: disable=protected-access
+    return writers
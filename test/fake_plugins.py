@@ -0,0 +1,60 @@
+#  vim:ts=4:sts=4:sw=4:et
+#
+#  Author: Hari Sekhon
+#  Date: 2026-10-18 22:38:42 +0100 (Sun, 18 Oct 2026)
+#
+#  https://github.com/harisekhon/pylib
+#
+#  License: see accompanying Hari Sekhon LICENSE file
+#
+#  If you're using my code you're welcome to connect with me on LinkedIn and optionally send me feedback
+#  to help improve or steer this or other code I publish
+#
+#  https://www.linkedin.com/in/harisekhon
+#
+
+"""
+# ============================================================================ #
+#            Fake CLI and RestNagiosPlugin for the CLI and Nagios Plugin Tests
+# ============================================================================ #
+
+Subclass these rather than defining another run() / parse() per test class
+
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+# from __future__ import unicode_literals
+
+import os
+import sys
+libdir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(libdir)
+# pylint: disable=wrong-import-position
+from harisekhon import CLI, RestNagiosPlugin
+
+__author__ = 'Hari Sekhon'
+__version__ = '0.1'
+
+
+class FakeCLI(CLI):
+    """ run() raises KeyError('test') to test the handling of unexpected exceptions """
+
+    def run(self):
+        raise KeyError('test')
+
+
+class FakeRestNagiosPlugin(RestNagiosPlugin):
+    """ Queries /status without auth, with the timing options, and reports the response body """
+
+    def __init__(self):
+        # Python 2.x
+        super(FakeRestNagiosPlugin, self).__init__()
+        self.name = 'test'
+        self.path = 'status'
+        self.auth = False
+        self.timing_options = True
+
+    def parse(self, req):
+        self.msg = 'status = {0}'.format(req.content.decode('utf-8'))
@@ -0,0 +1,64 @@
+#  vim:ts=4:sts=4:sw=4:et
+#
+#  Author: Hari Sekhon
+#  Date: 2026-10-18 22:31:07 +0100 (Sun, 18 Oct 2026)
+#
+#  https://github.com/harisekhon/pylib
+#
+#  License: see accompanying Hari Sekhon LICENSE file
+#
+#  If you're using my code you're welcome to connect with me on LinkedIn and optionally send me feedback
+#  to help improve or steer this or other code I publish
+#
+#  https://www.linkedin.com/in/harisekhon
+#
+
+"""
+# ============================================================================ #
+#              Fake RequestBS4Handler for the Request BS4 Handler Tests
+# ============================================================================ #
+
+Subclass FakeRequestBS4Handler to set parse_only, fields, html_parser or status_and_links rather than defining
+another parse() per test handler
+
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+# from __future__ import unicode_literals
+
+import os
+import sys
+libdir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(libdir)
+# pylint: disable=wrong-import-position
+from harisekhon import RequestBS4Handler
+
+__author__ = 'Hari Sekhon'
+__version__ = '0.1'
+
+
+class FakeRequestBS4Handler(RequestBS4Handler):
+    """
+    Parses status pages to a dict of each <th> header => the text of the next <td> sibling, or None if there isn't
+    one, plus the text of any tag with id 'status' and the list of links if status_and_links is set
+
+    Returns the values as given when fields are declared
+    """
+
+    status_and_links = False
+
+    def parse(self, soup):
+        if self.fields:
+            return soup
+        result = {}
+        for _ in soup.find_all('th'):
+            value = _.find_next_sibling('td')
+            result[_.get_text().strip().rstrip(':')] = value.get_text().strip() if value is not None else None
+        if self.status_and_links:
+            status = soup.find(id='status')
+            if status is not None:
+                result['status'] = status.get_text()
+            result['links'] = [_.get('href') for _ in soup.find_all('a')]
+        return result
@@ -0,0 +1,119 @@
+#  vim:ts=4:sts=4:sw=4:et
+#
+#  Author: Hari Sekhon
+#  Date: 2026-10-18 22:14:36 +0100 (Sun, 18 Oct 2026)
+#
+#  https://github.com/harisekhon/pylib
+#
+#  License: see accompanying Hari Sekhon LICENSE file
+#
+#  If you're using my code you're welcome to connect with me on LinkedIn and optionally send me feedback
+#  to help improve or steer this or other code I publish
+#
+#  https://www.linkedin.com/in/harisekhon
+#
+
+"""
+# ============================================================================ #
+#          Stub HTTP/1.1 Server on localhost for the Request Handler Tests
+# ============================================================================ #
+
+Serves canned responses per path on a random free port in a background thread and counts the TCP connections
+and requests received so tests can check keep-alive connection reuse without depending on the internet
+
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+# from __future__ import unicode_literals
+
+import sys
+import threading
+try:
+    # pylint: disable=import-error
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    # pylint: disable=import-error
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+__author__ = 'Hari Sekhon'
+__version__ = '0.1'
+
+
+class StubRequestHandler(BaseHTTPRequestHandler):
+
+    # required for keep-alive, responses must then always send Content-Length
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        BaseHTTPRequestHandler.setup(self)
+        with self.server.lock:
+            self.server.connections += 1
+
+    def respond(self):
+        with self.server.lock:
+            self.server.requests += 1
+            self.server.paths.append(self.path)
+        response = self.server.responses.get(self.path, (404, {}, b'not found'))
+        if callable(response):
+            response = response(self)
+        (status, headers, body) = response
+        if callable(body):
+            body = body(self)
+        self.send_response(status)
+        for (header, value) in headers.items():
+            self.send_header(header, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    do_GET = do_POST = do_PUT = do_DELETE = do_HEAD = respond
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+
+class StubHTTPServer(ThreadingMixIn, HTTPServer):
+
+    daemon_threads = True
+
+    def __init__(self, responses=None):
+        HTTPServer.__init__(self, ('127.0.0.1', 0), StubRequestHandler)
+        # path => (status code, headers dict, body bytes or callable taking the request handler and returning bytes)
+        # or a callable taking the request handler and returning that tuple
+        self.responses = responses or {}
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.requests = 0
+        self.paths = []
+        self.thread = None
+
+    @property
+    def url(self):
+        return 'http://{0}:{1}'.format(*self.server_address)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def handle_error(self, request, client_address):
+        # clients closing streamed responses early are expected
+        if isinstance(sys.exc_info()[1], (IOError, OSError)):
+            return
+        HTTPServer.handle_error(self, request, client_address)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
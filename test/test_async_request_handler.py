@@ -0,0 +1,157 @@
+#  vim:ts=4:sts=4:sw=4:et
+#
+#  Author: Hari Sekhon
+#  Date: 2026-10-18 20:58:31 +0100 (Sun, 18 Oct 2026)
+#
+#  https://github.com/harisekhon/pylib
+#
+#  License: see accompanying Hari Sekhon LICENSE file
+#
+#  If you're using my code you're welcome to connect with me on LinkedIn and optionally send me feedback
+#  to help improve or steer this or other code I publish
+#
+#  https://www.linkedin.com/in/harisekhon
+#
+
+"""
+# ============================================================================ #
+#                 PyUnit Tests for HariSekhon.AsyncRequestHandler
+# ============================================================================ #
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+# from __future__ import unicode_literals
+
+import logging
+import os
+import sys
+import time
+import unittest
+libdir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.append(libdir)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+# pylint: disable=wrong-import-position
+from harisekhon.utils import log, CriticalError
+# async / await is a SyntaxError on Python 2 so the coroutines used by the tests are kept in a separate module
+if sys.version_info >= (3, 5):
+    from harisekhon.async_request_handler import AsyncRequestHandler, AsyncResponse, StreamTransport
+    from async_test_utils import record_connections
+from stub_http_server import StubHTTPServer
+
+
+@unittest.skipIf(sys.version_info < (3, 5), 'asyncio async / await requires Python 3.5+')
+class AsyncRequestHandlerTester(unittest.TestCase):
+
+    # must prefix with test_ in order for the tests to be called
+
+    def setUp(self):
+        self.server = StubHTTPServer({
+            '/': (200, {}, b'ok'),
+            '/json': (200, {'Content-Type': 'application/json'}, b'{"a": 1}'),
+            '/error': (500, {}, b'{"message": "broken"}'),
+        }).start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_get(self):
+        handler = AsyncRequestHandler()
+        req = handler.run(handler.get(self.server.url + '/json'))
+        self.assertTrue(isinstance(req, AsyncResponse))
+        self.assertEqual(req.status_code, 200)
+        self.assertEqual(req.json(), {'a': 1})
+        self.assertEqual(req.headers['content-type'], 'application/json')
+
+    def test_get_error_status(self):
+        handler = AsyncRequestHandler()
+        try:
+            handler.run(handler.get(self.server.url + '/error'))
+            raise Exception('failed to raise CriticalError for 500 response')
+        except CriticalError as _:
+            self.assertTrue('message: broken' in str(_))
+
+    def test_connection_refused(self):
+        handler = AsyncRequestHandler()
+        try:
+            handler.run(handler.get('127.0.0.1:1'))
+            raise Exception('failed to raise CriticalError for connection refused')
+        except CriticalError:
+            pass
+
+    def test_get_many(self):
+        transport = StreamTransport()
+        handler = AsyncRequestHandler(transport=transport, concurrency=2)
+        urls = [self.server.url + _ for _ in ('/error', '/', '/json', '/')]
+        results = handler.run(handler.get_many(urls))
+        self.assertEqual(list(results), [self.server.url + _ for _ in ('/error', '/', '/json')])
+        self.assertFalse(results[urls[0]].ok)
+        self.assertTrue(isinstance(results[urls[0]].error, CriticalError))
+        self.assertEqual(results[urls[1]].content, b'ok')
+        self.assertEqual(results[urls[2]].content, b'{"a": 1}')
+        self.assertEqual(transport.requests, 3)
+        # no more connections than the concurrency limit as they are kept alive and reused
+        self.assertTrue(transport.connections_opened <= 2)
+        self.assertEqual(self.server.connections, transport.connections_opened)
+
+    def test_run_again(self):
+        for _ in range(6):
+            self.server.responses['/{0}'.format(_)] = (200, {}, b'ok')
+        handler = AsyncRequestHandler(concurrency=2)
+        urls = ['{0}/{1}'.format(self.server.url, _) for _ in range(6)]
+        for _ in range(2):
+            results = handler.run(handler.get_many(urls))
+            self.assertTrue(all([results[url].ok for url in urls]))
+
+    def test_timeout_closes_connection(self):
+        def slow_timeout_response(_):
+            time.sleep(1)
+            return b'slow'
+        self.server.responses['/slow'] = (200, {}, slow_timeout_response)
+        transport = StreamTransport()
+        writers = record_connections(transport)
+        handler = AsyncRequestHandler(transport=transport, timeout=0.2)
+        try:
+            handler.run(handler.get(self.server.url + '/slow'))
+            raise Exception('failed to raise CriticalError for timeout')
+        except CriticalError:
+            pass
+        self.assertEqual(len(writers), 1)
+        self.assertTrue(writers[0].is_closing())
+
+    def test_get_many_budget(self):
+        def slow(_):
+            time.sleep(2)
+            return b'slow'
+        self.server.responses['/slow'] = (200, {}, slow)
+        handler = AsyncRequestHandler()
+        start = time.time()
+        results = handler.run(handler.get_many([self.server.url + '/', self.server.url + '/slow'], budget=0.5))
+        self.assertTrue(time.time() - start < 1.5)
+        self.assertTrue(results[self.server.url + '/'].ok)
+        self.assertTrue(isinstance(results[self.server.url + '/slow'].error, CriticalError))
+
+    def test_hooks(self):
+        class ContentCheckingHandler(AsyncRequestHandler):
+            def parse(self, req):
+                return req.text.upper()
+            def check_content(self, content):
+                if content != 'OK':
+                    raise CriticalError('unexpected content {0}'.format(content))
+        handler = ContentCheckingHandler()
+        results = handler.run(handler.get_many([self.server.url + '/', self.server.url + '/json']))
+        self.assertEqual(results[self.server.url + '/'].content, 'OK')
+        self.assertTrue('unexpected content' in str(results[self.server.url + '/json'].error))
+
+
+def main():
+    # increase the verbosity
+    # verbosity Python >= 2.7
+    #unittest.main(verbosity=2)
+    log.setLevel(logging.DEBUG)
+    suite = unittest.TestLoader().loadTestsFromTestCase(AsyncRequestHandlerTester)
+    unittest.TextTestRunner(verbosity=2).run(suite)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+#  vim:ts=4:sts=4:sw=4:et
+#
+#  Author: Hari Sekhon
+#  Date: 2026-10-19 02:37:51 +0100 (Mon, 19 Oct 2026)
+#
+#  https://github.com/harisekhon/pylib
+#
+#  License: see accompanying Hari Sekhon LICENSE file
+#
+#  If you're using my code you're welcome to connect with me on LinkedIn and optionally send me feedback
+#  to help improve or steer this or other code I publish
+#
+#  https://www.linkedin.com/in/harisekhon
+#
+
+"""
+# ============================================================================ #
+#                   PyUnit Tests for HariSekhon.CheckRunner
+# ============================================================================ #
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+# from __future__ import unicode_literals
+
+import logging
+import os
+import sys
+import unittest
+libdir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.append(libdir)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+# pylint: disable=wrong-import-position
+from harisekhon.utils import log, CodingError, CriticalError
+from harisekhon import CheckRunner, NagiosPlugin
+from fake_plugins import FakeCLI, FakeRestNagiosPlugin
+from stub_http_server import StubHTTPServer
+
+
+class CheckRunnerTester(unittest.TestCase):
+
+    # must prefix with test_ in order for the tests to be called
+
+    class ValueNagiosPlugin(NagiosPlugin):
+        def add_options(self):
+            self.add_opt('-x', '--value')
+            self.add_thresholds(default_warning=5, default_critical=10)
+        def process_options(self):
+            self.validate_thresholds()
+        def run(self):
+            value = self.get_opt('value')
+            if value == 'critical':
+                raise CriticalError('test critical')
+            if value == 'exception':
+                raise ValueError('test exception')
+            self.ok()
+            self.msg = 'value = {0}'.format(value)
+            self.check_thresholds(value)
+            self.msg += ' | value={0}{1}'.format(value, self.get_perf_thresholds())
+
+    class ConstructorNagiosPlugin(ValueNagiosPlugin):
+        # called by the constructor
+        def setup(self):
+            raise ValueError('test constructor')
+
+    class ExceptionCLI(FakeCLI):
+        pass
+
+    def test_run(self):
+        (stdout, stderr) = (sys.stdout, sys.stderr)
+        runner = CheckRunner([(self.ValueNagiosPlugin, ['-x', '1']),
+                              (self.ValueNagiosPlugin, ['-x', '7']),
+                              (self.ValueNagiosPlugin, ('-x', '12', '-c', '20'))])
+        runner.add(self.ValueNagiosPlugin, ['-x', '12'])
+        runner.add(self.ValueNagiosPlugin, ['-x', 'critical'])
+        runner.add(self.ValueNagiosPlugin, ['-x', 'exception'])
+        runner.add(self.ValueNagiosPlugin, ['-x', '1', '--nonexistent'])
+        runner.add(self.ValueNagiosPlugin, ['-x', '1', '-w', 'x'])
+        runner.add(self.ConstructorNagiosPlugin)
+        runner.add(self.ExceptionCLI, [])
+        results = runner.run()
+        self.assertEqual([_.status for _ in results], ['OK', 'WARNING', 'WARNING', 'CRITICAL', 'CRITICAL',
+                                                       'UNKNOWN', 'UNKNOWN', 'UNKNOWN', 'UNKNOWN', 'UNKNOWN'])
+        self.assertEqual([_.code for _ in results], [0, 1, 1, 2, 2, 3, 3, 3, 3, 3])
+        self.assertEqual(results[0].output, 'OK: value = 1 | value=1;5;10')
+        self.assertEqual(results[1].msg, 'value = 7 (7 > 5)')
+        self.assertEqual(list(results[2].get_perfdata().items()), [('value', 12)])
+        self.assertEqual(results[2].perfdata, 'value=12;5;20')
+        self.assertEqual(results[4].msg, 'test critical')
+        self.assertTrue(results[5].msg.startswith('Nagios Plugin Exception: ValueError: '))
+        self.assertEqual(results[6].msg, 'no such option: --nonexistent')
+        self.assertTrue(results[7].msg.startswith('invalid warning threshold'))
+        self.assertTrue(results[8].msg.startswith('ConstructorNagiosPlugin Exception: ValueError: test constructor'))
+        self.assertTrue(results[9].msg.startswith('ExceptionCLI Exception: KeyError: '))
+        self.assertTrue(results[0].timings['run'] >= 0)
+        # NagiosPlugin points stderr at stdout
+        self.assertTrue(sys.stdout is stdout)
+        self.assertTrue(sys.stderr is stderr)
+
+    def test_rest_timings(self):
+        with StubHTTPServer({'/status': (200, {}, b'OK')}) as server:
+            args = ['-H', server.server_address[0], '-P', str(server.server_address[1])]
+            runner = CheckRunner([(FakeRestNagiosPlugin, args),
+                                  (FakeRestNagiosPlugin, args + ['--phase-timings'])])
+            results = runner.run()
+        self.assertEqual([_.output.split(' | ')[0] for _ in results], ['OK: status = OK'] * 2)
+        self.assertEqual(list(results[0].timings), ['query', 'run'])
+        self.assertEqual(list(results[1].timings), ['query', 'dns', 'connect', 'ttfb', 'transfer', 'run'])
+        self.assertTrue('ttfb_time' in results[1].get_perfdata())
+
+    def test_invalid_jobs(self):
+        for job in ((None, []), ('ValueNagiosPlugin', []), (object, []), (self.ValueNagiosPlugin, '-x 1')):
+            try:
+                CheckRunner([job])
+                raise Exception('failed to raise CodingError for invalid job {0}'.format(job))
+            except CodingError:
+                pass
+
+
+def main():
+    # increase the verbosity
+    # verbosity Python >= 2.7
+    #unittest.main(verbosity=2)
+    log.setLevel(logging.DEBUG)
+    suite = unittest.TestLoader().loadTestsFromTestCase(CheckRunnerTester)
+    unittest.TextTestRunner(verbosity=2).run(suite)
+
+if __name__ == '__main__':
+    main()
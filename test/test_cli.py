@@ -26,6 +26,7 @@ from __future__ import print_function
 
 import logging
 import os
+import signal
 import sys
 import time
 import unittest
@@ -34,8 +35,8 @@ from optparse import OptionConflictError
 libdir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
 sys.path.append(libdir)
 # pylint: disable=wrong-import-position
-from harisekhon.utils import CodingError, InvalidOptionException, log
-from harisekhon import CLI
+from harisekhon.utils import CodingError, InvalidOptionException, Deadline, log
+from harisekhon import CLI, CLIResult
 
 
 class CLITester(unittest.TestCase):
@@ -106,6 +107,18 @@ class CLITester(unittest.TestCase):
         self.cli.main()
         self.assertEqual(self.cli.get_opt('timeout'), self.cli.options.timeout)
 
+    def test_deadline(self):
+        self.assertEqual(self.cli.deadline, None)
+        self.assertEqual(self.cli.timeout_remaining, None)
+        self.cli.main()
+        self.assertTrue(isinstance(self.cli.deadline, Deadline))
+        self.assertEqual(self.cli.deadline.secs, self.cli.timeout)
+        self.assertEqual(self.cli.deadline.reserve, 1)
+        self.assertTrue(self.cli.deadline.remaining() <= self.cli.timeout - 1)
+        self.assertTrue(self.cli.timeout_remaining <= self.cli.timeout)
+        self.cli.disable_timeout()
+        self.assertEqual(self.cli.deadline, None)
+
 
     def test_reinit_main(self):
         self.cli.__init__()
@@ -156,6 +169,19 @@ class CLITester(unittest.TestCase):
             if _.code != 3:
                 raise Exception('wrong exit code != 3 when exiting usage(test message) from base class CLI')
 
+    def test_usage_help_width(self):
+        # terminal width is only resolved when printing help
+        self.assertEqual(self.cli._CLI__parser.formatter.width, 80)
+        os.environ['COLUMNS'] = '50'
+        try:
+            self.cli.usage()
+            raise Exception('failed to exit on CLI.usage()')
+        except SystemExit as _:
+            self.assertEqual(_.code, 3)
+        finally:
+            del os.environ['COLUMNS']
+        self.assertEqual(self.cli._CLI__parser.formatter.width, 50)
+
     #def test_parser_version(self):
     #    print('parser version = %s' % self.cli.__parser.get_version())
         # I don't populate version in OptionParser now as it creates the switch too high in the option order
@@ -248,6 +274,47 @@ class CLITester(unittest.TestCase):
             if _.code != 3:
                 raise Exception('wrong exit code != 3 when self timing out CLI')
 
+    def test_main_return_result(self):
+        cli = self.SubCLI()
+        cli.add_options = lambda: cli.add_opt('-x', '--value')
+        result = cli.main(['-x', 'test'], return_result=True)
+        self.assertEqual(result.status, 'OK')
+        self.assertEqual(result.code, 0)
+        self.assertEqual(cli.get_opt('value'), 'test')
+        self.assertTrue(result.timings['run'] >= 0)
+        # the option error rather than the usage
+        result = self.SubCLI().main(['--nonexistent'], return_result=True)
+        self.assertEqual((result.status, result.msg), ('UNKNOWN', 'no such option: --nonexistent'))
+        cli = self.SubCLI()
+        cli.run = lambda: cli.usage('test usage', status='CRITICAL')
+        self.assertEqual(repr(cli.main([], return_result=True)), "CLIResult('CRITICAL: test usage')")
+
+    def test_main_return_result_timeout(self):
+        log_level = log.level
+        alarm_handler = signal.getsignal(signal.SIGALRM)
+        cli = self.SubCLI()
+        cli.run = lambda: time.sleep(3)
+        result = cli.main(['-t', '1', '-vvv'], return_result=True)
+        self.assertEqual((result.status, result.msg), ('UNKNOWN', 'self timed out after 1 second'))
+        self.assertTrue(result.timings['run'] < 2)
+        self.assertEqual(signal.alarm(0), 0)
+        self.assertEqual(signal.getsignal(signal.SIGALRM), alarm_handler)
+        self.assertEqual(log.level, log_level)
+
+    def test_cli_result(self):
+        result = CLIResult('WARNING', "used = 85% (> 80%) | used=85%;80;90 'free space'=1.5GB;;;0 rate=U")
+        self.assertEqual(result.code, 1)
+        self.assertEqual(result.msg, 'used = 85% (> 80%)')
+        self.assertEqual(result.perfdata, "used=85%;80;90 'free space'=1.5GB;;;0 rate=U")
+        self.assertEqual(list(result.get_perfdata().items()), [('used', 85), ('free space', 1.5), ('rate', None)])
+        self.assertEqual(result.output, "WARNING: used = 85% (> 80%) | used=85%;80;90 'free space'=1.5GB;;;0 rate=U")
+        self.assertEqual(CLIResult('OK').output, 'OK')
+        self.assertEqual(CLIResult.from_exit(SystemExit(2)).status, 'CRITICAL')
+        self.assertEqual(CLIResult.from_exit(SystemExit()).status, 'OK')
+        self.assertEqual(CLIResult.from_exit(SystemExit(42)).status, 'UNKNOWN')
+        result = CLIResult.from_exit(SystemExit('error'))
+        self.assertEqual((result.status, result.msg), ('WARNING', 'error'))
+
     def test_invalidoptionexception(self):
         self.cli.__init__()
 
@@ -0,0 +1,191 @@
+#  vim:ts=4:sts=4:sw=4:et
+#
+#  Author: Hari Sekhon
+#  Date: 2026-10-19 01:41:15 +0100 (Mon, 19 Oct 2026)
+#
+#  https://github.com/harisekhon/pylib
+#
+#  License: see accompanying Hari Sekhon LICENSE file
+#
+#  If you're using my code you're welcome to connect with me on LinkedIn and optionally send me feedback
+#  to help improve or steer this or other code I publish
+#
+#  https://www.linkedin.com/in/harisekhon
+#
+
+"""
+# ============================================================================ #
+#          PyUnit Tests for HariSekhon.HTMLLabelScanner / RequestHTMLScanHandler
+# ============================================================================ #
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+# from __future__ import unicode_literals
+
+import logging
+import os
+import re
+import sys
+import unittest
+libdir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.append(libdir)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+# pylint: disable=wrong-import-position
+from bs4 import BeautifulSoup
+from harisekhon.utils import log, CodingError
+from harisekhon.html_scan import HTMLLabelScanner, scan_html
+from harisekhon import RequestHTMLScanHandler
+from stub_http_server import StubHTTPServer
+
+
+def chunked(data, size):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+class HTMLScanTester(unittest.TestCase):
+
+    # must prefix with test_ in order for the tests to be called
+
+    # a status page with layout tables, the usual th / td pairs and the markup quirks seen in the wild
+    page = (u'<!DOCTYPE html><html><head><title>NameNode</title><style>th { color: red }</style>'
+            u'<script>var s = "<th>Uptime:</th><td>fake</td>";</script></head><body>'
+            u'<table class="layout"><tr><td><div class="nav"><a href="/">home</a></div>'
+            u'<table><tr><th>Started:</th><td>Mon Oct 19 01:41:15 BST 2026</td></tr>'
+            u'<tr><th> Version: </th><td>2.7.3, r<b>baa91f7</b></td></tr>'
+            u'<!-- <tr><th>Cluster ID:</th><td>commented</td></tr> -->'
+            u'<tr><th>Cluster ID:</th><td>CID-1234 &amp; caf\xe9</td></tr>'
+            u'<tr><th>Compiled:<td>2016-08-18 by root<tr><th>Heap:<br></th><td>1.5 GB</td></tr>'
+            u'</table></td></tr></table>'
+            u'<dl><dt>Live Nodes</dt><dd><a href="#live">12</a> (Decommissioned: 0)</dd><dt>Dead Nodes<dd>0</dl>'
+            u'<p><b>Safemode:</b> <span>off</span></p>'
+            u'<p><b>Orphan:</b></p><span>not a sibling</span>'
+            u'<table><tr><th>Last:</th><td>unclosed at the end')
+
+    rules = {
+        'started': 'Started:',
+        'version': re.compile(r'^Version:?$', re.I),
+        'cluster_id': 'Cluster ID:',
+        'compiled': 'Compiled:',
+        'heap': 'Heap:',
+        'live_nodes': 'Live Nodes',
+        'dead_nodes': 'Dead Nodes',
+        'safemode': 'Safemode:',
+        'orphan': 'Orphan:',
+        'last': 'Last:',
+        'uptime': 'Uptime:',
+    }
+
+    expected = {
+        'started': 'Mon Oct 19 01:41:15 BST 2026',
+        'version': '2.7.3, rbaa91f7',
+        'cluster_id': u'CID-1234 & caf\xe9',
+        'compiled': '2016-08-18 by root',
+        'heap': '1.5 GB',
+        'live_nodes': '12 (Decommissioned: 0)',
+        'dead_nodes': '0',
+        'safemode': 'off',
+        'last': 'unclosed at the end',
+    }
+
+    def test_scan(self):
+        self.assertEqual(scan_html([self.page], self.rules), self.expected)
+        data = self.page.encode('utf-8')
+        # including splitting tags, entities and multi-byte chars across chunks
+        for size in (1, 2, 3, 7, 64, 65536):
+            self.assertEqual(scan_html(chunked(data, size), self.rules), self.expected)
+            self.assertEqual(scan_html(chunked(self.page, size), self.rules), self.expected)
+        self.assertEqual(scan_html([self.page.encode('latin-1', 'replace')], {'cluster_id': 'Cluster ID:'},
+                                   encoding='latin-1'),
+                         {'cluster_id': u'CID-1234 & caf\xe9'})
+
+    def test_matches_bs4(self):
+        # the values of the th labels are what BeautifulSoup gives for the next sibling's text
+        soup = BeautifulSoup(self.page, 'html.parser')
+        for (name, label) in (('started', 'Started:'), ('version', re.compile('Version')),
+                              ('cluster_id', 'Cluster ID:')):
+            th = soup.find('th', string=label)
+            self.assertEqual(th.find_next_sibling().get_text().strip(), self.expected[name])
+
+    def test_stops_when_found(self):
+        consumed = []
+        def chunks():
+            yield b'<table><tr><th>Uptime:</th><td>3 days</td></tr>'
+            for _ in range(100000):
+                consumed.append(1)
+                yield b'<tr><td>filler</td><td>row</td></tr>'
+        self.assertEqual(scan_html(chunks(), {'uptime': 'Uptime:'}), {'uptime': '3 days'})
+        self.assertTrue(len(consumed) <= 1)
+
+    def test_layout_label_length(self):
+        # the text of a large layout cell isn't kept, the label cells within it still match
+        page = '<table><tr><td>' + 'x' * 100000 + '<table><tr><th>Uptime:</th><td>3 days</td></tr></table></td></tr>'
+        scanner = HTMLLabelScanner({'uptime': 'Uptime:', 'missing': 'Missing:'})
+        self.assertEqual(scanner.scan(chunked(page, 1000)), {'uptime': '3 days'})
+        self.assertEqual(scanner.stack, [])
+        self.assertEqual(scanner.captures, [])
+
+    def test_label_tags(self):
+        page = '<div>Uptime:</div><div>3 days</div><th>Uptime:</th><td>other</td>'
+        self.assertEqual(scan_html([page], {'uptime': 'Uptime:'}), {'uptime': 'other'})
+        self.assertEqual(scan_html([page], {'uptime': 'Uptime:'}, label_tags=('div',)), {'uptime': '3 days'})
+
+    def test_invalid_rules(self):
+        for rules in (None, {}, {'uptime': 1}, ['Uptime:']):
+            try:
+                HTMLLabelScanner(rules)
+                raise Exception('failed to raise CodingError for invalid rules {0}'.format(rules))
+            except CodingError:
+                pass
+
+    class StatusRequestHTMLScanHandler(RequestHTMLScanHandler):
+        rules = {'version': re.compile('^Version:?$'), 'cluster_id': 'Cluster ID:'}
+        def parse(self, values):
+            return values
+
+    def test_request_html_scan_handler(self):
+        page = self.page.encode('utf-8') + b'<table>' + b'<tr><td>filler</td><td>row</td></tr>' * 200000
+        with StubHTTPServer({'/': (200, {'Content-Type': 'text/html'}, page),
+                             '/latin1': (200, {'Content-Type': 'text/html; charset=ISO-8859-1'},
+                                         self.page.encode('latin-1', 'replace'))}) as server:
+            handler = self.StatusRequestHTMLScanHandler()
+            self.assertTrue(handler.stream)
+            consumed = []
+            iter_content = handler.iter_content
+            def counting_iter_content(req, chunk_size=None):
+                for chunk in iter_content(req, chunk_size):
+                    consumed.append(len(chunk))
+                    yield chunk
+            handler.iter_content = counting_iter_content
+            req = handler._send('get', server.url)  # pylint: disable=protected-access
+            expected = {'version': self.expected['version'], 'cluster_id': self.expected['cluster_id']}
+            self.assertEqual(handler.__parse__(req), expected)
+            # stopped after the first chunk of the 7MB page
+            self.assertTrue(sum(consumed) < len(page) / 10)
+            self.assertEqual(handler.get_encoding(req), 'utf-8')
+            req = handler._send('get', server.url + '/latin1')  # pylint: disable=protected-access
+            self.assertEqual(handler.get_encoding(req), 'iso8859-1')
+            self.assertEqual(handler.__parse__(req), expected)
+            # req() end to end
+            self.StatusRequestHTMLScanHandler().get(server.url)
+            handler = self.StatusRequestHTMLScanHandler()
+            handler.rules = None
+            try:
+                handler.get(server.url)
+                raise Exception('failed to raise CodingError for handler without rules')
+            except CodingError:
+                pass
+
+
+def main():
+    # increase the verbosity
+    # verbosity Python >= 2.7
+    #unittest.main(verbosity=2)
+    log.setLevel(logging.DEBUG)
+    suite = unittest.TestLoader().loadTestsFromTestCase(HTMLScanTester)
+    unittest.TextTestRunner(verbosity=2).run(suite)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,210 @@
+#  vim:ts=4:sts=4:sw=4:et
+#
+#  Author: Hari Sekhon
+#  Date: 2026-10-18 23:21:40 +0100 (Sun, 18 Oct 2026)
+#
+#  https://github.com/harisekhon/pylib
+#
+#  License: see accompanying Hari Sekhon LICENSE file
+#
+#  If you're using my code you're welcome to connect with me on LinkedIn and optionally send me feedback
+#  to help improve or steer this or other code I publish
+#
+#  https://www.linkedin.com/in/harisekhon
+#
+
+"""
+# ============================================================================ #
+#                 PyUnit Tests for HariSekhon.JSONPathExtractor
+# ============================================================================ #
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+# from __future__ import unicode_literals
+
+import json
+import logging
+import os
+import random
+import sys
+import unittest
+libdir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.append(libdir)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+# pylint: disable=wrong-import-position
+from harisekhon.utils import log, UnknownError
+from harisekhon.json_stream import JSONPathExtractor, extract_json_paths
+from harisekhon import RequestHandler
+from harisekhon.nagiosplugin import RestNagiosPlugin
+from stub_http_server import StubHTTPServer
+
+
+def chunked(data, size):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+def generate_jmx(beans):
+    # a large /jmx style document
+    return {
+        'beans': [{
+            'name': 'Hadoop:service=NameNode,name=Bean{0}'.format(i),
+            'modelerType': 'bean "quoted" \\ {braces} [brackets] é',
+            'attributes': dict([('attr{0}'.format(j), j * 1.5) for j in range(20)]),
+            'list': list(range(30)),
+            'empty': {},
+            'nested': [[], [{}], None, True, False],
+        } for i in range(beans)],
+        'clusterName': 'test cluster',
+    }
+
+
+class JSONStreamTester(unittest.TestCase):
+
+    # must prefix with test_ in order for the tests to be called
+
+    def setUp(self):
+        self.doc = generate_jmx(2000)
+        self.data = json.dumps(self.doc).encode('utf-8')
+
+    def test_extract_large_document(self):
+        paths = ['clusterName', 'beans.0.name', 'beans.1999.attributes.attr19', 'beans.7.nested.1',
+                 'beans.3.modelerType', 'beans.5.list', ('beans', 6, 'empty')]
+        for chunk_size in (1, 7, 4096, len(self.data)):
+            if chunk_size == 1:
+                # too slow for the whole document a byte at a time
+                data = json.dumps({'beans': self.doc['beans'][:3]}).encode('utf-8')
+                found = extract_json_paths(chunked(data, 1), ['beans.2.name', 'beans.1.modelerType'])
+                self.assertEqual(found, {'beans.2.name': 'Hadoop:service=NameNode,name=Bean2',
+                                         'beans.1.modelerType': self.doc['beans'][1]['modelerType']})
+                continue
+            found = extract_json_paths(chunked(self.data, chunk_size), paths)
+            self.assertEqual(found['clusterName'], 'test cluster')
+            self.assertEqual(found['beans.0.name'], 'Hadoop:service=NameNode,name=Bean0')
+            self.assertEqual(found['beans.1999.attributes.attr19'], 19 * 1.5)
+            self.assertEqual(found['beans.7.nested.1'], [{}])
+            self.assertEqual(found['beans.3.modelerType'], self.doc['beans'][3]['modelerType'])
+            self.assertEqual(found['beans.5.list'], list(range(30)))
+            self.assertEqual(found[('beans', 6, 'empty')], {})
+
+    def test_stops_when_found(self):
+        chunks = list(chunked(self.data, 1024))
+        iterator = iter(chunks)
+        found = extract_json_paths(iterator, ['beans.0.name'])
+        self.assertEqual(found, {'beans.0.name': 'Hadoop:service=NameNode,name=Bean0'})
+        # most of the document was never read
+        self.assertTrue(len(list(iterator)) > len(chunks) * 0.9)
+
+    def test_missing_paths(self):
+        found = extract_json_paths(chunked(self.data, 4096), ['nonexistent', 'beans.2000.name', 'clusterName.x',
+                                                             'beans.0.name'])
+        self.assertEqual(found, {'beans.0.name': 'Hadoop:service=NameNode,name=Bean0'})
+        self.assertEqual(extract_json_paths([b'[]'], ['0']), {})
+        self.assertEqual(extract_json_paths([b'{}'], []), {})
+
+    def test_big_ints(self):
+        data = b'{"used": 18446744073709551616, "beans": [{"free": -9223372036854775809, "ratio": 0.5}]}'
+        found = extract_json_paths(chunked(data, 7), ['used', 'beans.0'])
+        self.assertEqual(repr(found['used']), '18446744073709551616')
+        self.assertEqual(found['beans.0'], {'free': -9223372036854775809, 'ratio': 0.5})
+
+    def test_nested_paths(self):
+        found = extract_json_paths(chunked(self.data, 4096), ['beans.1', 'beans.1.name', 'beans.1.list.2'])
+        self.assertEqual(found['beans.1'], self.doc['beans'][1])
+        self.assertEqual(found['beans.1.name'], self.doc['beans'][1]['name'])
+        self.assertEqual(found['beans.1.list.2'], 2)
+
+    def test_random_documents(self):
+        rand = random.Random(1)
+        def generate(depth=0):
+            _ = rand.random()
+            if depth > 4 or _ < 0.4:
+                return rand.choice([1, -2.5e3, 'a "b" \\ c {[', u'中é', True, None, False, '', 0])
+            if _ < 0.7:
+                return dict([('k{0}'.format(i), generate(depth + 1)) for i in range(rand.randint(0, 4))])
+            return [generate(depth + 1) for _ in range(rand.randint(0, 4))]
+        def paths(value, path=()):
+            yield path
+            items = []
+            if isinstance(value, dict):
+                items = value.items()
+            elif isinstance(value, list):
+                items = [(str(i), _) for (i, _) in enumerate(value)]
+            for (key, subvalue) in items:
+                for _ in paths(subvalue, path + (key,)):
+                    yield _
+        def get(value, path):
+            for key in path:
+                value = value[key] if isinstance(value, dict) else value[int(key)]
+            return value
+        for _ in range(200):
+            doc = {'root': generate()}
+            data = json.dumps(doc, ensure_ascii=rand.random() < 0.5, indent=rand.choice([None, 1])).encode('utf-8')
+            all_paths = [_ for _ in paths(doc) if _]
+            selected = rand.sample(all_paths, min(len(all_paths), 3))
+            found = JSONPathExtractor(selected).extract(chunked(data, rand.randint(1, 9)))
+            for path in selected:
+                self.assertEqual(found[path], get(doc, path))
+
+    def test_invalid_json(self):
+        for data in (b'{"a": ', b'{"a" 1}', b'{"a": "unterminated', b'{"a": [1, 2'):
+            try:
+                extract_json_paths([data], ['a.5'])
+                raise Exception('failed to raise ValueError for invalid json {0!r}'.format(data))
+            except ValueError:
+                pass
+
+    def test_request_handler_json_paths(self):
+        with StubHTTPServer({'/jmx': (200, {}, self.data)}) as server:
+            handler = RequestHandler()
+            handler.json_paths = ['clusterName', 'beans.1.name']
+            handler.stream = True
+            req = handler.get(server.url + '/jmx')
+            self.assertEqual(req.json_values, {'clusterName': 'test cluster',
+                                               'beans.1.name': 'Hadoop:service=NameNode,name=Bean1'})
+
+    def test_rest_nagiosplugin_json_paths(self):
+        class JMXPlugin(RestNagiosPlugin):
+            def __init__(self):
+                super(JMXPlugin, self).__init__()
+                self.name = 'test'
+                self.path = 'jmx'
+                self.json = True
+                self.auth = False
+                self.json_paths = ['beans.0.attributes.attr2', 'clusterName']
+            def parse_json(self, json_data):
+                self.msg = '{0} = {1}'.format(json_data['clusterName'], json_data['beans.0.attributes.attr2'])
+        with StubHTTPServer({'/jmx': (200, {}, self.data)}) as server:
+            os.environ['HOST'] = server.server_address[0]
+            os.environ['PORT'] = str(server.server_address[1])
+            plugin = JMXPlugin()
+            try:
+                plugin.main()
+                raise Exception('plugin failed to exit')
+            except SystemExit as _:
+                self.assertEqual(_.code, 0)
+            finally:
+                del os.environ['HOST']
+                del os.environ['PORT']
+            self.assertTrue(plugin.request.stream)
+            self.assertTrue(plugin.msg.startswith('test cluster = 3.0 |'))
+            plugin.json_paths.append('nonexistent')
+            try:
+                plugin.run()
+                raise Exception('failed to raise UnknownError for missing json path')
+            except UnknownError as _:
+                self.assertTrue('nonexistent' in str(_))
+
+
+def main():
+    # increase the verbosity
+    # verbosity Python >= 2.7
+    #unittest.main(verbosity=2)
+    log.setLevel(logging.DEBUG)
+    suite = unittest.TestLoader().loadTestsFromTestCase(JSONStreamTester)
+    unittest.TextTestRunner(verbosity=2).run(suite)
+
+if __name__ == '__main__':
+    main()
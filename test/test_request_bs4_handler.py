@@ -26,15 +26,20 @@ from __future__ import print_function
 
 import logging
 import os
+import re
 import sys
 import unittest
 # inspect.getfile(inspect.currentframe()) # filename
 import requests
 libdir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
 sys.path.append(libdir)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 # pylint: disable=wrong-import-position
-from harisekhon.utils import log
-from harisekhon import RequestBS4Handler
+from bs4 import SoupStrainer
+from harisekhon.utils import log, CodingError, UnknownError
+from harisekhon.request_bs4_handler import get_html_parser, set_html_parser, _html_parsers
+from fake_request_bs4_handler import FakeRequestBS4Handler
+from stub_http_server import StubHTTPServer
 
 
 class RequestBS4HandlerTester(unittest.TestCase):
@@ -43,15 +48,240 @@ class RequestBS4HandlerTester(unittest.TestCase):
 
     # Not using assertRaises >= 2.7 and maintaining compatibility with Python 2.6 servers
 
-    class SubRequestBS4Handler(RequestBS4Handler):
-        def parse(self, soup):
-            pass
+    class StrainedRequestBS4Handler(FakeRequestBS4Handler):
+        parse_only = ['th', 'td']
+
+    html = b'<html><head><title>Status</title></head><body>' + \
+           b'<div class="nav"><a href="/">home</a></div>' * 1000 + \
+           b'<table><tr><th>Uptime:</th><td>3 days</td></tr>' + \
+           b'<tr><th>Version:</th><td><b>1.2.3</b></td></tr></table>' + \
+           b'<p id="footer">footer</p></body></html>'
+
+    # pages in the styles of the status pages scraped, including the markup errors they have in the wild
+    corpus = (
+        b'<html><body><table><tr><th>Uptime:</th><td>3 days</td></tr>'
+        b'<tr><th>Version:</th><td>1.2.3, r1234</td></tr></table></body></html>',
+        # no closing head, body, html or paragraph tags. Not unclosed cells, which html.parser nests, see below
+        b'<html><head><title>Master</title><body><p>Master status<table><tr><th>Uptime:</th><td>5 mins</td></tr>'
+        b'<tr><th>Version:</th><td>2.0</td></tr></table>',
+        # no html / body, entities, nested markup and whitespace within cells
+        b'<h1 id="status">Running &amp; healthy</h1><table>\n<tr>\n  <th> Live Nodes: </th>\n'
+        b'  <td><a href="/nodes?live=1">12</a>&nbsp;(0 decommissioning)</td>\n</tr></table>',
+        # duplicate / unquoted attributes, comments and scripts
+        b'<div class=nav class=x><!-- <th>Hidden:</th><td>x</td> --><script>var s = "<th>Script:</th>";</script>'
+        b'<table border=1><tr><th>Heap Used:</th><td>1.5 GB / 4 GB (37%)</td></tr></table></div>',
+        # stray end tags
+        b'<table><tr><th>Cluster ID:</th><td>CID-1234</td></tr></p></span><tr><th>Ratio:</th><td>1 &lt; 2</td></tr>'
+        b'</table>',
+    )
+
+    # unclosed cells, which html.parser nests inside the previous cell while lxml and html5lib close them
+    divergent_html = b'<table><tr><th>Uptime:<td>3 days<tr><th>Version:<td>1.2.3</table>'
+
+    class CorpusRequestBS4Handler(FakeRequestBS4Handler):
+        status_and_links = True
+
+    class StrainedCorpusRequestBS4Handler(CorpusRequestBS4Handler):
+        parse_only = ['th', 'td']
+
+    class FieldsRequestBS4Handler(FakeRequestBS4Handler):
+        fields = {
+            'uptime': {'tag': 'th', 'text': re.compile('^Uptime:?$', re.I), 'next_sibling': 'td'},
+            'version': {'tag': 'th', 'text': 'Version:', 'next_sibling': True, 'child': 'b'},
+            'live_nodes_link': {'tag': 'a', 'attrs': {'href': re.compile('live')}, 'attr': 'href'},
+            'status': {'attrs': {'id': 'status'}},
+            'nav': {'tag': 'div', 'attrs': {'class': 'nav'}, 'attr': 'class'},
+            'heap': {'tag': ['th', 'td'], 'text': 'Heap:', 'next_sibling': 'td', 'optional': True},
+        }
+
+    fields_html = b'<html><body><h1 id="status">Running</h1><div class="nav main"><a href="/">home</a></div>' + \
+                  b'<table><tr><th> Uptime </th><td>3 days</td></tr>' + \
+                  b'<tr><th>Version:</th><td>version <b>1.2.3</b></td></tr></table>' + \
+                  b'<a href="/nodes?live=1">12</a></body></html>'
 
     # TODO: mock this
     def test_request_bs4_handler(self):
-        req = self.SubRequestBS4Handler().get('www.travis-ci.org')
+        req = FakeRequestBS4Handler().get('www.travis-ci.org')
         self.assertTrue(isinstance, requests.Response)
-        self.SubRequestBS4Handler(req)
+        FakeRequestBS4Handler(req)
+
+    def test_parse_only(self):
+        with StubHTTPServer({'/': (200, {}, self.html)}) as server:
+            expected = {'Uptime': '3 days', 'Version': '1.2.3'}
+            self.assertEqual(FakeRequestBS4Handler().get(server.url).content, self.html)
+            # pylint: disable=protected-access
+            req = FakeRequestBS4Handler()._send('get', server.url)
+            self.assertEqual(FakeRequestBS4Handler().__parse__(req), expected)
+            handler = self.StrainedRequestBS4Handler()
+            self.assertEqual(handler.__parse__(req), expected)
+            soup = []
+            handler.parse = soup.append
+            handler.__parse__(req)
+            self.assertEqual(soup[0].find('div'), None)
+            self.assertEqual(soup[0].find('title'), None)
+            self.assertEqual(soup[0].find('b').get_text(), '1.2.3')
+
+    def test_parse_only_forms(self):
+        handler = self.StrainedRequestBS4Handler()
+        strainer = handler.get_strainer()
+        self.assertTrue(isinstance(strainer, SoupStrainer))
+        # built once per class
+        self.assertTrue(self.StrainedRequestBS4Handler().get_strainer() is strainer)
+        self.assertEqual(FakeRequestBS4Handler().get_strainer(), None)
+        class AttrsRequestBS4Handler(FakeRequestBS4Handler):
+            parse_only = {'id': 'footer'}
+        self.assertTrue(AttrsRequestBS4Handler().get_strainer() is not strainer)
+        with StubHTTPServer({'/': (200, {}, self.html)}) as server:
+            soup = []
+            handler = AttrsRequestBS4Handler()
+            handler.parse = soup.append
+            handler.get(server.url)
+            self.assertEqual([_.name for _ in soup[0].find_all()], ['p'])
+        strainer = SoupStrainer('td')
+        handler.parse_only = strainer
+        self.assertTrue(handler.get_strainer() is strainer)
+        for parse_only in ([], ['th', 1], 1):
+            handler.parse_only = parse_only
+            try:
+                handler.get_strainer()
+                raise Exception('failed to raise CodingError for parse_only {0}'.format(parse_only))
+            except CodingError:
+                pass
+
+    class FakeBuilderRegistry(object):
+        # as if every HTML parser were installed
+        @staticmethod
+        def lookup(_):
+            return True
+
+    def test_html_parser_selection(self):
+        import harisekhon.request_bs4_handler
+        html_parser = get_html_parser()
+        builder_registry = harisekhon.request_bs4_handler.builder_registry
+        try:
+            # html.parser unless opted in to another, even with lxml installed
+            harisekhon.request_bs4_handler.builder_registry = self.FakeBuilderRegistry()
+            harisekhon.request_bs4_handler._html_parser = None  # pylint: disable=protected-access
+            self.assertEqual(get_html_parser(), 'html.parser')
+            self.assertEqual(self.CorpusRequestBS4Handler().get_html_parser(), 'html.parser')
+            self.assertEqual(set_html_parser('auto'), 'lxml')
+            self.assertEqual(set_html_parser(''), 'html.parser')
+            class AutoRequestBS4Handler(self.CorpusRequestBS4Handler):
+                html_parser = 'auto'
+            self.assertEqual(AutoRequestBS4Handler().get_html_parser(), 'lxml')
+            harisekhon.request_bs4_handler.builder_registry = builder_registry
+            self.assertEqual(AutoRequestBS4Handler().get_html_parser(),
+                             'lxml' if builder_registry.lookup('lxml') else 'html.parser')
+            self.assertTrue(set_html_parser('auto') in ('lxml', 'html.parser'))
+            self.assertEqual(set_html_parser('html.parser'), 'html.parser')
+            self.assertEqual(set_html_parser('nonexistent'), 'html.parser')
+            self.assertTrue(set_html_parser('lxml') in ('lxml', 'html.parser'))
+            self.assertEqual(self.CorpusRequestBS4Handler().get_html_parser(), get_html_parser())
+            self.assertEqual(self.CorpusRequestBS4Handler(html_parser='html.parser').get_html_parser(), 'html.parser')
+            self.assertEqual(self.CorpusRequestBS4Handler(html_parser='nonexistent').get_html_parser(), 'html.parser')
+            os.environ['HARISEKHON_HTML_PARSER'] = 'nonexistent'
+            harisekhon.request_bs4_handler._html_parser = None  # pylint: disable=protected-access
+            self.assertEqual(get_html_parser(), 'html.parser')
+        finally:
+            harisekhon.request_bs4_handler.builder_registry = builder_registry
+            os.environ.pop('HARISEKHON_HTML_PARSER', None)
+            set_html_parser(html_parser)
+
+    def test_html_parser_divergence(self):
+        # why html.parser stays the default, the parsers differ on unclosed cells, so installing lxml mustn't
+        # change this
+        with StubHTTPServer({'/': (200, {}, self.divergent_html)}) as server:
+            handler = self.CorpusRequestBS4Handler()
+            self.assertEqual(handler.get_html_parser(), 'html.parser')
+            req = handler._send('get', server.url)  # pylint: disable=protected-access
+            self.assertEqual(handler.__parse__(req), {'Uptime:3 daysVersion:1.2.3': None, 'Version:1.2.3': None,
+                                                      'links': []})
+            self.assertEqual(self.CorpusRequestBS4Handler(html_parser='html.parser').__parse__(req),
+                             handler.__parse__(req))
+
+    def test_html_parser_consistency(self):
+        # parse() of the corpus must give the same results with each parser installed, for opting in to them
+        from bs4.builder import builder_registry
+        html_parsers = [_ for _ in _html_parsers if builder_registry.lookup(_) is not None]
+        self.assertTrue('html.parser' in html_parsers)
+        if len(html_parsers) < 2:
+            self.skipTest('only html.parser is installed, nothing to compare it with, ' +
+                          'install lxml and / or html5lib to run this test')
+        with StubHTTPServer(dict([('/{0}'.format(i), (200, {}, page)) for (i, page) in enumerate(self.corpus)])) \
+                as server:
+            for handler_class in (self.CorpusRequestBS4Handler, self.StrainedCorpusRequestBS4Handler):
+                results = {}
+                for html_parser in html_parsers:
+                    # html5lib doesn't support parse_only
+                    if html_parser == 'html5lib' and handler_class.parse_only:
+                        continue
+                    handler = handler_class(html_parser=html_parser)
+                    results[html_parser] = []
+                    for i in range(len(self.corpus)):
+                        req = handler._send('get', '{0}/{1}'.format(server.url, i))  # pylint: disable=protected-access
+                        results[html_parser].append(handler.__parse__(req))
+                log.info('%s results: %s', handler_class.__name__, results)
+                expected = results['html.parser']
+                self.assertEqual(expected[0], {'Uptime': '3 days', 'Version': '1.2.3, r1234', 'links': []})
+                self.assertEqual(expected[1]['Version'], '2.0')
+                self.assertEqual(expected[2]['Live Nodes'], '12\xa0(0 decommissioning)')
+                self.assertEqual(expected[3]['Heap Used'], '1.5 GB / 4 GB (37%)')
+                self.assertFalse('Hidden' in expected[3])
+                self.assertEqual(expected[4]['Ratio'], '1 < 2')
+                for html_parser in results:
+                    self.assertEqual(results[html_parser], expected,
+                                     '{0} results differ from html.parser'.format(html_parser))
+
+    def test_fields(self):
+        with StubHTTPServer({'/': (200, {}, self.fields_html)}) as server:
+            handler = self.FieldsRequestBS4Handler()
+            req = handler._send('get', server.url)  # pylint: disable=protected-access
+            self.assertEqual(handler.__parse__(req), {
+                'uptime': '3 days',
+                'version': '1.2.3',
+                'live_nodes_link': '/nodes?live=1',
+                'status': 'Running',
+                'nav': 'nav main',
+            })
+            # compiled once per class
+            specs = handler.get_field_specs()
+            self.assertTrue(self.FieldsRequestBS4Handler().get_field_specs() is specs)
+            self.assertEqual(len(specs), 6)
+            # parse_only still applies
+            class StrainedFieldsRequestBS4Handler(self.FieldsRequestBS4Handler):
+                parse_only = ['th', 'td']
+                fields = dict([(_, self.FieldsRequestBS4Handler.fields[_]) for _ in ('uptime', 'version')])
+            handler = StrainedFieldsRequestBS4Handler()
+            self.assertEqual(handler.__parse__(req), {'uptime': '3 days', 'version': '1.2.3'})
+
+    def test_fields_missing(self):
+        class MissingFieldsRequestBS4Handler(self.FieldsRequestBS4Handler):
+            fields = {
+                'uptime': {'tag': 'th', 'text': 'Uptime', 'next_sibling': 'span'},
+                'version': {'tag': 'th', 'text': 'Version:', 'next_sibling': True, 'child': 'i'},
+                'started': {'tag': 'th', 'text': 'Started:', 'next_sibling': True},
+                'link': {'tag': 'a', 'attr': 'title'},
+            }
+        with StubHTTPServer({'/': (200, {}, self.fields_html)}) as server:
+            try:
+                MissingFieldsRequestBS4Handler().get(server.url)
+                raise Exception('failed to raise UnknownError for missing fields')
+            except UnknownError as _:
+                self.assertTrue(str(_).startswith("failed to find link tag (attribute 'title' not found), " +
+                                                  'started tag, uptime tag (next sibling tag not found), ' +
+                                                  'version tag (child tag not found). '))
+
+    def test_fields_invalid(self):
+        for spec in ({'tag': 'th', 'nonexistent': 1}, {'next_sibling': True}, {'tag': 'a', 'text': 1},
+                     {'text': 'Uptime:'}, {'attrs': {'class': True}, 'text': 'Uptime:'},
+                     {'tag': 'a', 'attrs': {'href': 1}}, 'th'):
+            class InvalidFieldsRequestBS4Handler(self.FieldsRequestBS4Handler):
+                fields = {'invalid': spec}
+            try:
+                InvalidFieldsRequestBS4Handler().get_field_specs()
+                raise Exception('failed to raise CodingError for invalid field spec {0}'.format(spec))
+            except CodingError:
+                pass
 
 
 def main():
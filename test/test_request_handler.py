@@ -26,15 +26,22 @@ from __future__ import print_function
 
 import logging
 import os
+import shutil
 import sys
+import tempfile
+import threading
+import time
 import unittest
 # inspect.getfile(inspect.currentframe()) # filename
 import requests
+from requests.auth import AuthBase, HTTPBasicAuth, HTTPDigestAuth
 libdir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
 sys.path.append(libdir)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 # pylint: disable=wrong-import-position
-from harisekhon.utils import log, CriticalError
-from harisekhon import RequestHandler
+from harisekhon.utils import log, CriticalError, Deadline
+from harisekhon import RequestHandler, RequestResult, HTTPCache
+from stub_http_server import StubHTTPServer
 
 
 class RequestHandlerTester(unittest.TestCase):
@@ -57,6 +64,452 @@ class RequestHandlerTester(unittest.TestCase):
         except CriticalError:
             pass
 
+    def test_request_handler_connection_reuse(self):
+        with StubHTTPServer({'/': (200, {}, b'ok')}) as server:
+            handler = RequestHandler()
+            for _ in range(3):
+                self.assertEqual(handler.get(server.url + '/').content, b'ok')
+            self.assertEqual(server.connections, 1)
+            self.assertEqual(server.requests, 3)
+            stats = handler.get_connection_stats()
+            self.assertEqual(list(stats.values()), [(1, 3)])
+            handler.close()
+
+    def test_request_handler_no_keep_alive(self):
+        with StubHTTPServer({'/': (200, {}, b'ok')}) as server:
+            handler = RequestHandler(keep_alive=False)
+            for _ in range(3):
+                handler.get(server.url + '/')
+            self.assertEqual(server.connections, 3)
+            self.assertEqual(server.requests, 3)
+
+    def test_request_handler_shared_session(self):
+        with StubHTTPServer({'/': (200, {}, b'ok')}) as server:
+            session = requests.Session()
+            RequestHandler(session=session).get(server.url + '/')
+            RequestHandler(session=session).get(server.url + '/')
+            self.assertEqual(server.connections, 1)
+            self.assertEqual(server.requests, 2)
+
+    def test_request_handler_positional_args(self):
+        def echo(handler):
+            return handler.path.encode('utf-8')
+        with StubHTTPServer({'/?x=1': (200, {}, echo)}) as server:
+            handler = RequestHandler()
+            self.assertEqual(handler.get(server.url + '/', {'x': 1}).content, b'/?x=1')
+            try:
+                handler.get(server.url + '/', {'x': 1}, 'extra')
+                raise Exception('failed to raise TypeError for too many positional args to RequestHandler.get()')
+            except TypeError:
+                pass
+
+    def test_request_handler_status_failure(self):
+        with StubHTTPServer() as server:
+            try:
+                RequestHandler().get(server.url + '/nonexistent')
+                raise Exception('failed to raise CriticalError for 404 response')
+            except CriticalError:
+                pass
+
+    def test_get_many(self):
+        with StubHTTPServer({'/1': (200, {}, b'one'), '/2': (200, {}, b'two')}) as server:
+            urls = [server.url + _ for _ in ('/2', '/nonexistent', '/1')]
+            results = RequestHandler().get_many(urls)
+            self.assertEqual(list(results), urls)
+            for result in results.values():
+                self.assertTrue(isinstance(result, RequestResult))
+            self.assertTrue(results[urls[0]].ok)
+            self.assertEqual(results[urls[0]].content, b'two')
+            self.assertEqual(results[urls[2]].content, b'one')
+            self.assertFalse(results[urls[1]].ok)
+            self.assertTrue(isinstance(results[urls[1]].error, CriticalError))
+            self.assertEqual(results[urls[1]].req.status_code, 404)
+
+    def test_get_many_connection_failure(self):
+        results = RequestHandler().get_many(['127.0.0.1:1'])
+        self.assertTrue(isinstance(results['127.0.0.1:1'].error, CriticalError))
+
+    def test_get_many_per_host(self):
+        lock = threading.Lock()
+        state = {'in_flight': 0, 'max_in_flight': 0}
+        def counted_response(_):
+            with lock:
+                state['in_flight'] += 1
+                state['max_in_flight'] = max(state['max_in_flight'], state['in_flight'])
+            time.sleep(0.05)
+            with lock:
+                state['in_flight'] -= 1
+            return b'ok'
+        with StubHTTPServer(dict([('/{0}'.format(_), (200, {}, counted_response)) for _ in range(6)])) as server:
+            urls = ['{0}/{1}'.format(server.url, _) for _ in range(6)]
+            results = RequestHandler().get_many(urls, max_workers=6, per_host=2)
+            self.assertTrue(all([_.ok for _ in results.values()]))
+            self.assertEqual(state['max_in_flight'], 2)
+            # connections are reused by the requests queued on each slot
+            self.assertEqual(server.connections, 2)
+
+    def test_get_many_budget(self):
+        def slow_budget_response(_):
+            time.sleep(2)
+            return b'slow'
+        with StubHTTPServer({'/fast': (200, {}, b'fast'), '/slow': (200, {}, slow_budget_response)}) as server:
+            start = time.time()
+            results = RequestHandler().get_many([server.url + '/fast', server.url + '/slow'], budget=0.5)
+            self.assertTrue(time.time() - start < 1.5)
+            self.assertTrue(results[server.url + '/fast'].ok)
+            self.assertFalse(results[server.url + '/slow'].ok)
+            self.assertTrue(isinstance(results[server.url + '/slow'].error, (CriticalError, requests.RequestException)))
+            # (connect, read) timeouts are each capped to the budget
+            start = time.time()
+            results = RequestHandler().get_many([server.url + '/fast', server.url + '/slow'], budget=0.5,
+                                                timeout=(1, 5))
+            self.assertTrue(time.time() - start < 1.5)
+            self.assertTrue(results[server.url + '/fast'].ok)
+            self.assertTrue(isinstance(results[server.url + '/slow'].error, (CriticalError, requests.RequestException)))
+
+    def test_get_many_slow_host(self):
+        def slow_host_response(_):
+            time.sleep(0.5)
+            return b'slow'
+        slow_server = StubHTTPServer(dict([('/{0}'.format(_), (200, {}, slow_host_response)) for _ in range(8)]))
+        fast_servers = [StubHTTPServer({'/': (200, {}, b'fast')}) for _ in range(3)]
+        with slow_server:
+            for server in fast_servers:
+                server.start()
+            try:
+                slow_urls = ['{0}/{1}'.format(slow_server.url, _) for _ in range(8)]
+                fast_urls = [server.url + '/' for server in fast_servers]
+                # the burst of urls to the slow host mustn't take the threads the fast hosts need
+                results = RequestHandler().get_many(slow_urls + fast_urls, max_workers=4, per_host=2, budget=0.8)
+                self.assertEqual(list(results), slow_urls + fast_urls)
+                self.assertTrue(all([results[_].ok for _ in fast_urls]))
+                self.assertEqual([results[_].ok for _ in slow_urls], [True, True] + [False] * 6)
+                self.assertTrue('did not complete' in str(results[slow_urls[2]].error))
+                self.assertTrue('before request' in str(results[slow_urls[7]].error))
+                # the requests abandoned at the budget don't change the results returned when they finish
+                snapshot = [(_.req, _.content, _.error, _.elapsed) for _ in results.values()]
+                time.sleep(0.5)
+                self.assertEqual([(_.req, _.content, _.error, _.elapsed) for _ in results.values()], snapshot)
+            finally:
+                for server in fast_servers:
+                    server.stop()
+
+    def test_stream_max_bytes(self):
+        with StubHTTPServer({'/big': (200, {}, b'x' * 100000)}) as server:
+            RequestHandler(max_bytes=100000).get(server.url + '/big')
+            try:
+                RequestHandler(max_bytes=99999).get(server.url + '/big')
+                raise Exception('failed to raise CriticalError for response larger than max_bytes')
+            except CriticalError as _:
+                self.assertTrue('max of 99999 bytes' in str(_))
+
+    def test_stream_max_bytes_while_reading(self):
+        with StubHTTPServer({'/': (200, {}, b'x' * 1000)}) as server:
+            handler = RequestHandler(max_bytes=10)
+            handler.chunk_size = 4
+            req = handler.session.get(server.url + '/', stream=True)
+            # without Content-Length for the up front check the limit must be enforced while reading, as for chunked
+            del req.headers['Content-Length']
+            try:
+                list(handler.iter_content(req))
+                raise Exception('failed to raise CriticalError while iterating beyond max_bytes')
+            except CriticalError as _:
+                self.assertTrue('exceeded the max of 10 bytes' in str(_))
+
+    def test_stream_iter_content(self):
+        class StreamingHandler(RequestHandler):
+            stream = True
+            chunk_size = 1000
+            chunks = None
+            def parse(self, req):
+                self.chunks = [len(_) for _ in self.iter_content(req)]
+        level = log.getEffectiveLevel()
+        log.setLevel(logging.INFO)
+        try:
+            with StubHTTPServer({'/big': (200, {}, b'x' * 2500)}) as server:
+                handler = StreamingHandler()
+                handler.get(server.url + '/big')
+                # not buffered by log_output() as debug is off so iterated in chunks
+                self.assertEqual(handler.chunks, [1000, 1000, 500])
+        finally:
+            log.setLevel(level)
+
+    def test_stream_get_content(self):
+        with StubHTTPServer({'/': (200, {}, b'{"a": 1}')}) as server:
+            handler = RequestHandler(stream=True)
+            req = handler.get(server.url + '/')
+            self.assertEqual(handler.get_content(req), b'{"a": 1}')
+            self.assertEqual(req.content, b'{"a": 1}')
+            self.assertEqual(req.json(), {'a': 1})
+
+    @staticmethod
+    def etag_response(handler):
+        if handler.headers.get('If-None-Match') == '"v1"':
+            return (304, {'ETag': '"v1"'}, b'')
+        return (200, {'ETag': '"v1"', 'Content-Type': 'application/json'}, b'{"version": "1.0"}')
+
+    def test_http_cache(self):
+        cache_dir = tempfile.mkdtemp()
+        try:
+            with StubHTTPServer({'/': self.etag_response, '/nostore': (200, {'Cache-Control': 'no-store'}, b'x')}) \
+                    as server:
+                handler = RequestHandler(cache=HTTPCache(ttl=60, cache_dir=cache_dir))
+                self.assertFalse(hasattr(handler.get(server.url + '/'), 'from_cache'))
+                req = handler.get(server.url + '/')
+                self.assertTrue(req.from_cache)
+                self.assertEqual(req.json(), {'version': '1.0'})
+                self.assertEqual(req.headers['content-type'], 'application/json')
+                # shared with other handlers / processes using the same cache dir
+                RequestHandler(cache=HTTPCache(ttl=60, cache_dir=cache_dir)).get(server.url + '/')
+                self.assertEqual(server.requests, 1)
+                # different credentials aren't served the cached document
+                handler.get(server.url + '/', auth=('user', 'password'))
+                self.assertEqual(server.requests, 2)
+                handler.get(server.url + '/nostore')
+                handler.get(server.url + '/nostore')
+                self.assertEqual(server.requests, 4)
+        finally:
+            shutil.rmtree(cache_dir)
+
+    class TokenAuth(AuthBase):
+        # credentials HTTPCache can't see
+        def __call__(self, req):
+            req.headers['X-Token'] = 'secret'
+            return req
+
+    def test_http_cache_key(self):
+        key = HTTPCache.key
+        url = 'http://localhost/'
+        self.assertEqual(key(url, {'a': 1, 'b': 2}), key(url, {'b': 2, 'a': 1}))
+        # keyed on the credentials, not the auth object's repr, so matches in other processes
+        self.assertEqual(key(url, auth=HTTPBasicAuth('user', 'password')), key(url, auth=('user', 'password')))
+        self.assertEqual(key(url, auth=HTTPDigestAuth('user', 'password')),
+                         key(url, auth=HTTPDigestAuth('user', 'password')))
+        self.assertNotEqual(key(url, auth=HTTPBasicAuth('user', 'password')),
+                            key(url, auth=HTTPBasicAuth('user', 'password2')))
+        self.assertNotEqual(key(url, auth=HTTPBasicAuth('user', 'password')),
+                            key(url, auth=HTTPDigestAuth('user', 'password')))
+        self.assertEqual(key(url, auth=self.TokenAuth()), None)
+        class SubclassedAuth(HTTPBasicAuth):
+            pass
+        self.assertEqual(key(url, auth=SubclassedAuth('user', 'password')), None)
+        self.assertEqual(key(url, headers={'Accept': 'application/json', 'X-Token': 'a'}),
+                         key(url, headers={'x-token': 'a', 'accept': 'application/json', 'User-Agent': 'x'}))
+        self.assertNotEqual(key(url, headers={'X-Token': 'a'}), key(url, headers={'X-Token': 'b'}))
+        self.assertNotEqual(key(url), key(url, headers={'Authorization': 'Bearer a'}))
+
+    def test_http_cache_headers(self):
+        cache_dir = tempfile.mkdtemp()
+        try:
+            with StubHTTPServer({'/': self.etag_response}) as server:
+                handler = RequestHandler(cache=HTTPCache(ttl=60, cache_dir=cache_dir))
+                for headers in ({'Authorization': 'Bearer a'}, {'authorization': 'Bearer a'},
+                                {'Authorization': 'Bearer b'}, {'Authorization': 'Bearer b', 'Accept': 'text/html'}):
+                    handler.get(server.url + '/', headers=headers)
+                self.assertEqual(server.requests, 3)
+                handler.session.headers['Authorization'] = 'Bearer c'
+                handler.get(server.url + '/')
+                self.assertEqual(server.requests, 4)
+                # auth which can't be keyed isn't cached
+                filenames = os.listdir(cache_dir)
+                for _ in range(2):
+                    self.assertFalse(hasattr(handler.get(server.url + '/', auth=self.TokenAuth()), 'from_cache'))
+                self.assertEqual(server.requests, 6)
+                self.assertEqual(os.listdir(cache_dir), filenames)
+        finally:
+            shutil.rmtree(cache_dir)
+
+    def test_http_cache_permissions(self):
+        tmp_dir = tempfile.mkdtemp()
+        cache_dir = os.path.join(tmp_dir, 'http')
+        try:
+            with StubHTTPServer({'/': self.etag_response}) as server:
+                RequestHandler(cache=HTTPCache(cache_dir=cache_dir)).get(server.url + '/', auth=('user', 'password'))
+            self.assertEqual(os.stat(cache_dir).st_mode & 0o777, 0o700)
+            filenames = os.listdir(cache_dir)
+            self.assertEqual(len(filenames), 2)
+            for filename in filenames:
+                self.assertEqual(os.stat(os.path.join(cache_dir, filename)).st_mode & 0o777, 0o600)
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_http_cache_revalidation(self):
+        cache_dir = tempfile.mkdtemp()
+        try:
+            with StubHTTPServer({'/': self.etag_response}) as server:
+                handler = RequestHandler(cache=HTTPCache(ttl=0, cache_dir=cache_dir))
+                handler.get(server.url + '/')
+                req = handler.get(server.url + '/')
+                self.assertEqual(server.requests, 2)
+                self.assertEqual(req.status_code, 200)
+                self.assertEqual(req.content, b'{"version": "1.0"}')
+                self.assertTrue(req.from_cache)
+        finally:
+            shutil.rmtree(cache_dir)
+
+    def test_http_cache_lock(self):
+        def slow_cached_response(_):
+            time.sleep(0.2)
+            return b'slow'
+        cache_dir = tempfile.mkdtemp()
+        try:
+            with StubHTTPServer({'/': (200, {}, slow_cached_response)}) as server:
+                # separate caches as would be in separate processes, the lock file is what they share
+                threads = [threading.Thread(target=RequestHandler(cache=HTTPCache(cache_dir=cache_dir)).get,
+                                            args=(server.url + '/',)) for _ in range(3)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                self.assertEqual(server.requests, 1)
+        finally:
+            shutil.rmtree(cache_dir)
+
+    def test_deadline_timeout(self):
+        def slow_deadline_response(_):
+            time.sleep(2)
+            return b'slow'
+        with StubHTTPServer({'/slow': (200, {}, slow_deadline_response)}) as server:
+            start = time.time()
+            try:
+                RequestHandler(deadline=Deadline(0.5)).get(server.url + '/slow')
+                raise Exception('failed to raise CriticalError for read timeout from deadline')
+            except CriticalError as _:
+                self.assertTrue('ReadTimeout' in str(_))
+            self.assertTrue(time.time() - start < 1.5)
+            try:
+                RequestHandler(deadline=Deadline(0)).get(server.url + '/slow')
+                raise Exception('failed to raise CriticalError for expired deadline')
+            except CriticalError as _:
+                self.assertTrue('deadline' in str(_))
+
+    def test_retries(self):
+        state = {'count': 0}
+        def flaky(_):
+            state['count'] += 1
+            if state['count'] < 3:
+                return (502, {}, b'bad gateway')
+            return (200, {}, b'ok')
+        with StubHTTPServer({'/': flaky}) as server:
+            handler = RequestHandler(retries=2)
+            handler.backoff = 0.01
+            self.assertEqual(handler.get(server.url + '/').content, b'ok')
+            self.assertEqual(server.requests, 3)
+            state['count'] = 0
+            handler.retries = 1
+            try:
+                handler.get(server.url + '/')
+                raise Exception('failed to raise CriticalError for 502 after retries')
+            except CriticalError as _:
+                self.assertTrue('502' in str(_))
+            self.assertEqual(server.requests, 5)
+
+    def test_retries_opt_in(self):
+        # pylint: disable=protected-access
+        with StubHTTPServer({'/': (503, {}, b'unavailable'), '/gateway': (502, {}, b'bad gateway')}) as server:
+            handler = RequestHandler(retries=2)
+            handler.backoff = 0.01
+            self.assertEqual(handler._send('get', server.url + '/').status_code, 503)
+            self.assertEqual(server.requests, 1)
+            handler.retry_statuses = (502, 503, 504)
+            self.assertEqual(handler._send('get', server.url + '/').status_code, 503)
+            self.assertEqual(server.requests, 4)
+            # not safe to replay
+            for method in ('post', 'put', 'delete'):
+                self.assertEqual(handler._send(method, server.url + '/gateway').status_code, 502)
+            self.assertEqual(server.requests, 7)
+
+    def test_retries_within_deadline(self):
+        with StubHTTPServer({'/': (502, {}, b'bad gateway')}) as server:
+            handler = RequestHandler(retries=10, deadline=Deadline(1))
+            handler.backoff = 0.1
+            start = time.time()
+            try:
+                handler.get(server.url + '/')
+                raise Exception('failed to raise CriticalError for 502')
+            except CriticalError:
+                pass
+            # backoff 0.1, 0.2 then 0.4 would need 0.8 secs out of the remaining ~0.7
+            self.assertEqual(server.requests, 3)
+            self.assertTrue(time.time() - start < 1)
+
+    def test_retries_connection_refused(self):
+        handler = RequestHandler(retries=2)
+        handler.backoff = 0.01
+        try:
+            handler.get('127.0.0.1:1')
+            raise Exception('failed to raise CriticalError for connection refused after retries')
+        except CriticalError as _:
+            self.assertTrue('ConnectionError' in str(_))
+
+    def test_phase_timings(self):
+        def slow_timed_response(_):
+            time.sleep(0.2)
+            return b'x' * 1000
+        with StubHTTPServer({'/': (200, {}, b'ok'), '/slow': (200, {}, slow_timed_response)}) as server:
+            handler = RequestHandler(phase_timings=True)
+            # by name, which may resolve to ::1 first which the stub server isn't listening on
+            url = 'http://localhost:{0}'.format(server.server_address[1])
+            req = handler.get(url + '/')
+            timings = req.timings
+            self.assertFalse(timings.reused)
+            self.assertEqual(list(timings.as_dict().keys()), ['dns', 'connect', 'ttfb', 'transfer'])
+            self.assertTrue(timings.dns >= 0)
+            self.assertTrue(timings.connect > 0)
+            self.assertTrue(timings.tls is None)
+            self.assertTrue(timings.ttfb < 0.2)
+            req = handler.get(url + '/slow')
+            timings = req.timings
+            self.assertTrue(timings.reused)
+            self.assertEqual(timings.dns, 0)
+            self.assertEqual(timings.connect, 0)
+            self.assertTrue(timings.ttfb >= 0.2)
+            self.assertTrue(timings.transfer >= 0)
+            self.assertEqual(server.connections, 1)
+
+    def test_phase_timings_stream(self):
+        with StubHTTPServer({'/': (200, {}, b'x' * 1000)}) as server:
+            handler = RequestHandler(phase_timings=True, stream=True)
+            req = handler._send('get', server.url + '/')  # pylint: disable=protected-access
+            handler.set_timings(req, stream=True)
+            self.assertTrue(req.timings.ttfb > 0)
+            self.assertTrue(req.timings.transfer is None)
+            self.assertEqual(len(handler.get_content(req)), 1000)
+            self.assertTrue(req.timings.transfer >= 0)
+
+    def test_phase_timings_disabled(self):
+        with StubHTTPServer({'/': (200, {}, b'ok')}) as server:
+            req = RequestHandler().get(server.url)
+            self.assertFalse(hasattr(req, 'timings'))
+
+    def test_phase_timings_no_addresses(self):
+        from harisekhon import http_timing
+        getaddrinfo = http_timing.socket.getaddrinfo
+        calls = []
+        def getaddrinfo_nothing_first(*args):
+            calls.append(args)
+            if len(calls) == 1:
+                return []
+            return getaddrinfo(*args)
+        # left to urllib3 to resolve again and connect, the DNS time is then included in the connect time
+        http_timing.socket.getaddrinfo = getaddrinfo_nothing_first
+        try:
+            with StubHTTPServer({'/': (200, {}, b'ok')}) as server:
+                req = RequestHandler(phase_timings=True).get(server.url)
+            self.assertEqual(req.content, b'ok')
+            self.assertEqual(len(calls), 2)
+            self.assertEqual(req.timings.dns, 0)
+            self.assertTrue(req.timings.connect >= 0)
+        finally:
+            http_timing.socket.getaddrinfo = getaddrinfo
+
+    def test_phase_timings_connection_refused(self):
+        try:
+            RequestHandler(phase_timings=True).get('localhost:1')
+            raise Exception('failed to raise CriticalError for connection refused')
+        except CriticalError as _:
+            self.assertTrue('ConnectionError' in str(_))
+
 
 def main():
     # increase the verbosity
@@ -30,9 +30,12 @@ import sys
 import unittest
 libdir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
 sys.path.append(libdir)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 # pylint: disable=wrong-import-position
 from harisekhon.utils import log
 from harisekhon.nagiosplugin import RestNagiosPlugin
+from fake_plugins import FakeRestNagiosPlugin
+from stub_http_server import StubHTTPServer
 
 class RestNagiosPluginTester(unittest.TestCase):
 
@@ -41,8 +44,7 @@ class RestNagiosPluginTester(unittest.TestCase):
     # Not using assertRaises >= 2.7 and maintaining compatibility with Python 2.6 servers
 
     class SubRestNagiosPlugin(RestNagiosPlugin):
-        def parse(self, req):
-            pass
+        pass
 
     def setUp(self):
         self.plugin = self.SubRestNagiosPlugin()
@@ -67,6 +69,55 @@ class RestNagiosPluginTester(unittest.TestCase):
                 raise Exception('RestNagiosPlugin failed to exit UNKNOWN (3), got exit code {0} instead'
                                 .format(_.code))
 
+    def run_plugin(self, plugin, args):
+        argv = sys.argv
+        sys.argv = ['test_rest_nagiosplugin.py'] + args
+        try:
+            plugin.main()
+            raise Exception('plugin failed to exit')
+        except SystemExit as _:
+            return _.code
+        finally:
+            sys.argv = argv
+
+    def test_phase_timings(self):
+        with StubHTTPServer({'/status': (200, {}, b'OK')}) as server:
+            args = ['-H', server.server_address[0], '-P', str(server.server_address[1])]
+            plugin = FakeRestNagiosPlugin()
+            self.assertEqual(self.run_plugin(plugin, args), 0)
+            self.assertFalse(plugin.phase_timings)
+            self.assertTrue('_time=' not in plugin.msg.replace('query_time=', ''))
+            plugin = FakeRestNagiosPlugin()
+            self.assertEqual(self.run_plugin(plugin, args + ['--phase-timings', '--ttfb-warning', '10']), 0)
+            self.assertTrue(plugin.request.phase_timings)
+            (msg, perfdata) = plugin.msg.split('|')
+            self.assertEqual(msg.strip(), 'status = OK')
+            for phase in ('dns', 'connect', 'ttfb', 'transfer'):
+                self.assertTrue(' {0}_time='.format(phase) in perfdata)
+            self.assertTrue(' tls_time=' not in perfdata)
+            self.assertTrue('s;10;' in perfdata)
+            # any threshold implies --phase-timings
+            plugin = FakeRestNagiosPlugin()
+            self.assertEqual(self.run_plugin(plugin, args + ['--ttfb-critical', '0']), 2)
+            (msg, perfdata) = plugin.msg.split('|')
+            self.assertTrue(msg.startswith('status = OK ttfb_time ('))
+            self.assertTrue(' ttfb_time=' in perfdata)
+            self.assertTrue(' query_time=' in perfdata)
+            plugin = FakeRestNagiosPlugin()
+            self.assertEqual(self.run_plugin(plugin, args + ['--connect-warning', 'x']), 3)
+            # the timing options are opt-in to not conflict with the options of other plugins
+            plugin = FakeRestNagiosPlugin()
+            plugin.timing_options = False
+            self.assertEqual(self.run_plugin(plugin, args + ['--phase-timings']), 3)
+            # phase timings without their options are reported as perfdata without thresholds
+            plugin = FakeRestNagiosPlugin()
+            plugin.timing_options = False
+            plugin.phase_timings = True
+            self.assertEqual(self.run_plugin(plugin, args), 0)
+            perfdata = plugin.msg.split('|')[1]
+            self.assertTrue(' ttfb_time=' in perfdata)
+            self.assertTrue(';' not in perfdata)
+
 
 def main():
     # increase the verbosity
@@ -26,7 +26,13 @@ from __future__ import print_function
 
 import logging
 import os
+import re
+import shutil
+import subprocess
 import sys
+import tempfile
+import threading
+import time
 import unittest
 # unittest2 from pypi works for Python 2.4-2.6
 # import unittest2
@@ -34,6 +40,7 @@ import unittest
 # libdir = os.path.join(os.path.dirname(inspect.getfile(inspect.currentframe())), '..')
 libdir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
 sys.path.append(libdir)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 # pylint: disable=wrong-import-position
 import harisekhon
 from harisekhon import utils
@@ -142,6 +149,31 @@ class UtilsTester(unittest.TestCase):
             if _.code != 3:
                 raise Exception("incorrect exit code '%s' raised by qquit(UNKNOWN, test)" % _.code)
 
+    def test_capture_quit(self):
+        with capture_quit():
+            try:
+                qquit('WARNING', 'test')
+                raise Exception('failed to raise QuitException from qquit(WARNING, test) within capture_quit()')
+            except QuitException as _:
+                self.assertEqual(_.code, 1)
+                self.assertEqual(_.status, 'WARNING')
+                self.assertEqual(_.msg, 'test')
+            # per thread
+            results = []
+            def run():
+                try:
+                    qquit('OK', 'thread')
+                except SystemExit as _:
+                    results.append(_.code)
+            thread = threading.Thread(target=run)
+            thread.start()
+            thread.join()
+            self.assertEqual(results, [0])
+        try:
+            qquit('CRITICAL')
+        except QuitException as _:
+            self.assertEqual(_.code, 2)
+
     def test_qquit_wrong_status(self):
         try:
             qquit('wrongstatus', 'test')
@@ -179,6 +211,20 @@ class UtilsTester(unittest.TestCase):
         # comes out as utrunner.py in IDE or python2.7/runpy.py
         # self.assertEqual('test_utils.py', get_topfile())
 
+    def test_get_topfile_cached(self):
+        topfile = get_topfile()
+        self.assertEqual(utils._topfile, topfile)
+        results = []
+        thread = threading.Thread(target=lambda: results.append(get_topfile()))
+        thread.start()
+        thread.join()
+        self.assertEqual(results, [topfile])
+
+    def test_get_caller(self):
+        def func():
+            return get_caller()
+        self.assertEqual(func(), 'test_get_caller')
+
     def test_get_file_version(self):
         filename = os.path.join(libdir, 'harisekhon', 'utils.py')
         version = get_file_version(filename)
@@ -191,6 +237,41 @@ class UtilsTester(unittest.TestCase):
     def test_get_file_github_repo(self):
         self.assertEqual(get_file_github_repo(__file__), 'https://github.com/harisekhon/pylib')
 
+    @staticmethod
+    def restore_env(name, value):
+        if value is None:
+            os.environ.pop(name, None)
+        else:
+            os.environ[name] = value
+
+    def test_get_file_metadata(self):
+        tmpdir = tempfile.mkdtemp()
+        cache_dir = os.getenv('HARISEKHON_CACHE_DIR')
+        os.environ['HARISEKHON_CACHE_DIR'] = os.path.join(tmpdir, 'cache')
+        try:
+            filename = os.path.join(tmpdir, 'test_prog.py')
+            with open(filename, 'w') as _:
+                _.write('#!/usr/bin/env python\n#  https://github.com/harisekhon/pytools\n\n' +
+                        '"""\n    test docstring\n\n    second line\n"""\n\nimport os\n' +
+                        'if os:\n    __version__ = "0.1"\n__version__ = "1" + "2"\n' +
+                        '__version__ = ("0.2"\n    "b")  # comment\n__version__ = "0.3"\n')
+            metadata = get_file_metadata(filename)
+            self.assertEqual(metadata, {'docstring': '\n    test docstring\n\n    second line\n',
+                                        'version': '0.2b',
+                                        'github_repo': 'https://github.com/harisekhon/pytools'})
+            self.assertEqual(get_file_docstring(filename), 'test docstring\n\nsecond line')
+            self.assertEqual(get_file_version(filename), '0.2b')
+            self.assertEqual(get_file_github_repo(filename), 'https://github.com/harisekhon/pytools')
+            self.assertEqual(len(os.listdir(get_cache_dir())), 1)
+            with open(filename, 'w') as _:
+                _.write('x = """not a docstring"""\n__version__ = "0.4"\n')
+            # make sure the mtime / size based cache key changes
+            os.utime(filename, (0, 0))
+            self.assertEqual(get_file_metadata(filename), {'docstring': None, 'version': '0.4', 'github_repo': ''})
+        finally:
+            self.restore_env('HARISEKHON_CACHE_DIR', cache_dir)
+            shutil.rmtree(tmpdir)
+
     def test_find_git_root(self):
         self.assertTrue(re.match('.*/pylib', find_git_root(__file__)))
 
@@ -337,6 +418,261 @@ class UtilsTester(unittest.TestCase):
         # reset the TLDs
         utils._tlds = tlds
 
+    def test_tlds_lazy_load(self):
+        # importing utils must not load the TLDs, only calling a validator which needs them
+        libdir2 = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+        output = subprocess.check_output([sys.executable, '-c',
+                                          'import harisekhon.utils as utils; print(utils._tlds_loaded); ' +
+                                          'utils.isHost("localhost"); utils.isHost("10.10.10.10"); ' +
+                                          'print(utils._tlds_loaded); ' +
+                                          'utils.isDomain("harisekhon.com"); print(utils._tlds_loaded)'],
+                                         cwd=libdir2)
+        self.assertEqual(output.decode('utf-8').split(), ['False', 'False', 'True'])
+
+    def test_tlds_concurrent_load(self):
+        # threads validating domains at once must all wait for the whole TLD set, loaded once
+        state = (utils._tlds, utils._tlds_loaded, utils._tld_index, utils._tld_regexes)
+        read_cache = utils.read_cache
+        loads = []
+        def slow_read_cache(name, key):
+            loads.append(name)
+            time.sleep(0.1)
+            return read_cache(name, key)
+        results = []
+        try:
+            utils._tlds = set()
+            utils._tlds_loaded = False
+            utils._tld_index = None
+            utils._tld_regexes = None
+            utils.read_cache = slow_read_cache
+            threads = [threading.Thread(target=lambda: results.append(isDomain('harisekhon.com'))) for _ in range(5)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(results, [True] * 5)
+            self.assertEqual(loads, ['tlds'])
+            self.assertTrue(utils._tlds_loaded)
+            self.assertTrue(len(utils._tlds) > 1000)
+        finally:
+            utils.read_cache = read_cache
+            (utils._tlds, utils._tlds_loaded, utils._tld_index, utils._tld_regexes) = state
+
+    def test_lazy_package_imports(self):
+        # importing utils or a simple plugin class must not import requests / bs4 via the package __init__
+        libdir2 = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+        output = subprocess.check_output([sys.executable, '-c',
+                                          'import sys; import harisekhon.utils; ' +
+                                          'print("bs4" in sys.modules, "requests" in sys.modules); ' +
+                                          'from harisekhon import StatusNagiosPlugin; ' +
+                                          'print("bs4" in sys.modules, "requests" in sys.modules); ' +
+                                          'from harisekhon import RequestBS4Handler; ' +
+                                          'print("bs4" in sys.modules, "requests" in sys.modules)'],
+                                         cwd=libdir2)
+        self.assertEqual(output.decode('utf-8').split(), ['False'] * 4 + ['True'] * 2)
+
+    def test_logging_lazy_config(self):
+        # logging must not be configured at import, only on the first record that would be emitted
+        libdir2 = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+        code = """
+import sys, time
+start = time.time()
+import harisekhon.utils as utils
+import_secs = time.time() - start
+print('configparser' in sys.modules or 'ConfigParser' in sys.modules, 'logging.config' in sys.modules)
+utils.log.info('not emitted')
+print(utils.log.handlers == [utils._log_bootstrap_handler])
+utils.log.warning('emitted')
+print(utils.log.handlers == [utils._log_handler])
+# the cost previously paid at import
+start = time.time()
+import logging.config
+logging.config.fileConfig(utils.libdir + '/resources/logging.conf')
+sys.stderr.write('import {0:.2f} ms, logging.config.fileConfig() saving {1:.2f} ms\\n'
+                 .format(import_secs * 1000, (time.time() - start) * 1000))
+"""
+        process = subprocess.Popen([sys.executable, '-c', code], cwd=libdir2,
+                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        (stdout, stderr) = process.communicate()
+        stderr = stderr.decode('utf-8')
+        self.assertEqual(stdout.decode('utf-8').split(), ['False', 'False', 'True', 'True'])
+        self.assertTrue(re.search(r' - WARNING - emitted$', stderr, re.M))
+        self.assertFalse('not emitted' in stderr)
+        self.assertTrue(re.search(r'saving \d+\.\d+ ms', stderr))
+
+    def test_tld_regexes(self):
+        self.assertTrue(isStr(utils.tld_regex))
+        self.assertTrue('COM' in utils.tld_regex)
+        self.assertTrue(utils.tld_regex in utils.domain_regex)
+        self.assertTrue(utils.domain_regex in utils.url_regex)
+        # still exported to 'from harisekhon.utils import *' though only built on access
+        namespace = {}
+        exec('from harisekhon.utils import *', namespace)  # pylint: disable=exec-used
+        self.assertEqual(namespace['domain_regex'], utils.domain_regex)
+        self.assertTrue(namespace['isHost'] is isHost)
+        self.assertFalse('_tlds' in namespace)
+        try:
+            utils.nonexistent_regex  # pylint: disable=pointless-statement
+            raise Exception('failed to raise AttributeError for nonexistent module attribute')
+        except AttributeError:
+            pass
+
+    def test_tld_suffix_matching_same_as_regexes(self):
+        # the validators no longer use the TLD regexes but must accept exactly the same strings
+        # the embedded (?i) in the TLD regexes applies to the whole regex hence compiling them case insensitive
+        regexes = dict([(name, re.compile('^' + getattr(utils, name).replace('(?i)', '') + '$', re.I))
+                        for name in ('domain_regex', 'domain_regex_strict', 'hostname_regex', 'fqdn_regex',
+                                     'host_regex', 'email_regex', 'url_regex', 'krb5_principal_regex',
+                                     'aws_hostname_regex', 'aws_fqdn_regex')])
+        validators = {
+            'domain_regex': isDomain,
+            'domain_regex_strict': isDomainStrict,
+            'hostname_regex': isHostname,
+            'fqdn_regex': isFqdn,
+            'host_regex': isHost,
+            'email_regex': isEmail,
+            'url_regex': lambda _: isUrl(_) if '://' in _ else None,
+            'krb5_principal_regex': isKrb5Princ,
+            'aws_hostname_regex': isAwsHostname,
+            'aws_fqdn_regex': isAwsFqdn
+        }
+        for arg in ('harisekhon.com', 'www.harisekhon.com', 'localhost', 'localDomain', 'a.b.c.d', 'a_b.com',
+                    'a_b.c_d.com', 'a-.com', '-a.com', 'a..com', '.com', 'com.', 'com', 'COM', 'com\n', 'x' * 63,
+                    'x' * 64, '1.2.3.4', '1.2.3.256', '10.10.10.10.com', 'host.nonexistenttld',
+                    'http://www.google.com', 'HTTPS://host:8080/path?x=1', 'http://1.2.3.4:80/', 'http://host:/',
+                    'ftp://host.com', 'http://host.com:123456', 'user@host.com', 'hari@harisekhon.co.uk',
+                    "o'neil@x.com", "neil'@x.com", 'a@b@c.com', 'hari/host.domain.com@REALM.COM', 'hari@LOCAL',
+                    'hari/host', 'hari/host/x', 'h/host', 'ip-10-1-2-3.ec2.internal', 'IP-10-1-2-3', 'ip-11-1-2-3'):
+            for (name, regex) in regexes.items():
+                result = validators[name](arg)
+                if result is not None:
+                    self.assertEqual(result, regex.match(arg) is not None, '{0} {1}'.format(name, arg))
+
+    def test_regex_registry(self):
+        self.assertTrue(utils._anchored(r'\d+') is utils._anchored(r'\d+'))
+        self.assertTrue(utils._compiled(r'\d+') is utils._compiled(r'\d+'))
+        self.assertTrue(utils._anchored(r'\d+')('123'))
+        self.assertFalse(utils._anchored(r'\d+')('123a'))
+        # same semantics as the '^' + regex + '$' it replaces, '$' allows a trailing newline
+        self.assertTrue(utils._anchored(r'\d+')('123\n'))
+        self.assertFalse(utils._anchored(r'\d+')('123\n\n'))
+        # and a top level alternation is only anchored at its ends
+        self.assertTrue(utils._anchored(r'a|b')('ab'))
+        self.assertFalse(utils._anchored(r'a|b')('ba'))
+        # unlike the validation engine's which match as a whole
+        self.assertFalse(utils._fullmatch(r'\d+')('123\n'))
+        self.assertFalse(utils._fullmatch(r'a|b')('ab'))
+        # inline global flags are hoisted as they are only allowed at the start of the regex from Python 3.11
+        self.assertTrue(utils._anchored(r'a(?i)b')('aB'))
+        self.assertTrue(utils._anchored(r'a(?i)b') is not utils._anchored(r'ab'))
+        self.assertTrue(isInterface('eth0garbage'))
+        self.assertTrue(isVersion('1.0\n'))
+        self.assertFalse(isFilename('/\n'))
+
+    def test_regex_predicates_unchanged(self):
+        # each predicate must give exactly the result of the re.match('^' + regex + '$', arg) it did per call
+        def old_match(regex, flags=0):
+            if '(?i)' in regex:
+                regex = regex.replace('(?i)', '')
+                flags |= re.I
+            return lambda arg: re.match('^' + regex + '$', arg, flags) is not None
+        def old_is_filename(arg):
+            return not re.match('/$', arg) and not re.match(r'^\s*$', arg) and old_match(filename_regex)(arg)
+        def old_is_dirname(arg):
+            return not re.match(r'^\s*$', arg) and old_match(dirname_regex)(arg)
+        def old_is_url(arg):
+            arg = arg.strip()
+            if '://' not in arg:
+                arg = 'http://' + arg
+            return old_match(utils.url_regex)(arg)
+        predicates = (
+            (isAwsAccessKey, old_match(aws_access_key_regex)),
+            (isAwsSecretKey, old_match(aws_secret_key_regex)),
+            (isAwsHostname, old_match(utils.aws_hostname_regex)),
+            (isAwsFqdn, old_match(utils.aws_fqdn_regex)),
+            (isCollection, old_match(r'\w(?:[\w\.]*\w)?')),
+            (isDatabaseColumnName, old_match(column_regex)),
+            (isDirname, old_is_dirname),
+            (isDomain, old_match(utils.domain_regex)),
+            (isDomainStrict, old_match(utils.domain_regex_strict)),
+            (isEmail, old_match(utils.email_regex)),
+            (isFilename, old_is_filename),
+            (isFloat, old_match(r'\d+(?:\.\d+)?')),
+            (isFqdn, old_match(utils.fqdn_regex)),
+            (isHex, old_match(r'(?:0x)?[A-Fa-f\d]+')),
+            (isHost, old_match(utils.host_regex)),
+            (isHostname, old_match(utils.hostname_regex)),
+            (isInt, old_match(r'\d+(?:\.0+)?')),
+            (isInterface, old_match(r'(?:em|eth|bond|lo|docker)\d+|lo|veth[A-Fa-f0-9]+')),
+            (isIP, old_match(ip_regex)),
+            (isKrb5Princ, old_match(utils.krb5_principal_regex)),
+            (isLabel, old_match(label_regex)),
+            (isLdapDn, old_match(ldap_dn_regex)),
+            (isNoSqlKey, old_match(r'([\w\_\,\.\:\+\-]+)')),
+            (isProcessName, old_match(process_name_regex)),
+            (isScientific, old_match(r'\d+(?:\.\d+)?e[+-]?\d+', re.I)),
+            (isUrl, old_is_url),
+            (isUrlPathSuffix, old_match(url_path_suffix_regex)),
+            (isUser, old_match(user_regex)),
+            (isVersion, old_match(version_regex)),
+            (isVersionLax, old_match(version_regex_lax)),
+            (isYes, old_match(r'\s*y(?:es)?\s*', re.I)),
+        )
+        args = ['', ' ', '\n', '/', '/\n', '/tmp/file', '/tmp/file\n', '/tmp/dir/', 'a b', 'a.b_c', 'tbl1', '-1',
+                '0', '123', '123\n', '123\n\n', '1.0', '1.0\n', '1.0-beta\n', '0x1F\n', '1e5', '1E-5\n', 'y',
+                ' Yes \n', 'no', 'eth0', 'eth0garbage', 'eth0\n', 'xlo', 'lo', 'veth1a', 'docker0x', 'bond1\n',
+                'A' * 20, 'A' * 20 + '\n', 'A' * 21, 'a/+=' * 10, 'a/+=' * 10 + '\n', '192.168.1.1',
+                '192.168.1.1\n', '255.255.255.255\n', '1.2.3.4.5', '1.2.3', 'localhost', 'host\n',
+                'host.example.com', 'HOST.EXAMPLE.COM\n', 'host.example.com\n\n', 'host..example.com',
+                'user@example.com', 'user@example.com\n', 'user@@example.com', 'http://host.example.com:80/path',
+                'https://host.example.com:80/path\n', 'host.example.com/path?a=1', ' host:8080 ', 'ftp://host',
+                'hari@EXAMPLE.COM', 'hari/host.example.com@EXAMPLE.COM\n', 'hari/@EXAMPLE.COM',
+                'cn=hari,dc=example', 'cn=hari,dc=example\n', 'cn=', 'ip-10-0-0-1', 'ip-10-0-0-1.ec2.internal\n',
+                'ec2-1-2-3-4.compute-1.amazonaws.com', 'label:1', 'my-process_1\n']
+        for (predicate, old) in predicates:
+            for arg in args:
+                self.assertEqual(predicate(arg), old(arg), '{0}({1!r})'.format(predicate.__name__, arg))
+
+    def test_cache(self):
+        cache_dir = tempfile.mkdtemp()
+        env_cache_dir = os.getenv('HARISEKHON_CACHE_DIR')
+        os.environ['HARISEKHON_CACHE_DIR'] = os.path.join(cache_dir, 'subdir')
+        try:
+            self.assertEqual(get_cache_dir(), os.path.join(cache_dir, 'subdir'))
+            key = file_cache_key(self.libfile)
+            self.assertEqual(key[0][0], self.libfile)
+            self.assertEqual(read_cache('test', key), None)
+            self.assertTrue(write_cache('test', key, ['a', 'b']))
+            self.assertEqual(read_cache('test', key), ['a', 'b'])
+            self.assertEqual(read_cache('test', file_cache_key('nonexistent_file')), None)
+            self.assertEqual(file_cache_key('nonexistent_file'), [['nonexistent_file', None, None]])
+        finally:
+            self.restore_env('HARISEKHON_CACHE_DIR', env_cache_dir)
+            shutil.rmtree(cache_dir)
+
+    def test_deadline(self):
+        deadline = Deadline(10, reserve=1)
+        self.assertTrue(8.9 < deadline.remaining() <= 9)
+        self.assertFalse(deadline.expired())
+        self.assertEqual(deadline.timeout(3, 30)[0], 3)
+        self.assertTrue(deadline.timeout(3, 30)[1] <= 9)
+        (connect, read) = deadline.timeout()
+        self.assertTrue(connect <= 9 and read <= 9)
+        deadline = Deadline(0.01)
+        time.sleep(0.02)
+        self.assertTrue(deadline.expired())
+        self.assertEqual(deadline.remaining(), 0)
+        try:
+            deadline.timeout()
+            raise Exception('failed to raise CriticalError for Deadline.timeout() past deadline')
+        except CriticalError:
+            pass
+        try:
+            Deadline('a')
+            raise Exception('failed to raise CodingError for Deadline(a)')
+        except CodingError:
+            pass
+
 # ============================================================================ #
     #                               PySpark
 # ============================================================================ #
@@ -1185,6 +1521,35 @@ class UtilsTester(unittest.TestCase):
     def test_curl_custom_request_handler(self):
         curl('www.google.com', request_handler='harisekhon.RequestHandler')
 
+    def test_curl_handler_registry(self):
+        self.assertTrue(get_request_handler_class('harisekhon.RequestHandler') is harisekhon.RequestHandler)
+        self.assertTrue(get_request_handler_class('harisekhon.request_handler.RequestHandler')
+                        is harisekhon.RequestHandler)
+        self.assertTrue(get_request_handler() is get_request_handler('harisekhon.RequestHandler'))
+        self.assertTrue(isinstance(get_request_handler(), harisekhon.RequestHandler))
+        for name in ('RequestHandler', 'harisekhon.NonExistentHandler', 'nonexistent_module.Handler', None):
+            try:
+                get_request_handler_class(name)
+                raise Exception("failed to raise CodingError for request handler '{0}'".format(name))
+            except CodingError:
+                pass
+        try:
+            curl('localhost', request_handler=harisekhon.RequestHandler)
+            raise Exception('failed to raise CodingError for request handler class instead of name')
+        except CodingError:
+            pass
+
+    def test_curl_stub_server(self):
+        from stub_http_server import StubHTTPServer
+        with StubHTTPServer({'/1': (200, {}, b'one'), '/2': (200, {}, b'two')}) as server:
+            for _ in range(3):
+                self.assertEqual(curl(server.url + '/1').content, b'one')
+            # the shared handler's connection is reused
+            self.assertEqual(server.connections, 1)
+            results = curl_many([server.url + '/1', server.url + '/2', server.url + '/3'])
+            self.assertEqual([_.content for _ in results.values()], [b'one', b'two', None])
+            self.assertTrue(isinstance(results[server.url + '/3'].error, CriticalError))
+
     # def test_curl_bs4(self):
     #     curl_bs4('www.google.com')
 
@@ -1206,6 +1571,29 @@ class UtilsTester(unittest.TestCase):
     def test_read_file_without_comments(self):
         read_file_without_comments(self.libfile)
 
+    def test_json_backend(self):
+        backend = get_json_backend()
+        docs = ('{"a": [1, 2.5, "x", null, true]}', '[NaN, Infinity]', '[18446744073709551615]',
+                '"\\ud800"', b'{"bytes": 1}', '[18446744073709551616, -9223372036854775809]',
+                b'{"a": 123456789012345678901234567890}', bytearray(b'[99999999999999999999]'), '[1.5e400]')
+        try:
+            self.assertEqual(set_json_backend('json'), 'json')
+            expected = [repr(json.loads(_)) for _ in docs]
+            for name in ('auto', 'orjson', 'ujson', 'simplejson', 'json'):
+                set_json_backend(name)
+                self.assertEqual([repr(json_loads(_)) for _ in docs], expected)
+                for _ in ('{"a": ', '[1,]', "{'a': 1}", '', '1 2'):
+                    try:
+                        json_loads(_)
+                        raise Exception("failed to raise ValueError for invalid json '{0}'".format(_))
+                    except ValueError:
+                        pass
+                self.assertTrue(isJson('{"a": 1}'))
+                self.assertFalse(isJson('{"a": }'))
+            self.assertEqual(set_json_backend('nonexistent'), 'json')
+        finally:
+            set_json_backend(backend)
+
     def test_jsonpp(self):
         data = '{ "name": { "first": "Hari", "last": "Sekhon" } }'
         data2 = '{\n    "name": {\n        "first": "Hari",\n        "last": "Sekhon"\n    }\n}'
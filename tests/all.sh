@@ -27,7 +27,7 @@ cd "$srcdir/..";
 
 #./python3.sh
 
-bash-tools/python_compile.sh
+tests/compile.sh
 
 bash-tools/python_find_quit.sh
 
@@ -28,3 +28,14 @@ isExcluded(){
     fi
     return 1
 }
+
+# use async / await, which are a SyntaxError on Python 2, so aren't compiled there
+python3_only="
+harisekhon/async_request_handler.py
+test/async_test_utils.py
+"
+
+isPython3Only(){
+    local prog="${1#./}"
+    grep -Fxq "$prog" <<< "$python3_only"
+}